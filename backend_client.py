@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
+# (connect, read) seconds; semantic endpoints may wait on an embedding call
+DEFAULT_TIMEOUT = (3.05, 60)
+
+
+class BackendClient:
+    # One keep-alive connection pool for the dashboard. Idempotent GETs are
+    # retried on connection errors and 502/503/504 with backoff, and successful
+    # GET responses are cached by path + params for cache_ttl seconds.
+    def __init__(self, base_url=BACKEND_URL, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.3,
+                 pool_size=10, cache_ttl=300.0, cache_size=256):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET"}), raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path, params):
+        return path, tuple(sorted((k, str(v)) for k, v in (params or {}).items()))
+
+    def get(self, path, params=None, use_cache=True):
+        key = self._key(path, params)
+        if use_cache:
+            with self._lock:
+                entry = self._cache.get(key)
+                if entry is not None and time.monotonic() - entry[0] < self.cache_ttl:
+                    self._cache.move_to_end(key)
+                    return entry[1]
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        if use_cache and response.status_code == 200:
+            with self._lock:
+                self._cache[key] = (time.monotonic(), response)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return response
+
+    def post(self, path, json=None, files=None):
+        # Not cached and not retried: POSTs may change server state
+        return self.session.post(f"{self.base_url}{path}", json=json, files=files, timeout=self.timeout)
+
+    def stream_events(self, path, json=None):
+        # POST that answers with Server-Sent Events; yields (event, data) as
+        # each event arrives instead of waiting for the whole body
+        with self.session.post(f"{self.base_url}{path}", json=json, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            event, data = "message", []
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].lstrip())
+                elif not line and data:
+                    yield event, "\n".join(data)
+                    event, data = "message", []
+
+    def get_many(self, requests_by_name):
+        # {name: (path, params)} -> {name: response or exception}, fetched concurrently
+        def fetch(item):
+            name, (path, params) = item
+            try:
+                return name, self.get(path, params)
+            except requests.RequestException as e:
+                return name, e
+
+        workers = max(1, min(self.pool_size, len(requests_by_name)))
+        with ThreadPoolExecutor(workers) as pool:
+            return dict(pool.map(fetch, requests_by_name.items()))
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,17 @@
+import os
+
+from scripts.generate_dataset import generate
+
+
+def parse_size(text):
+    # "10k" -> 10_000, "1M" -> 1_000_000
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def synthesize(n_rows, path, seed=0):
+    # Deterministic for a given (n_rows, seed); existing files are reused
+    if not os.path.exists(path):
+        generate(n_rows, path, seed=seed)
+    return path
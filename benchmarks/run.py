@@ -0,0 +1,316 @@
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .datasets import parse_size, synthesize
+
+DEFAULT_SIZES = "10k,100k,1M,10M"
+DATA_DIR = os.path.join("benchmarks", "data")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+QUERY_POOL = 20  # distinct parameter sets cycled through per endpoint
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(samples, wall_seconds, errors):
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "n": len(samples),
+        "errors": errors,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+    }
+
+
+# --- worker: runs in its own process per dataset size -----------------------
+
+def _pool(values, rng, n=QUERY_POOL):
+    values = [v for v in values if isinstance(v, str) and v]
+    return [values[i] for i in rng.integers(0, len(values), n)] if values else [""]
+
+
+def build_cases(df, rng):
+    # (name, method, path, heavy, request kwargs for iteration i)
+    descriptions = _pool(df["Product_Description"].astype(str).unique().tolist(), rng)
+    words = [max(d.split(), key=len)[:12] for d in descriptions]
+    hts_codes = _pool(df["HTS_Code"].astype(str).unique().tolist(), rng)
+    companies = _pool(df["Company"].astype(str).unique().tolist(), rng)
+    countries = _pool(df["Country_of_Origin"].astype(str).unique().tolist(), rng)
+    materials = _pool(df["Primary_Material"].astype(str).unique().tolist(), rng)
+    record_ids = _pool(df["Record_ID"].astype(str).tolist(), rng)
+    n_items = 1000
+    batch = {
+        "material_cost_usd": np.round(rng.uniform(1, 500, n_items), 2).tolist(),
+        "quantity": rng.integers(1, 10000, n_items).tolist(),
+        "tariff_rate_percent": np.round(rng.uniform(0, 25, n_items), 2).tolist(),
+    }
+    batch_csv = "material_cost_usd,quantity,tariff_rate_percent\n" + "".join(
+        f"{c},{q},{r}\n" for c, q, r in zip(*batch.values())
+    )
+    pick = lambda pool, i: pool[i % len(pool)]  # noqa: E731
+    return [
+        ("health", "GET", "/health", False, lambda i: {}),
+        ("ready", "GET", "/ready", False, lambda i: {}),
+        ("cache-stats", "GET", "/cache-stats", False, lambda i: {}),
+        ("metrics", "GET", "/metrics", False, lambda i: {}),
+        ("calculate-tariff", "GET", "/calculate-tariff", False, lambda i: {"params": {
+            "material_cost_usd": 10 + i, "quantity": 100, "tariff_rate_percent": 5.5}}),
+        ("calculate-tariff-batch", "POST", "/calculate-tariff/batch", False, lambda i: {"json": batch}),
+        ("calculate-tariff-batch-csv", "POST", "/calculate-tariff/batch-csv", False,
+         lambda i: {"files": {"file": ("batch.csv", batch_csv.encode())}}),
+        ("hts-lookup", "GET", "/hts-lookup", False, lambda i: {"params": {"hts_code": pick(hts_codes, i)}}),
+        ("hts-range", "GET", "/hts-range", False, lambda i: {"params": {
+            "hts_prefix": pick(hts_codes, i), "level": "chapter"}}),
+        ("product-search", "GET", "/product-search", False, lambda i: {"params": {
+            "product_name": pick(words, i)}}),
+        ("product-search-filters", "GET", "/product-search", False, lambda i: {"params": {
+            "company_name": pick(companies, i), "country_of_origin": pick(countries, i)}}),
+        ("export-ndjson", "GET", "/export", True, lambda i: {"params": {
+            "product_name": pick(words, i), "country_of_origin": pick(countries, i)}}),
+        ("export-csv", "GET", "/export", True, lambda i: {"params": {
+            "format": "csv", "product_name": pick(words, i), "country_of_origin": pick(countries, i)}}),
+        ("material-optimization", "GET", "/material-optimization", False, lambda i: {"params": {
+            "product_name": pick(words, i), "material": pick(materials, i)}}),
+        ("scenario-simulation", "GET", "/scenario-simulation", False, lambda i: {"params": {
+            "product_name": pick(words, i), "alt_country": pick(countries, i + 1)}}),
+        ("policy-shock", "POST", "/policy-shock", True, lambda i: {"json": {
+            "overrides": [{"country": pick(countries, i), "add_points": 10}]}}),
+        ("smart-product-search", "GET", "/smart-product-search", False, lambda i: {"params": {
+            "query": pick(descriptions, i)}}),
+        ("semantic-scenario-simulation", "GET", "/semantic-scenario-simulation", False, lambda i: {"params": {
+            "query": pick(descriptions, i)}}),
+        ("semantic-tariff-lookup", "GET", "/semantic-tariff-lookup", False, lambda i: {"params": {
+            "query": pick(descriptions, i)}}),
+        ("tariff-workflow", "GET", "/tariff-workflow", False, lambda i: {"params": {
+            "query": pick(descriptions, i), "alt_country": pick(countries, i + 1), "quantity": 100}}),
+        # A new question each time, so the stub model streams instead of the response cache answering
+        ("chat", "POST", "/chat", False, lambda i: {"json": {
+            "question": f"Which of these has the lowest landed cost? ({i})",
+            "record_ids": [pick(record_ids, i + j) for j in range(20)]}}),
+    ]
+
+
+def _delta_case(df):
+    # Alternately inserts and deletes the same records; the run always ends on
+    # a delete, so the dataset is back to its original content afterwards
+    rows = df.iloc[:100].copy()
+    rows["Record_ID"] = ["BENCH" + str(i).zfill(6) for i in range(len(rows))]
+    inserts = rows.to_csv(index=False).encode()
+    deletes = ("Record_ID,Operation\n" + "".join(f"{r},delete\n" for r in rows["Record_ID"])).encode()
+    return ("ingest-delta", "POST", "/ingest/delta", True,
+            lambda i: {"files": {"file": ("delta.csv", deletes if i % 2 else inserts)}})
+
+
+def _run_case(client, case, iterations, concurrency):
+    name, method, path, heavy, kwargs = case
+    if heavy:
+        iterations = max(2, iterations // 10)
+    if name == "ingest-delta":
+        iterations += 1 - iterations % 2  # calls 0..iterations, last one odd
+
+    def one(i):
+        start = time.perf_counter()
+        response = client.request(method, path, **kwargs(i))
+        elapsed = time.perf_counter() - start
+        content_type = response.headers.get("content-type", "")
+        failed = response.status_code >= 400 or (
+            content_type.startswith("application/json") and "error" in response.json()
+        ) or (content_type.startswith("text/event-stream") and "event: error" in response.text)
+        return elapsed, failed
+
+    cold, cold_failed = one(0)
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(one, range(1, iterations + 1)))
+    else:
+        results = [one(i) for i in range(1, iterations + 1)]
+    wall = time.perf_counter() - start
+    stats = summarize([r[0] for r in results], wall, sum(r[1] for r in results) + cold_failed)
+    return {"method": method, "path": path, "cold_ms": round(cold * 1000, 3), **stats,
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def worker(args):
+    started = time.perf_counter()
+    if args.snapshot:
+        from src.tariff_management_chatbot.data.snapshot import compile_snapshot
+        compile_snapshot(args.csv)
+    compile_seconds = time.perf_counter() - started
+
+    from fastapi.testclient import TestClient
+    from src.tariff_management_chatbot.api.app import app
+    from src.tariff_management_chatbot.api.warmup import Warmup
+    from src.tariff_management_chatbot.data.store import get_tariff_store
+
+    warm = Warmup()
+    warm.start()
+    warm.wait()
+    df = get_tariff_store().snapshot().df
+    rng = np.random.default_rng(args.seed)
+    cases = build_cases(df, rng)
+    if args.ingest:
+        cases.append(_delta_case(df))
+    if args.endpoints:
+        wanted = set(args.endpoints.split(","))
+        cases = [c for c in cases if c[0] in wanted]
+
+    endpoints = {}
+    with TestClient(app) as client:
+        for case in cases:
+            endpoints[case[0]] = _run_case(client, case, args.iterations, args.concurrency)
+            print(f"  {case[0]:<30} p50 {endpoints[case[0]]['p50_ms']:>10.3f} ms  "
+                  f"p99 {endpoints[case[0]]['p99_ms']:>10.3f} ms", file=sys.stderr)
+
+    result = {
+        "rows": len(df),
+        "compile_snapshot_seconds": round(compile_seconds, 3) if args.snapshot else None,
+        "warmup": warm.report()["components"],
+        "peak_rss_mb": peak_rss_mb(),
+        "endpoints": endpoints,
+    }
+    with open(args.out, "w") as f:
+        json.dump(result, f)
+
+
+# --- driver -------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "storage_backend": args.storage,
+            "snapshot": args.snapshot,
+        },
+        "results": [],
+    }
+    for n_rows in sizes:
+        csv_path = os.path.join(DATA_DIR, f"tariffs-{n_rows}-seed{args.seed}.csv")
+        print(f"[{n_rows} rows] generating {csv_path}", file=sys.stderr)
+        started = time.perf_counter()
+        synthesize(n_rows, csv_path, seed=args.seed)
+        generate_seconds = time.perf_counter() - started
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "result.json")
+            env = {
+                **os.environ,
+                "TARIFF_CSV": csv_path,
+                "EMBEDDING_BACKEND": "hashing",
+                # Fresh vector store per run, so vector_store warm-up is comparable
+                "EMBEDDING_CACHE_DIR": os.path.join(tmp, "embeddings"),
+                "WARMUP_ON_STARTUP": "false",
+                # /chat streams canned replies; no network, and a fresh response cache per run
+                "LLM_BACKEND": "stub",
+                "LLM_CACHE_PATH": os.path.join(tmp, "llm_cache.db"),
+                "STORAGE_BACKEND": args.storage,
+                "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'tariffs.db')}",
+            }
+            command = [sys.executable, "-m", "benchmarks.run", "--worker", "--csv", csv_path, "--out", out,
+                       "--seed", str(args.seed), "--iterations", str(args.iterations),
+                       "--concurrency", str(args.concurrency), "--endpoints", args.endpoints]
+            if args.snapshot:
+                command.append("--snapshot")
+            if args.ingest:
+                command.append("--ingest")
+            print(f"[{n_rows} rows] benchmarking", file=sys.stderr)
+            subprocess.run(command, env=env, check=True)
+            with open(out) as f:
+                result = json.load(f)
+        result["generate_seconds"] = round(generate_seconds, 3)
+        report["results"].append(result)
+
+    path = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['git_commit'] or 'nogit'}.json"
+    )
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}", file=sys.stderr)
+    return path
+
+
+def compare(baseline_path, candidate_path):
+    # p50/p99 per (rows, endpoint); ratio > 1 means the candidate is slower
+    with open(baseline_path) as f:
+        baseline = {r["rows"]: r for r in json.load(f)["results"]}
+    with open(candidate_path) as f:
+        candidate = {r["rows"]: r for r in json.load(f)["results"]}
+    out = io.StringIO()
+    out.write(f"{'rows':>10} {'endpoint':<30} {'p50 base':>10} {'p50 new':>10} {'ratio':>7} "
+              f"{'p99 base':>10} {'p99 new':>10} {'ratio':>7}\n")
+    for rows in sorted(baseline.keys() & candidate.keys()):
+        base, new = baseline[rows]["endpoints"], candidate[rows]["endpoints"]
+        for name in [n for n in base if n in new]:
+            b, c = base[name], new[name]
+            out.write(f"{rows:>10} {name:<30} {b['p50_ms']:>10.3f} {c['p50_ms']:>10.3f} "
+                      f"{c['p50_ms'] / b['p50_ms'] if b['p50_ms'] else float('nan'):>7.2f} "
+                      f"{b['p99_ms']:>10.3f} {c['p99_ms']:>10.3f} "
+                      f"{c['p99_ms'] / b['p99_ms'] if b['p99_ms'] else float('nan'):>7.2f}\n")
+        b_rss, c_rss = baseline[rows]["peak_rss_mb"], candidate[rows]["peak_rss_mb"]
+        out.write(f"{rows:>10} {'peak RSS (MB)':<30} {b_rss:>10.1f} {c_rss:>10.1f} "
+                  f"{c_rss / b_rss if b_rss else float('nan'):>7.2f}\n")
+    return out.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every API endpoint on synthetic datasets.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts, e.g. 10k,100k,1M")
+    parser.add_argument("--iterations", type=int, default=50, help="timed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads issuing requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=["pandas", "sqlite"], default="pandas")
+    parser.add_argument("--snapshot", action="store_true", help="compile and load the columnar snapshot")
+    parser.add_argument("--ingest", action="store_true",
+                        help="also benchmark /ingest/delta (rewrites the generated CSV)")
+    parser.add_argument("--endpoints", default="", help="comma-separated case names to run (default: all)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"),
+                        help="print a latency comparison of two results files and exit")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.compare:
+        print(compare(*args.compare), end="")
+    elif args.worker:
+        worker(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
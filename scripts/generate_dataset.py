@@ -1,39 +1,293 @@
-# Save this as scripts/generate_dataset.py and run it separately
-from faker import Faker
+# Synthetic tariff dataset in the exact data/tariffs.csv schema.
+#
+#   python scripts/generate_dataset.py --rows 10000000 --out data/tariffs-10m.csv --seed 42
+#
+# Rows are generated in fixed-size chunks, each from its own seed derived from
+# (seed, chunk index), so the output is identical for any number of workers.
+# Chunks are built with NumPy in worker processes and written to disk in order
+# as they complete; at most a few chunks are held in memory at a time.
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import random
-
-fake = Faker()
-rows = []
-for i in range(10000):
-    d = {
-        "record_id": i+1,
-        "company_name": fake.company(),
-        "product_name": fake.word().capitalize() + " " + fake.word().capitalize(),
-        "hts_code": fake.numerify(text='########'),
-        "country_of_origin": fake.country(),
-        "import_country": fake.country(),
-        "import_date": fake.date_between(start_date="-2y", end_date="today"),
-        "fta_status": fake.boolean(),
-        "base_price_usd": round(random.uniform(1, 100), 2),
-        "quantity": random.randint(100, 10000),
-        "tariff_rate_pct": round(random.uniform(0.01, 0.15), 3),
-        "mpf_fee_usd": round(random.uniform(0, 25), 2),
-        "landed_cost_usd": round(random.uniform(1, 150), 2),
-        "compliance_flag": fake.boolean(),
-        "compliance_notes": fake.sentence(),
-        "alt_country_1": fake.country(),
-        "alt_country_1_savings_usd": round(random.uniform(0, 50000), 2),
-        "alt_country_2": fake.country(),
-        "alt_country_2_savings_usd": round(random.uniform(0, 50000), 2),
-        "suggested_material_1": fake.word().capitalize(),
-        "suggested_material_1_pct": round(random.uniform(1, 20), 1),
-        "suggested_material_2": fake.word().capitalize(),
-        "suggested_material_2_pct": round(random.uniform(1, 20), 1),
-        "risk_level": random.choice(['low', 'medium', 'high']),
-        "report_notes": fake.text(max_nb_chars=20),
-        "last_updated": fake.date_time_between(start_date="-2y", end_date="now"),
+
+COLUMNS = [
+    "Record_ID", "HTS_Code", "Product_Description", "Company", "Country_of_Origin", "Country_Code",
+    "Material_Cost_USD", "Tariff_Rate_Percent", "Tariff_Amount_USD", "MPF_USD", "Other_Fees_USD",
+    "Landed_Cost_USD", "Material_Composition", "Primary_Material", "Quantity", "Unit_Price_USD",
+    "Total_Value_USD", "Import_Date", "Port_of_Entry", "FTA_Applicable", "Alternative_Country",
+    "Potential_Savings_Percent", "Potential_Savings_USD", "Risk_Level", "Compliance_Status", "Last_Updated",
+]
+
+# (10-digit HTS code, description, typical primary material)
+BASE_PRODUCTS = [
+    ("3304.30.0000", "Manicure or pedicure preparations", "Plastic"),
+    ("3402.20.0000", "Cleaning preparations put up for retail sale", "Plastic"),
+    ("3923.30.0080", "Carboys, bottles, flasks and similar articles", "Plastic"),
+    ("3924.90.5600", "Other household articles and toilet articles, of plastics", "Plastic"),
+    ("3926.20.4000", "Articles of apparel and clothing accessories, of plastics", "Plastic"),
+    ("4015.19.0510", "Disposable gloves of vulcanized rubber, nitrile", "Rubber"),
+    ("4016.99.6000", "Other articles of vulcanized rubber", "Rubber"),
+    ("4202.12.8020", "Trunks, suitcases and vanity cases with outer surface of plastics", "Plastic"),
+    ("4421.99.9780", "Other articles of wood", "Steel"),
+    ("4819.40.0040", "Other sacks and bags, including cones, of paper", "Polyester"),
+    ("6109.10.0040", "T-shirts, singlets and other vests, of cotton", "Cotton"),
+    ("6110.20.2025", "Sweaters, pullovers of cotton", "Cotton"),
+    ("6116.10.1700", "Gloves, mittens and mitts, impregnated with plastics", "Nylon"),
+    ("6204.63.3510", "Women's or girls' trousers of cotton", "Cotton"),
+    ("6211.32.0040", "Track suits, ski suits and swimwear of cotton", "Cotton"),
+    ("6217.10.1000", "Accessories of apparel", "Polyester"),
+    ("6302.60.0020", "Toilet linen and kitchen linen of cotton", "Cotton"),
+    ("6307.90.9889", "Other made up articles, including dress patterns", "Polyester"),
+    ("6403.91.6030", "Footwear with outer soles of rubber", "Leather"),
+    ("6505.00.6045", "Hats and other headgear, knitted or crocheted", "Nylon"),
+    ("6506.10.6000", "Safety headgear", "Plastic"),
+    ("6806.10.0000", "Slag wool, rock wool and similar mineral wools", "Glass"),
+    ("7013.37.2000", "Drinking glasses of lead crystal", "Glass"),
+    ("7013.49.2000", "Glassware for table or kitchen use", "Glass"),
+    ("7117.11.0000", "Cuff links and studs of base metal", "Steel"),
+    ("7323.10.0000", "Iron or steel wool; pot scourers and scouring pads", "Steel"),
+    ("7323.93.0060", "Table, kitchen or other household articles of stainless steel", "Steel"),
+    ("7326.90.8588", "Other articles of iron or steel", "Steel"),
+    ("7616.99.1000", "Other articles of aluminum", "Aluminum"),
+    ("8302.30.3000", "Other mountings, fittings and similar articles", "Steel"),
+    ("8305.20.0000", "Staples in strips", "Steel"),
+    ("8310.00.0000", "Sign-plates, name-plates, address-plates and similar plates", "Aluminum"),
+    ("8414.51.0000", "Ceiling fans", "Aluminum"),
+    ("8467.21.0030", "Drills with self-contained electric motor, cordless", "Plastic"),
+    ("8471.30.0100", "Portable automatic data processing machines", "Aluminum"),
+    ("8517.12.0020", "Telephones for cellular networks", "Glass"),
+    ("8528.72.6400", "Reception apparatus for television", "Plastic"),
+    ("8536.69.4000", "Plugs and sockets for coaxial cables", "Plastic"),
+    ("8543.70.9860", "Other electrical machines and apparatus", "Steel"),
+    ("8708.29.5090", "Other parts and accessories of motor vehicles", "Steel"),
+    ("9017.80.0000", "Other drawing, marking-out or mathematical calculating instruments", "Plastic"),
+    ("9018.32.0000", "Tubular metal needles", "Steel"),
+    ("9401.80.4016", "Seats with wooden frames", "Leather"),
+    ("9403.60.8081", "Wooden furniture for bedrooms", "Steel"),
+    ("9404.90.9505", "Pillows, cushions and similar articles", "Polyester"),
+    ("9503.00.0071", "Tricycles, scooters, pedal cars and similar wheeled toys", "Plastic"),
+    ("9505.10.4000", "Christmas articles", "Plastic"),
+    ("9506.62.4000", "Inflatable balls", "Rubber"),
+    ("9507.30.2000", "Fishing reels", "Aluminum"),
+    ("9615.11.1000", "Combs, hair-slides and the like of hard rubber", "Rubber"),
+]
+# Appended to a base description to make further statistical lines under the
+# same 6-digit subheading
+QUALIFIERS = [
+    "for retail sale", "for industrial use", "other", "in sets", "for children", "for men or boys",
+    "for women or girls", "of synthetic fibers", "recycled", "imported in bulk", "with accessories",
+    "electric", "non-electric", "coated", "printed", "packaged for export", "heavy duty", "disposable",
+    "reusable", "premium grade",
+]
+MATERIALS = ["Polyester", "Nylon", "Cotton", "Glass", "Aluminum", "Leather", "Rubber", "Silicone",
+             "Plastic", "Steel"]
+COMPANIES = [
+    "HP Inc.", "Target Corporation", "Best Buy Co.", "Under Armour Inc.", "Nissan Motor Co.",
+    "IBM Corporation", "KPMG", "Macy's Inc.", "Honda Motor Co.", "Coca-Cola Company", "Amazon.com Inc.",
+    "McKesson Corporation", "Stanley Black & Decker", "Costco Wholesale", "Porsche AG", "Nestle SA",
+    "Oracle Corporation", "Gap Inc.", "Boston Consulting Group", "Levi Strauss & Co.", "Nike Inc.",
+    "General Motors", "Unilever", "Procter & Gamble", "Dell Technologies", "Sony Corporation",
+    "Ferrari N.V.", "Intel Corporation", "BMW Group", "Audi AG", "Adidas AG", "LG Electronics",
+    "Apple Inc.", "Mercedes-Benz Group", "Ernst & Young", "Volkswagen AG", "Accenture PLC",
+    "Ford Motor Company", "Cisco Systems", "Bain & Company", "Home Depot", "Samsung Electronics", "IKEA",
+    "Toyota Motor Corporation", "McKinsey & Company", "Hyundai Motor Company", "Johnson & Johnson",
+    "PepsiCo Inc.", "Microsoft Corporation", "Walmart Inc.", "General Electric", "Deloitte & Touche",
+]
+# (country, ISO code, share of imports, trade agreement that can apply)
+COUNTRIES = [
+    ("China", "CN", 0.16, None), ("Mexico", "MX", 0.12, "Yes"), ("Canada", "CA", 0.10, "Yes"),
+    ("Vietnam", "VN", 0.07, "CPTPP"), ("Germany", "DE", 0.06, None), ("Japan", "JP", 0.06, "CPTPP"),
+    ("South Korea", "KR", 0.05, "KORUS"), ("Taiwan", "TW", 0.04, None), ("India", "IN", 0.04, None),
+    ("Italy", "IT", 0.03, None), ("United Kingdom", "GB", 0.03, None), ("France", "FR", 0.03, None),
+    ("Malaysia", "MY", 0.03, "CPTPP"), ("Thailand", "TH", 0.03, None), ("Indonesia", "ID", 0.02, None),
+    ("Bangladesh", "BD", 0.02, None), ("Philippines", "PH", 0.02, None), ("Brazil", "BR", 0.02, None),
+    ("Turkey", "TR", 0.02, None), ("Pakistan", "PK", 0.01, None),
+]
+PORTS = ["Los Angeles, CA", "Long Beach, CA", "New York, NY", "Houston, TX", "Seattle, WA", "Miami, FL",
+         "Charleston, SC", "Norfolk, VA"]
+RISK_LEVELS = ["Low", "Medium", "High"]
+COMPLIANCE = (["Compliant", "Non-Compliant", "Under Review"], [0.6, 0.2, 0.2])
+FTA_USE_RATE = 0.6  # share of eligible shipments that claim the agreement
+CHINA_ADDITIONAL_DUTY = 7.5  # Section 301 points on top of the MFN rate
+MPF_RATE = 0.003464
+ROWS_PER_PRODUCT = 2000
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+def max_products():
+    # Every distinct code build_catalog can produce: the base lines plus
+    # suffixes .0001-.9999 under each base line's subheading
+    base = {code for code, _, _ in BASE_PRODUCTS}
+    prefixes = {code[:7] for code in base}
+    # Base codes that are themselves one of those suffixed codes count once
+    overlap = sum(1 for code in base if len(code) == 12 and code[8:].isdigit() and code[8:] != "0000")
+    return len(base) + 9999 * len(prefixes) - overlap
+
+
+def build_catalog(seed, n_products):
+    # Product lines: every base line plus extra statistical suffixes under the
+    # same subheading. Each line has its own MFN rate, price level and popularity.
+    if n_products > max_products():
+        raise ValueError(f"At most {max_products()} distinct product lines can be generated, not {n_products}.")
+    rng = np.random.default_rng([seed, 0])
+    codes, descriptions, materials = [], [], []
+    taken = {code for code, _, _ in BASE_PRODUCTS}
+    for code, description, material in BASE_PRODUCTS:
+        codes.append(code)
+        descriptions.append(description)
+        materials.append(material)
+    while len(codes) < n_products:
+        base_code, base_description, material = BASE_PRODUCTS[rng.integers(len(BASE_PRODUCTS))]
+        code = f"{base_code[:7]}.{rng.integers(1, 10000):04d}"
+        if code in taken:
+            continue
+        taken.add(code)
+        codes.append(code)
+        descriptions.append(f"{base_description}, {QUALIFIERS[rng.integers(len(QUALIFIERS))]}")
+        materials.append(material)
+    n = len(codes)
+    # Zipf-like popularity: a few product lines account for most shipments
+    popularity = 1.0 / np.arange(1, n + 1) ** 0.8
+    popularity = popularity[rng.permutation(n)]
+    return {
+        "code": np.asarray(codes, dtype=object),
+        "description": np.asarray(descriptions, dtype=object),
+        "material": np.asarray([MATERIALS.index(m) for m in materials]),
+        "mfn_rate": np.round(np.clip(rng.gamma(2.0, 4.5, n), 0, 32), 2),
+        "price": np.round(rng.uniform(5, 120, n), 2),
+        "weight": popularity / popularity.sum(),
     }
-    rows.append(d)
-df = pd.DataFrame(rows)
-df.to_csv("data/tariffs.csv", index=False)
+
+
+def generate_chunk(catalog, seed, chunk_index, start, n, total, as_of):
+    rng = np.random.default_rng([seed, 1, chunk_index])
+    product = rng.choice(len(catalog["code"]), n, p=catalog["weight"])
+    country_share = np.array([c[2] for c in COUNTRIES])
+    country = rng.choice(len(COUNTRIES), n, p=country_share / country_share.sum())
+    alternative = (country + rng.integers(1, len(COUNTRIES), n)) % len(COUNTRIES)
+
+    # Duty: MFN rate of the line, plus China's additional duty, unless a trade
+    # agreement is claimed
+    agreements = np.array([c[3] or "No" for c in COUNTRIES], dtype=object)
+    claims = (agreements[country] != "No") & (rng.random(n) < FTA_USE_RATE)
+    fta = np.where(claims, agreements[country], "No")
+    mfn = catalog["mfn_rate"][product]
+    china = np.array([c[0] == "China" for c in COUNTRIES])
+    rate = np.where(claims, 0.0, np.round(np.clip(mfn + rng.normal(0, 0.5, n), 0, None), 2)
+                    + np.where(china[country], CHINA_ADDITIONAL_DUTY, 0.0))
+    alt_rate = np.where(np.array([c[3] is not None for c in COUNTRIES])[alternative], 0.0,
+                        mfn + np.where(china[alternative], CHINA_ADDITIONAL_DUTY, 0.0))
+
+    cost = np.round(np.clip(catalog["price"][product] * rng.lognormal(0, 0.35, n), 0.5, None), 2)
+    quantity = rng.integers(100, 10000, n)
+    tariff = np.round(cost * rate / 100, 2)
+    mpf = np.round(cost * MPF_RATE, 2)
+    other = np.round(rng.uniform(0.1, 2.5, n), 2)
+    total_value = np.round(cost * quantity, 2)
+    savings_pct = np.round(np.clip(rate - alt_rate, 0, None), 2)
+
+    # Two-material composition; the line's typical material leads most of the time
+    primary = np.where(rng.random(n) < 0.7, catalog["material"][product], rng.integers(0, len(MATERIALS), n))
+    secondary = (primary + rng.integers(1, len(MATERIALS), n)) % len(MATERIALS)
+    share = np.round(rng.uniform(60, 100, n), 1)
+    materials = np.asarray(MATERIALS, dtype=object)
+    composition = (pd.Series(share).map("{:.1f}% ".format).to_numpy(dtype=object) + materials[primary] + ", "
+                   + pd.Series(np.round(100 - share, 1)).map("{:.1f}% ".format).to_numpy(dtype=object)
+                   + materials[secondary])
+
+    end = np.datetime64(as_of, "D")
+    import_date = end - rng.integers(1, 731, n).astype("timedelta64[D]")
+    width = max(6, len(str(total)))
+    names = np.array([c[0] for c in COUNTRIES], dtype=object)
+    frame = pd.DataFrame({
+        "Record_ID": [f"TR{i:0{width}d}" for i in range(start + 1, start + n + 1)],
+        "HTS_Code": catalog["code"][product],
+        "Product_Description": catalog["description"][product],
+        "Company": np.asarray(COMPANIES, dtype=object)[rng.integers(0, len(COMPANIES), n)],
+        "Country_of_Origin": names[country],
+        "Country_Code": np.array([c[1] for c in COUNTRIES], dtype=object)[country],
+        "Material_Cost_USD": cost,
+        "Tariff_Rate_Percent": rate,
+        "Tariff_Amount_USD": tariff,
+        "MPF_USD": mpf,
+        "Other_Fees_USD": other,
+        "Landed_Cost_USD": np.round(cost + tariff + mpf + other, 2),
+        "Material_Composition": composition,
+        "Primary_Material": materials[primary],
+        "Quantity": quantity,
+        "Unit_Price_USD": cost,
+        "Total_Value_USD": total_value,
+        "Import_Date": np.datetime_as_string(import_date, unit="D"),
+        "Port_of_Entry": np.asarray(PORTS, dtype=object)[rng.integers(0, len(PORTS), n)],
+        "FTA_Applicable": fta,
+        "Alternative_Country": names[alternative],
+        "Potential_Savings_Percent": savings_pct,
+        "Potential_Savings_USD": np.round(total_value * savings_pct / 100, 2),
+        "Risk_Level": np.asarray(RISK_LEVELS, dtype=object)[rng.integers(0, len(RISK_LEVELS), n)],
+        "Compliance_Status": rng.choice(np.asarray(COMPLIANCE[0], dtype=object), n, p=COMPLIANCE[1]),
+        "Last_Updated": as_of,
+    }, columns=COLUMNS)
+    return frame
+
+
+def _encode_chunk(args):
+    catalog, seed, chunk_index, start, n, total, as_of = args
+    frame = generate_chunk(catalog, seed, chunk_index, start, n, total, as_of)
+    return frame.to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def generate(n_rows, out, seed=0, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, n_products=None,
+             as_of="2025-07-18 00:00:00"):
+    n_products = n_products or min(max(len(BASE_PRODUCTS), n_rows // ROWS_PER_PRODUCT), max_products())
+    catalog = build_catalog(seed, n_products)
+    tasks = [(catalog, seed, i, start, min(chunk_rows, n_rows - start), n_rows, as_of)
+             for i, start in enumerate(range(0, n_rows, chunk_rows))]
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = f"{out}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        if workers == 1 or len(tasks) == 1:
+            for task in tasks:
+                f.write(_encode_chunk(task))
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                # Keep a bounded window in flight and write chunks in order
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(_encode_chunk, task))
+                    if len(pending) >= 2 * workers:
+                        f.write(pending.popleft().result())
+                while pending:
+                    f.write(pending.popleft().result())
+    os.replace(tmp, out)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic tariffs.csv.")
+    parser.add_argument("--rows", type=int, default=10000)
+    # Never the live data/tariffs.csv unless asked for explicitly
+    parser.add_argument("--out", default=os.path.join("data", "tariffs-generated.csv"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--products", type=int, default=None,
+                        help=f"distinct product lines (default: rows / {ROWS_PER_PRODUCT}, at least 50)")
+    parser.add_argument("--as-of", default="2025-07-18 00:00:00",
+                        help="Last_Updated value; import dates fall in the two years before it")
+    args = parser.parse_args(argv)
+    if args.products is not None and not 1 <= args.products <= max_products():
+        parser.error(f"--products must be between 1 and {max_products()}")
+    started = time.perf_counter()
+    generate(args.rows, args.out, args.seed, args.workers, args.chunk_rows, args.products, args.as_of)
+    print(f"Wrote {args.rows} rows to {args.out} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
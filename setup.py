@@ -11,8 +11,13 @@ setup(
         'langchain',
         'crewai',
         'pandas',
+        'numpy',
         'sqlalchemy',
-        'python-dotenv'
+        'python-dotenv',
+        'python-multipart',
+        'httpx',
+        'requests',
+        'orjson'
     ],
     entry_points={
         'console_scripts': [
@@ -1,169 +1,59 @@
-from ..data.loader import load_tariff_data
+import heapq
+import numpy as np
+import pandas as pd
+from ..data.store import get_tariff_store
+from ..data.hts_index import get_hts_index
+from ..data.materials import get_material_table
+from ..data.text_index import get_text_index
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class MaterialOptimizer:
-    def suggest_materials(self, product_name, hts_code=None):
+    def suggest_materials(self, product_name, hts_code=None, material=None,
+                          min_share=None, max_share=None, top_k=3):
         try:
-            df = load_tariff_data()
-            mask = df['Product_Description'].str.lower().str.contains(product_name.lower())
+            snapshot = get_tariff_store().snapshot()
+            df = snapshot.df
+            rows = get_text_index(snapshot).search({"Product_Description": product_name})
             if hts_code:
-                mask &= (df['HTS_Code'].astype(str) == str(hts_code))
-            matches = df[mask]
-            if matches.empty:
+                rows = np.intersect1d(rows, get_hts_index(snapshot).lookup(hts_code), assume_unique=True)
+            if len(rows) == 0:
                 return {"message": "No data found for this product."}
 
-            suggestions = []
-            for _, row in matches.iterrows():
-                # We'll suggest materials from Material_Composition and Primary_Material fields
-                if isinstance(row['Material_Composition'], str):
-                    suggestions.append({
-                        "materials": row['Material_Composition'],
-                        "primary_material": row['Primary_Material'],
-                        "potential_savings_usd": row.get('Potential_Savings_USD', 0)
-                    })
-            if not suggestions:
+            # Only rows with a parsed Material_Composition can be suggested
+            table = get_material_table(snapshot)
+            shares = None
+            if material:
+                material_rows, material_shares = table.rows_with_material(material, min_share, max_share)
+                keep = np.isin(material_rows, rows)
+                rows, shares = material_rows[keep], material_shares[keep]
+            else:
+                rows = np.intersect1d(rows, table.rows_with_composition, assume_unique=True)
+            if len(rows) == 0:
                 return {"message": "No material optimization suggestions available for this product."}
-            # Sort by savings, if any
-            suggestions = sorted(suggestions, key=lambda x: x.get("potential_savings_usd",0), reverse=True)
-            return {"suggestions": suggestions[:3]}
-        except Exception as e:
-            print("MATERIAL OPTIMIZER ERROR:", e)
-            return {"message": f"Internal server error: {str(e)}"}
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
 
+            # Only the candidate rows are converted, not the whole column
+            savings = np.nan_to_num(pd.to_numeric(df['Potential_Savings_USD'].take(rows), errors='coerce')
+                                    .to_numpy(dtype=float)) \
+                if 'Potential_Savings_USD' in df.columns else np.zeros(len(rows))
+            # heapq.nlargest keeps row order on ties, matching a stable sort by savings
+            best = heapq.nlargest(top_k, range(len(rows)), key=savings.__getitem__)
 
+            picked = rows[best]
+            compositions = df['Material_Composition'].take(picked).tolist()
+            primary = df['Primary_Material'].take(picked).tolist()
+            suggestions = []
+            for n, i in enumerate(best):
+                suggestion = {
+                    "materials": compositions[n],
+                    "primary_material": primary[n],
+                    "potential_savings_usd": float(savings[i])
+                }
+                if shares is not None:
+                    suggestion["material_share_pct"] = float(shares[i])
+                suggestions.append(suggestion)
+            return {"suggestions": suggestions}
+        except Exception as e:
+            logger.exception("Material optimization failed for %r", product_name)
+            return {"message": f"Internal server error: {str(e)}"}
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from ..data.hts_index import get_hts_index
+from ..data.store import get_tariff_store
+from ..tools.tariff_calculator import landed_cost_arrays
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+GROUP_COLUMNS = ("Company", "Country_of_Origin", "Port_of_Entry")
+
+
+def _column_codes(snapshot, column):
+    # Dictionary codes for a string column, computed once per snapshot
+    def build(s):
+        series = s.df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.cat.codes.to_numpy(), np.asarray(series.cat.categories, dtype=object)
+        codes, values = pd.factorize(series)
+        return codes, np.asarray(values, dtype=object)
+
+    def patch(previous, s):
+        # Categorical columns already carry their codes; others factorize just
+        # the changed rows and append values not seen before
+        if not s.change.touches([column]):
+            return previous
+        if isinstance(s.df[column].dtype, pd.CategoricalDtype):
+            return build(s)
+        codes, values = previous
+        rows = s.change.changed_rows([column])
+        new_codes, new_values = pd.factorize(s.df[column].iloc[rows])
+        lookup = pd.Index(values).get_indexer(new_values)
+        unseen = lookup < 0
+        lookup[unseen] = np.arange(len(values), len(values) + unseen.sum())
+        values = np.concatenate([values, np.asarray(new_values[unseen], dtype=object)])
+        row_codes = np.full(len(rows), -1, dtype=np.int64)
+        row_codes[new_codes >= 0] = lookup[new_codes[new_codes >= 0]]
+        return s.change.carry(codes, rows, row_codes), values
+
+    return snapshot.derived(f"codes:{column}", build, patch)
+
+
+def _numeric(series):
+    return np.nan_to_num(pd.to_numeric(series, errors="coerce").to_numpy(dtype=float))
+
+
+def _numeric_column(snapshot, column):
+    def patch(previous, s):
+        if not s.change.touches([column]):
+            return previous
+        rows = s.change.changed_rows([column])
+        return s.change.carry(previous, rows, _numeric(s.df[column].iloc[rows]))
+
+    return snapshot.derived(f"numeric:{column}", lambda s: _numeric(s.df[column]), patch)
+
+
+def _matching_codes(values, wanted):
+    if isinstance(wanted, bool):
+        # Yes/No style columns whose "yes" may be spelled as a name (CPTPP, KORUS)
+        return np.flatnonzero([(str(v).strip().casefold() != "no") == wanted for v in values])
+    wanted = str(wanted).strip().casefold()
+    return np.flatnonzero([str(v).casefold() == wanted for v in values])
+
+
+class PolicyShockSimulator:
+    def simulate(self, overrides, top_n=10):
+        # overrides: list of dicts with optional country / hts_prefix /
+        # fta_applicable filters (a bool, or a value such as "CPTPP") and
+        # exactly one of add_points / set_rate.
+        # Later overrides win where they overlap.
+        try:
+            for i, o in enumerate(overrides):
+                if (o.get("add_points") is None) == (o.get("set_rate") is None):
+                    return {"error": f"Override {i} must set exactly one of add_points or set_rate."}
+
+            snapshot = get_tariff_store().snapshot()
+            n = len(snapshot.df)
+            rate = _numeric_column(snapshot, "Tariff_Rate_Percent")
+            material = _numeric_column(snapshot, "Material_Cost_USD")
+            quantity = _numeric_column(snapshot, "Quantity")
+            new_rate = rate.copy()
+
+            for o in overrides:
+                if o.get("hts_prefix"):
+                    rows = get_hts_index(snapshot).prefix(o["hts_prefix"])
+                else:
+                    rows = None
+                conditions = []
+                if o.get("country"):
+                    conditions.append(("Country_of_Origin", o["country"]))
+                if o.get("fta_applicable") is not None:
+                    conditions.append(("FTA_Applicable", o["fta_applicable"]))
+                for column, wanted in conditions:
+                    codes, values = _column_codes(snapshot, column)
+                    ids = _matching_codes(values, wanted)
+                    if rows is None:
+                        rows = np.flatnonzero(np.isin(codes, ids))
+                    else:
+                        rows = rows[np.isin(codes[rows], ids)]
+                if rows is None:
+                    rows = slice(None)
+                if o.get("set_rate") is not None:
+                    new_rate[rows] = o["set_rate"]
+                else:
+                    new_rate[rows] = rate[rows] + o["add_points"]
+            np.clip(new_rate, 0, None, out=new_rate)
+
+            affected = np.flatnonzero(new_rate != rate)
+            if len(affected) == 0:
+                return {"summary": {"rows": n, "rows_affected": 0}, "message": "No rows match these overrides."}
+
+            # Dataset fees are per unit, so re-price one unit and scale by quantity
+            mpf = _numeric_column(snapshot, "MPF_USD")[affected]
+            other = _numeric_column(snapshot, "Other_Fees_USD")[affected]
+            old_landed, _ = landed_cost_arrays(material[affected], 1, rate[affected], mpf, other)
+            new_landed, _ = landed_cost_arrays(material[affected], 1, new_rate[affected], mpf, other)
+            qty = quantity[affected]
+            tariff_delta = material[affected] * (new_rate[affected] - rate[affected]) / 100 * qty
+            landed_delta = (new_landed - old_landed) * qty
+
+            groups = {}
+            for column in GROUP_COLUMNS:
+                if column not in snapshot.df.columns:
+                    continue
+                codes, values = _column_codes(snapshot, column)
+                group_codes = codes[affected]
+                valid = group_codes >= 0
+                size = len(values)
+                rows_hit = np.bincount(group_codes[valid], minlength=size)
+                tariff_sum = np.bincount(group_codes[valid], weights=tariff_delta[valid], minlength=size)
+                landed_sum = np.bincount(group_codes[valid], weights=landed_delta[valid], minlength=size)
+                present = np.flatnonzero(rows_hit)
+                top = present[np.argsort(-np.abs(landed_sum[present]), kind="stable")[:top_n]]
+                groups[column] = [
+                    {
+                        column: values[g],
+                        "rows_affected": int(rows_hit[g]),
+                        "tariff_delta_usd": round(float(tariff_sum[g]), 2),
+                        "landed_cost_delta_usd": round(float(landed_sum[g]), 2),
+                    }
+                    for g in top
+                ]
+
+            return {
+                "summary": {
+                    "rows": n,
+                    "rows_affected": int(len(affected)),
+                    "tariff_delta_usd": round(float(tariff_delta.sum()), 2),
+                    "landed_cost_delta_usd": round(float(landed_delta.sum()), 2),
+                    "mean_rate_before": round(float(rate[affected].mean()), 2),
+                    "mean_rate_after": round(float(new_rate[affected].mean()), 2),
+                },
+                "by_group": groups,
+            }
+        except Exception as e:
+            logger.exception("Policy shock simulation failed")
+            return {"message": f"Internal server error: {str(e)}"}
@@ -1,58 +1,159 @@
-from ..data.loader import load_tariff_data
+import numpy as np
+import pandas as pd
+from ..data.store import get_tariff_store
+from ..data.text_index import get_text_index
+from ..tools.tariff_calculator import landed_cost_arrays
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SCENARIO_COLUMNS = [
+    "Product_Description", "HTS_Code", "Country_of_Origin", "Material_Cost_USD",
+    "Tariff_Rate_Percent", "Landed_Cost_USD", "Primary_Material",
+]
+# Keys whose values the engine computes per scenario; any other returned key is sorted by rank
+SORT_KEYS = ("Landed_Cost_USD", "Tariff_Rate_Percent", "Material_Cost_USD")
+
+
+def _column(df, name, rows):
+    # Only the matched rows are converted, not the whole column
+    return df[name].take(rows).to_numpy() if name in df.columns else np.full(len(rows), None, dtype=object)
+
+
+def _numeric(df, name, rows):
+    if name not in df.columns:
+        return np.zeros(len(rows))
+    return pd.to_numeric(df[name].take(rows), errors="coerce").to_numpy(dtype=float)
+
+
+def _ranks(values):
+    # Text values as their sort rank (missing -> NaN) so top_k_order can sort them
+    values = np.asarray(values, dtype=object)
+    ranks = np.full(len(values), np.nan)
+    present = ~pd.isna(values)
+    ranks[present] = np.unique(values[present].astype(str), return_inverse=True)[1]
+    return ranks
+
+
+def _lower(values):
+    return pd.Series(values, dtype=object).fillna("").astype(str).str.lower()
+
+
+def top_k_order(keys, tie_break, k, descending=False):
+    # Partial selection of the k best entries, then an exact sort of just those.
+    # Every entry tying with the k-th key stays a candidate, so tie_break (not
+    # argpartition) decides which of them make the cut, like a stable sort would.
+    keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+    if len(keys) > k:
+        kth = np.partition(keys, k - 1)[k - 1]
+        candidates = np.flatnonzero(keys <= kth)
+    else:
+        candidates = np.arange(len(keys))
+    return candidates[np.lexsort((tie_break[candidates], keys[candidates]))][:k]
+
+
 class ScenarioSimulator:
-    def simulate(self, product_name, alt_material=None, alt_country=None):
+    def simulate(self, product_name, alt_material=None, alt_country=None,
+                 sort_by="Landed_Cost_USD", direction="asc", top_k=3):
         try:
-            df = load_tariff_data()
-            # Assuming column names in the CSV are like 'Product_Description', 'Landed_Cost_USD', etc.
-            # The user needs to ensure their CSV has these exact column names.
-            mask = df['Product_Description'].str.lower().str.contains(product_name.lower())
-            scenarios = []
-            base_df = df[mask]
-            if base_df.empty:
+            snapshot = get_tariff_store().snapshot()
+            df = snapshot.df
+            returned = [c for c in SCENARIO_COLUMNS if c in df.columns] + ["scenario"]
+            if sort_by not in returned:
+                return {"error": f"Unknown sort_by '{sort_by}'. Use one of: {', '.join(returned)}"}
+            rows = get_text_index(snapshot).search({"Product_Description": product_name})
+            if len(rows) == 0:
                 return {"message": "No data found for this product."}
 
-            for _, row in base_df.iterrows():
-                # Base scenario
-                scenario = {
-                    "Product_Description": row.get("Product_Description"),
-                    "HTS_Code": row.get("HTS_Code"),
-                    "Country_of_Origin": row.get("Country_of_Origin"),
-                    "Material_Cost_USD": row.get("Material_Cost_USD"),
-                    "Tariff_Rate_Percent": row.get("Tariff_Rate_Percent"),
-                    "Landed_Cost_USD": row.get("Landed_Cost_USD"),
-                    "Primary_Material": row.get("Primary_Material"),
-                    "scenario": "current"
-                }
-                scenarios.append(scenario)
-
-                # Alternative Material Scenario
-                if alt_material and (
-                    alt_material.lower() in str(row.get("Material_Composition", "")).lower()
-                    or alt_material.lower() == str(row.get('Primary_Material', "")).lower()
-                ):
-                    alt = scenario.copy()
-                    alt["Primary_Material"] = alt_material
-                    # In a real model, tariff and cost would be recalculated here.
-                    alt["scenario"] = f"alt_material: {alt_material}"
-                    scenarios.append(alt)
-
-                # Alternative Country Scenario
-                if alt_country and (
-                    alt_country.lower() == str(row.get("Alternative_Country", "")).lower()
-                ):
-                    alt = scenario.copy()
-                    alt["Country_of_Origin"] = alt_country
-                    # Simulate a new landed cost by applying the potential savings
-                    alt["Landed_Cost_USD"] = scenario["Landed_Cost_USD"] - float(row.get("Potential_Savings_USD", 0))
-                    alt["scenario"] = f"alt_country: {alt_country}"
-                    scenarios.append(alt)
-            
-            # Sort by landed cost ascending and return the top 3
-            scenarios = sorted(scenarios, key=lambda x: x.get('Landed_Cost_USD', float('inf')))
-            return {"scenarios": scenarios[:3]}
+            n = len(rows)
+            material_cost = _numeric(df, "Material_Cost_USD", rows)
+            rate = _numeric(df, "Tariff_Rate_Percent", rows)
+            landed = _numeric(df, "Landed_Cost_USD", rows)
+            mpf = np.nan_to_num(_numeric(df, "MPF_USD", rows))
+            other_fees = np.nan_to_num(_numeric(df, "Other_Fees_USD", rows))
+            quantity = _numeric(df, "Quantity", rows)
+            savings = np.nan_to_num(_numeric(df, "Potential_Savings_USD", rows))
+
+            # Scenario kinds: 0 = current, 1 = alt material, 2 = alt country.
+            # Each block holds matched-row positions plus the values that differ.
+            positions = [np.arange(n)]
+            kinds = [np.zeros(n, dtype=np.int8)]
+            rates = [rate]
+            landed_costs = [landed]
+
+            if alt_material:
+                needle = alt_material.lower()
+                eligible = (
+                    _lower(_column(df, "Material_Composition", rows)).str.contains(needle, regex=False)
+                    | (_lower(_column(df, "Primary_Material", rows)) == needle)
+                ).to_numpy()
+                idx = np.flatnonzero(eligible)
+                # No per-material duty data: price and rate carry over unchanged
+                positions.append(idx)
+                kinds.append(np.ones(len(idx), dtype=np.int8))
+                rates.append(rate[idx])
+                landed_costs.append(landed[idx])
+
+            if alt_country:
+                eligible = (_lower(_column(df, "Alternative_Country", rows)) == alt_country.lower()).to_numpy()
+                idx = np.flatnonzero(eligible)
+                # Potential_Savings_USD is for the whole shipment; spread it per unit
+                # and express it as a lower duty rate, then re-price one unit
+                # (dataset MPF/other fees are already per unit).
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    rate_cut = savings[idx] / quantity[idx] / material_cost[idx] * 100
+                alt_rate = np.clip(rate[idx] - np.nan_to_num(rate_cut), 0, None)
+                alt_landed, _ = landed_cost_arrays(material_cost[idx], 1, alt_rate, mpf[idx], other_fees[idx])
+                positions.append(idx)
+                kinds.append(np.full(len(idx), 2, dtype=np.int8))
+                rates.append(np.round(alt_rate, 2))
+                landed_costs.append(np.round(alt_landed, 2))
+
+            position = np.concatenate(positions)
+            kind = np.concatenate(kinds)
+            values = {
+                "Tariff_Rate_Percent": np.concatenate(rates),
+                "Landed_Cost_USD": np.concatenate(landed_costs),
+                "Material_Cost_USD": material_cost[position],
+            }
+            if sort_by in SORT_KEYS:
+                keys = values[sort_by]
+            else:
+                keys = _ranks(self._text_values(df, rows, position, kind, sort_by, alt_material, alt_country))
+            order = top_k_order(keys, position * 3 + kind, top_k, direction.lower() == "desc")
+            return {"scenarios": self._materialize(df, rows, position[order], kind[order], values, order,
+                                                   alt_material, alt_country)}
 
         except Exception as e:
-            print("SCENARIO SIM ERROR:", e)
+            logger.exception("Scenario simulation failed for %r", product_name)
             return {"message": f"Internal server error: {str(e)}"}
-        
-    #C:\Users\visha\OneDrive\Desktop\tarrifchatbot\tariff_management_chatbot
\ No newline at end of file
+
+    @staticmethod
+    def _scenario_labels(alt_material, alt_country):
+        return np.array(["current", f"alt_material: {alt_material}", f"alt_country: {alt_country}"], dtype=object)
+
+    def _text_values(self, df, rows, position, kind, name, alt_material, alt_country):
+        # The returned values of a text key for every scenario, overrides included
+        if name == "scenario":
+            return self._scenario_labels(alt_material, alt_country)[kind]
+        values = _column(df, name, rows)[position].astype(object)
+        if name == "Primary_Material":
+            values[kind == 1] = alt_material
+        elif name == "Country_of_Origin":
+            values[kind == 2] = alt_country
+        return values
+
+    def _materialize(self, df, rows, position, kind, values, order, alt_material, alt_country):
+        selected = df.iloc[rows[position]]
+        labels = self._scenario_labels(alt_material, alt_country)
+        scenarios = []
+        for i, record in enumerate(selected[[c for c in SCENARIO_COLUMNS if c in df.columns]].to_dict(orient="records")):
+            record["Tariff_Rate_Percent"] = float(values["Tariff_Rate_Percent"][order[i]])
+            record["Landed_Cost_USD"] = float(values["Landed_Cost_USD"][order[i]])
+            if kind[i] == 1:
+                record["Primary_Material"] = alt_material
+            elif kind[i] == 2:
+                record["Country_of_Origin"] = alt_country
+            record["scenario"] = labels[kind[i]]
+            scenarios.append(record)
+        return scenarios
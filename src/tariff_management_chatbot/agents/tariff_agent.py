@@ -1,12 +1,27 @@
+import math
+
+import numpy as np
+import pandas as pd
+from ..tools.tariff_calculator import landed_cost_arrays
+
+LINE_FIELDS = ("material_cost_usd", "quantity", "tariff_rate_percent", "mpf_usd", "other_fees_usd")
+
+
+def _as_float(values):
+    # Blank or non-numeric cells (e.g. from an uploaded CSV) become NaN and are reported per line
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+
+
 class TariffAgent:
     def calculate_tariff(self, material_cost_usd, quantity, tariff_rate_percent, mpf_usd=0.0, other_fees_usd=0.0):
         if quantity == 0:
             return {"error": "Quantity cannot be zero."}
-        landed_cost_per_unit = float(material_cost_usd) * (1 + float(tariff_rate_percent) / 100) + (float(mpf_usd) + float(other_fees_usd)) / float(quantity)
-        total_landed_cost = landed_cost_per_unit * float(quantity)
+        landed_cost_per_unit, total_landed_cost = landed_cost_arrays(
+            material_cost_usd, quantity, tariff_rate_percent, mpf_usd, other_fees_usd
+        )
         return {
-            "landed_cost_per_unit": round(landed_cost_per_unit, 2),
-            "total_landed_cost": round(total_landed_cost, 2),
+            "landed_cost_per_unit": round(float(landed_cost_per_unit), 2),
+            "total_landed_cost": round(float(total_landed_cost), 2),
             "details": {
                 "material_cost_usd": material_cost_usd,
                 "quantity": quantity,
@@ -15,3 +30,49 @@ class TariffAgent:
                 "other_fees_usd": other_fees_usd
             }
         }
+
+    def calculate_batch(self, material_cost_usd, quantity, tariff_rate_percent, mpf_usd=None, other_fees_usd=None):
+        # One vectorized pass over all line items; zero quantities and
+        # missing, non-numeric or infinite values are reported per line
+        # instead of failing the whole batch.
+        material = _as_float(material_cost_usd)
+        n = len(material)
+        qty = _as_float(quantity)
+        rate = _as_float(tariff_rate_percent)
+        mpf = np.zeros(n) if mpf_usd is None else _as_float(mpf_usd)
+        other = np.zeros(n) if other_fees_usd is None else _as_float(other_fees_usd)
+        lengths = {len(qty), len(rate), len(mpf), len(other)}
+        if lengths != {n}:
+            return {"error": "All line item arrays must have the same length."}
+
+        per_unit, total = landed_cost_arrays(material, qty, rate, mpf, other)
+        per_unit_rounded = np.round(per_unit, 2).tolist()
+        total_rounded = np.round(total, 2).tolist()
+        inputs = dict(zip(LINE_FIELDS, (a.tolist() for a in (material, qty, rate, mpf, other))))
+        valid = np.ones(n, dtype=bool)
+        lines = []
+        for i in range(n):
+            bad = [name for name, column in inputs.items() if not math.isfinite(column[i])]
+            if bad:
+                error = f"Missing or non-finite value for {', '.join(bad)}."
+            elif inputs["quantity"][i] == 0:
+                error = "Quantity cannot be zero."
+            else:
+                lines.append({
+                    "line": i,
+                    "landed_cost_per_unit": per_unit_rounded[i],
+                    "total_landed_cost": total_rounded[i]
+                })
+                continue
+            valid[i] = False
+            lines.append({"line": i, "error": error})
+        return {
+            "lines": lines,
+            "totals": {
+                "line_count": n,
+                "valid_lines": int(valid.sum()),
+                "invalid_lines": int(n - valid.sum()),
+                "total_quantity": float(qty[valid].sum()),
+                "total_landed_cost": round(float(total[valid].sum()), 2)
+            }
+        }
@@ -1,9 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .endpoints import router as api_router
+from ..config.config import WARMUP_ON_STARTUP
+from .endpoints import chat_llm, router as api_router
+from .middleware import MetricsMiddleware
+from ..utils.executor import shutdown_cpu_pool
+from ..utils.semantic_search import async_embeddings
+from .warmup import warmup
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load data, indexes and vectors in the background; /ready reports progress
+    if WARMUP_ON_STARTUP:
+        warmup.start()
+    yield
+    await async_embeddings.aclose()
+    await chat_llm.aclose()
+    shutdown_cpu_pool(wait=False)
 
 app = FastAPI(
     title="Tariff Management Chatbot",
     description="API for AI-powered tariff management",
-    version="0.1"
+    version="0.1",
+    lifespan=lifespan
 )
-app.include_router(api_router)
\ No newline at end of file
+app.add_middleware(MetricsMiddleware)
+app.include_router(api_router)
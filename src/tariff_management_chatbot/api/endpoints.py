@@ -1,20 +1,62 @@
-from fastapi import APIRouter, Query
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, File, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from ..agents.tariff_agent import TariffAgent
-from ..data.loader import load_tariff_data
+from ..data.delta import apply_delta
+from ..data.store import get_tariff_store
+from ..data.text_index import get_text_index
+from ..data.hts_index import HTS_LEVELS, get_hts_index, normalize_hts
+from ..data.sql_store import get_sql_backend
+from ..config.config import STORAGE_BACKEND
 from ..agents.material_optimizer import MaterialOptimizer
 from ..agents.scenario_simulator import ScenarioSimulator
-from ..utils.semantic_search import semantic_search
+from ..agents.policy_shock import PolicyShockSimulator
+from ..crew.crew_manager import build_tariff_workflow
+from ..utils.chat import build_context, get_chat_llm, stream_chat
+from ..utils.executor import run_in_cpu_pool
+from ..utils.llm_cache import get_llm_cache
+from ..utils.metrics import render_metrics
+from ..utils.semantic_search import asemantic_search, query_cache
+from ..utils.export import EXPORT_FORMATS, gzip_chunks, iter_export_chunks
+from ..utils.serialization import (
+    MAX_PAGE_SIZE, cursor_page, cursor_scope, decode_cursor, page_response, parse_column_names, parse_columns,
+)
+from .schemas import ChatRequest, LineItemBatch, PolicyShock
+from .warmup import warmup
 
 router = APIRouter()
 
 agent = TariffAgent()
 material_optimizer = MaterialOptimizer()
 simulator = ScenarioSimulator()
+policy_shock = PolicyShockSimulator()
+chat_llm = get_chat_llm()
+workflow = build_tariff_workflow(agent, material_optimizer, simulator)
 
 @router.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@router.get("/ready")
+def readiness_check():
+    # Liveness stays on /health; this one gates traffic until warm-up is done
+    report = warmup.report()
+    if not warmup.started:
+        report["ready"] = True
+        report["message"] = "Warm-up disabled; components load on first use."
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@router.get("/cache-stats")
+def cache_stats():
+    return {"query_embeddings": query_cache.stats(), "llm_responses": get_llm_cache().stats()}
+
+@router.get("/metrics")
+def metrics():
+    # Prometheus scrape target: request/stage latency histograms, OpenAI call
+    # counts, query cache hit ratio and dataset version
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @router.get("/calculate-tariff")
 def calculate_tariff(
     material_cost_usd: float = Query(...),
@@ -25,36 +67,195 @@ def calculate_tariff(
 ):
     return agent.calculate_tariff(material_cost_usd, quantity, tariff_rate_percent, mpf_usd, other_fees_usd)
 
+@router.post("/calculate-tariff/batch")
+def calculate_tariff_batch(items: LineItemBatch):
+    return agent.calculate_batch(
+        items.material_cost_usd, items.quantity, items.tariff_rate_percent, items.mpf_usd, items.other_fees_usd
+    )
+
+BATCH_CSV_COLUMNS = ["material_cost_usd", "quantity", "tariff_rate_percent"]
+
+@router.post("/calculate-tariff/batch-csv")
+def calculate_tariff_batch_csv(file: UploadFile = File(...)):
+    try:
+        items = pd.read_csv(file.file)
+    except Exception as e:
+        return {"error": f"Could not read CSV: {e}"}
+    missing = [c for c in BATCH_CSV_COLUMNS if c not in items.columns]
+    if missing:
+        return {"error": f"Missing required columns: {', '.join(missing)}"}
+    items = items.fillna({"mpf_usd": 0.0, "other_fees_usd": 0.0})
+    return agent.calculate_batch(
+        items["material_cost_usd"], items["quantity"], items["tariff_rate_percent"],
+        items["mpf_usd"] if "mpf_usd" in items.columns else None,
+        items["other_fees_usd"] if "other_fees_usd" in items.columns else None
+    )
+
+def _sql_page(query, offset, cursor, columns, scope, not_found, extra=None):
+    # Same response shape as page_response, served by the SQLite backend.
+    # extra(backend) returns more response fields; like query it only runs
+    # once the backend has ingested the current CSV.
+    backend = get_sql_backend()
+    backend.ensure_ingested(get_tariff_store().csv_file)
+    version = backend.version
+    try:
+        if cursor:
+            offset, columns = decode_cursor(cursor, version, scope, columns)
+        names = parse_column_names(backend.columns(), columns)
+    except ValueError as e:
+        return {"error": str(e)}
+    total, results = query(backend, offset, names)
+    if total == 0:
+        return not_found
+    return cursor_page(version, total, offset, results, scope, columns,
+                       **(extra(backend) if extra is not None else {}))
+
 @router.get("/hts-lookup")
-def hts_lookup(hts_code: str):
-    df = load_tariff_data()
-    results = df[df['HTS_Code'].astype(str) == str(hts_code)].to_dict(orient='records')
-    if not results:
+def hts_lookup(
+    hts_code: str,
+    limit: int = Query(5, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = "",
+    columns: str = ""
+):
+    scope = cursor_scope("hts-lookup", hts_code=hts_code)
+    if STORAGE_BACKEND == "sqlite":
+        return _sql_page(lambda b, off, cols: b.hts_lookup(normalize_hts(hts_code), limit, off, cols),
+                         offset, cursor, columns, scope, {"error": "HTS code not found"})
+    snapshot = get_tariff_store().snapshot()
+    rows = get_hts_index(snapshot).lookup(hts_code)
+    if len(rows) == 0:
         return {"error": "HTS code not found"}
-    return {"count": len(results), "results": results[:5]}
+    return page_response(snapshot, rows, limit, offset, cursor, columns, scope)
+
+@router.get("/hts-range")
+def hts_range(
+    hts_prefix: str,
+    level: str = "",
+    limit: int = Query(5, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = "",
+    columns: str = ""
+):
+    if level and level not in HTS_LEVELS:
+        return {"error": f"Unknown level '{level}'. Use one of: {', '.join(HTS_LEVELS)}"}
+    scope = cursor_scope("hts-range", hts_prefix=hts_prefix, level=level)
+    if STORAGE_BACKEND == "sqlite":
+        prefix = normalize_hts(hts_prefix)
+        if not prefix:
+            return {"error": "No HTS codes found under this prefix"}
+        return _sql_page(lambda b, off, cols: b.hts_prefix(prefix, limit, off, cols, level or None),
+                         offset, cursor, columns, scope, {"error": "No HTS codes found under this prefix"},
+                         extra=lambda b: {"codes": b.hts_breakdown(prefix, level or None)})
+    snapshot = get_tariff_store().snapshot()
+    index = get_hts_index(snapshot)
+    rows = index.prefix(hts_prefix, level or None)
+    if len(rows) == 0:
+        return {"error": "No HTS codes found under this prefix"}
+    return page_response(snapshot, rows, limit, offset, cursor, columns, scope,
+                         codes=index.breakdown(hts_prefix, level or None))
 
 @router.get("/product-search")
 def product_search(
     product_name: str = "",
     company_name: str = "",
-    country_of_origin: str = ""
+    country_of_origin: str = "",
+    limit: int = Query(5, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = "",
+    columns: str = ""
 ):
-    df = load_tariff_data()
-    query = df
-    if product_name:
-        query = query[query['Product_Description'].str.contains(product_name, case=False, na=False)]
-    if company_name:
-        query = query[query['Company'].str.contains(company_name, case=False, na=False)]
-    if country_of_origin:
-        query = query[query['Country_of_Origin'].str.contains(country_of_origin, case=False, na=False)]
-    results = query.to_dict(orient='records')
-    if not results:
-        return {"count": 0, "results": [], "message": "No matching products found."}
-    return {"count": len(results), "results": results[:5]}
+    filters = {
+        "Product_Description": product_name,
+        "Company": company_name,
+        "Country_of_Origin": country_of_origin,
+    }
+    not_found = {"count": 0, "results": [], "message": "No matching products found."}
+    scope = cursor_scope("product-search", **filters)
+    if STORAGE_BACKEND == "sqlite":
+        return _sql_page(lambda b, off, cols: b.search_products(filters, limit, off, cols),
+                         offset, cursor, columns, scope, not_found)
+    snapshot = get_tariff_store().snapshot()
+    rows = get_text_index(snapshot).search(filters)
+    if len(rows) == 0:
+        return not_found
+    return page_response(snapshot, rows, limit, offset, cursor, columns, scope)
+
+def _export_rows(snapshot, product_name, company_name, country_of_origin, hts_prefix, level):
+    rows = get_text_index(snapshot).search({
+        "Product_Description": product_name,
+        "Company": company_name,
+        "Country_of_Origin": country_of_origin,
+    })
+    if hts_prefix:
+        hts_rows = np.sort(get_hts_index(snapshot).prefix(hts_prefix, level or None))
+        rows = np.intersect1d(rows, hts_rows, assume_unique=True)
+    return rows
+
+@router.get("/export")
+async def export_rows(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format"),
+    product_name: str = "",
+    company_name: str = "",
+    country_of_origin: str = "",
+    hts_prefix: str = "",
+    level: str = "",
+    columns: str = "",
+    gzip: bool = False
+):
+    if fmt not in EXPORT_FORMATS:
+        return {"error": f"Unknown format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}"}
+    if level and level not in HTS_LEVELS:
+        return {"error": f"Unknown level '{level}'. Use one of: {', '.join(HTS_LEVELS)}"}
+    snapshot = get_tariff_store().snapshot()
+    try:
+        positions = parse_columns(snapshot.df, columns)
+    except ValueError as e:
+        return {"error": str(e)}
+    rows = await run_in_cpu_pool(
+        _export_rows, snapshot, product_name, company_name, country_of_origin, hts_prefix, level
+    )
+    chunks = iter_export_chunks(snapshot.df, rows, positions, fmt)
+    if gzip:
+        chunks = gzip_chunks(chunks)
+
+    async def stream():
+        # Encode one chunk at a time off the event loop; stop as soon as the client goes away
+        while not await request.is_disconnected():
+            chunk = await run_in_cpu_pool(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+
+    filename = f"tariffs-export.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream(),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Total-Count": str(len(rows))}
+    )
+
+@router.post("/ingest/delta")
+def ingest_delta(file: UploadFile = File(...)):
+    # Upserts/deletes keyed by Record_ID; publishes a new dataset version
+    try:
+        return apply_delta(file.file)
+    except ValueError as e:
+        return {"error": str(e)}
 
 @router.get("/material-optimization")
-def material_optimization(product_name: str, hts_code: str = ""):
-    return material_optimizer.suggest_materials(product_name, hts_code if hts_code else None)
+def material_optimization(
+    product_name: str,
+    hts_code: str = "",
+    material: str = "",
+    min_share: float = Query(None, ge=0, le=100),
+    max_share: float = Query(None, ge=0, le=100)
+):
+    if not material and (min_share is not None or max_share is not None):
+        return {"error": "min_share and max_share need a material."}
+    return material_optimizer.suggest_materials(
+        product_name, hts_code if hts_code else None, material or None, min_share, max_share
+    )
 
 @router.get("/scenario-simulation")
 def scenario_simulation(
@@ -64,38 +265,69 @@ def scenario_simulation(
     sort_by: str = Query("Landed_Cost_USD"),
     direction: str = Query("asc")
 ):
-    result = simulator.simulate(product_name, alt_material or None, alt_country or None)
-    if "scenarios" in result and result["scenarios"]:
-        if sort_by in result["scenarios"][0]:
-            reverse = direction.lower() == "desc"
-            result["scenarios"] = sorted(result["scenarios"], key=lambda x: x.get(sort_by, 0), reverse=reverse)
-        result["scenarios"] = result["scenarios"][:3]
-    return result
+    return simulator.simulate(product_name, alt_material or None, alt_country or None, sort_by, direction)
+
+@router.post("/policy-shock")
+def policy_shock_simulation(shock: PolicyShock):
+    overrides = [o.model_dump() for o in shock.overrides]
+    return policy_shock.simulate(overrides, shock.top_n)
+
+@router.get("/tariff-workflow")
+async def tariff_workflow(
+    query: str = "",
+    product_name: str = "",
+    alt_material: str = "",
+    alt_country: str = "",
+    quantity: int = Query(1, ge=1),
+    mpf_usd: float = 0.0,
+    other_fees_usd: float = 0.0,
+    sort_by: str = "Landed_Cost_USD",
+    direction: str = "asc",
+    top_n: int = Query(3, ge=1, le=50)
+):
+    # Search, scenarios, material options and landed cost for one product in a
+    # single call; the last three run concurrently off the shared product match
+    if not query and not product_name:
+        return {"error": "Provide a query or a product_name."}
+    return await workflow.orchestrate({
+        "query": query,
+        "product_name": product_name,
+        "alt_material": alt_material or None,
+        "alt_country": alt_country or None,
+        "quantity": quantity,
+        "mpf_usd": mpf_usd,
+        "other_fees_usd": other_fees_usd,
+        "sort_by": sort_by,
+        "direction": direction,
+        "top_n": top_n,
+    })
 
 @router.get("/smart-product-search")
-def smart_product_search(query: str, top_n: int = 3):
+async def smart_product_search(query: str, top_n: int = 3):
     try:
-        results = semantic_search(query, top_n)
+        results = await asemantic_search(query, top_n)
         return {"results": results}
     except Exception as e:
         import traceback
         return {"error": str(e), "trace": traceback.format_exc()}
 
 @router.get("/semantic-scenario-simulation")
-def semantic_scenario_simulation(
+async def semantic_scenario_simulation(
     query: str,
     top_n: int = 1,
     sort_by: str = "Landed_Cost_USD",
     direction: str = "asc"
 ):
     try:
-        matches = semantic_search(query, top_n)
+        matches = await asemantic_search(query, top_n)
         if not matches:
             return {"message": "No product matches found for your query."}
         scenarios_all = []
         for match in matches:
             product_name = match["Product_Description"]
-            scenarios = simulator.simulate(product_name)
+            scenarios = await run_in_cpu_pool(simulator.simulate, product_name, sort_by=sort_by, direction=direction)
+            if "error" in scenarios:
+                return scenarios
             if "scenarios" in scenarios:
                 scenarios_all.extend(scenarios["scenarios"])
         reverse = direction == "desc"
@@ -106,11 +338,12 @@ def semantic_scenario_simulation(
         return {"error": str(e), "trace": traceback.format_exc()}
 
 @router.get("/semantic-tariff-lookup")
-def semantic_tariff_lookup(query: str, top_n: int = 3):
+async def semantic_tariff_lookup(query: str, top_n: int = 3):
     try:
-        matches = semantic_search(query, top_n)
+        matches = await asemantic_search(query, top_n)
         rows = [
             {
+                "Record_ID": m["Record_ID"],
                 "Product_Description": m["Product_Description"],
                 "HTS_Code": m["HTS_Code"],
                 "Tariff_Rate_Percent": m["Tariff_Rate_Percent"],
@@ -123,3 +356,15 @@ def semantic_tariff_lookup(query: str, top_n: int = 3):
     except Exception as e:
         import traceback
         return {"error": str(e), "trace": traceback.format_exc()}
+
+@router.post("/chat")
+async def chat(request: Request, body: ChatRequest):
+    # Streams the advisor's answer as Server-Sent Events: {"token": ...} per
+    # chunk, then a "done" event with what went into the context
+    snapshot = get_tariff_store().snapshot()
+    context, info = await run_in_cpu_pool(build_context, snapshot, body.record_ids, body.data)
+    return StreamingResponse(
+        stream_chat(chat_llm, body.feature, context, body.question, info, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
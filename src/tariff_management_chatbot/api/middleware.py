@@ -0,0 +1,31 @@
+import time
+
+from ..utils.metrics import REQUEST_SECONDS
+
+
+class MetricsMiddleware:
+    # Plain ASGI so streamed responses are timed until their last chunk and
+    # disconnect detection in streaming endpoints keeps working.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template, not raw path, to keep series bounded
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path, str(status))
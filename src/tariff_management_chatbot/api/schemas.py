@@ -0,0 +1,34 @@
+from typing import Any, List, Optional, Union
+from pydantic import BaseModel, Field
+
+
+class LineItemBatch(BaseModel):
+    material_cost_usd: List[float]
+    quantity: List[int]
+    tariff_rate_percent: List[float]
+    mpf_usd: Optional[List[float]] = None
+    other_fees_usd: Optional[List[float]] = None
+
+
+class RateOverride(BaseModel):
+    country: Optional[str] = None
+    hts_prefix: Optional[str] = None
+    # FTA_Applicable holds "No", "Yes" or an agreement name ("CPTPP", "KORUS"):
+    # a string matches that value, true any agreement and false "No"
+    fta_applicable: Optional[Union[bool, str]] = None
+    add_points: Optional[float] = None
+    set_rate: Optional[float] = None
+
+
+class PolicyShock(BaseModel):
+    overrides: List[RateOverride]
+    top_n: int = Field(10, ge=1, le=100)
+
+
+class ChatRequest(BaseModel):
+    question: str
+    feature: str = "tariff analysis"
+    # Dataset rows the answer should draw on; the server looks them up itself
+    record_ids: List[str] = Field(default_factory=list, max_length=1000)
+    # Computed results with no Record_ID (scenarios, suggestions, calculations)
+    data: Optional[Any] = None
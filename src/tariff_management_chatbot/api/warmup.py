@@ -0,0 +1,66 @@
+import threading
+import time
+
+from ..data.hts_index import get_hts_index
+from ..data.materials import get_material_table
+from ..data.store import get_tariff_store
+from ..data.text_index import get_text_index
+from ..utils.semantic_search import load_embeddings
+
+
+def _snapshot():
+    return get_tariff_store().snapshot()
+
+
+# Loaded in order; later components build on the dataset snapshot
+COMPONENTS = [
+    ("dataset", _snapshot),
+    ("text_index", lambda: get_text_index(_snapshot())),
+    ("hts_index", lambda: get_hts_index(_snapshot())),
+    ("material_table", lambda: get_material_table(_snapshot())),
+    ("vector_store", load_embeddings),
+]
+
+
+class Warmup:
+    def __init__(self, components=COMPONENTS):
+        self.components = components
+        self.started = False
+        self.state = {name: {"status": "pending", "seconds": None} for name, _ in components}
+        self._thread = None
+
+    @property
+    def ready(self):
+        return all(c["status"] == "ready" for c in self.state.values())
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.started = True
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for name, load in self.components:
+            entry = self.state[name]
+            entry["status"] = "loading"
+            start = time.perf_counter()
+            try:
+                load()
+                entry["status"] = "ready"
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+
+    def wait(self, timeout=None):
+        # Blocks until every component has finished loading (or failed)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def report(self):
+        return {"ready": self.ready, "components": {name: dict(c) for name, c in self.state.items()}}
+
+
+warmup = Warmup()
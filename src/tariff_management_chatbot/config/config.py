@@ -3,16 +3,59 @@ from dotenv import load_dotenv
 import openai
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Path of the tariff dataset, relative to the project root unless absolute
+TARIFF_CSV = os.getenv("TARIFF_CSV", os.path.join("data", "tariffs.csv"))
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/tariffs.db")
+# "pandas" (in-memory frame + indexes) or "sqlite" (DATABASE_URL with B-tree and FTS5 indexes).
+# sqlite only serves the lookup/search endpoints; everything else still loads the full frame.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "pandas").lower()
+# Applied deltas are journaled next to the CSV; after this many the CSV is rewritten and the journal cleared
+DELTA_COMPACT_AFTER = int(os.getenv("DELTA_COMPACT_AFTER", "20"))
+SQL_POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "5"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join("data", "embeddings"))
+# "openai" (network) or "hashing" (local, CPU-only)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+# Upper bound on simultaneous embedding calls (and pooled connections) to OpenAI
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# Worker threads for pandas/NumPy work started from async endpoints
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+# Vector tables smaller than this are searched exactly; larger ones use IVF
+ANN_EXACT_THRESHOLD = int(os.getenv("ANN_EXACT_THRESHOLD", "20000"))
+# IVF lists scanned per query: higher means better recall and slower queries
+ANN_N_PROBE = int(os.getenv("ANN_N_PROBE", "8"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("data", "llm_cache.db"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+# Cosine similarity for reusing an answer to a near-identical question about
+# the same results; 0 disables near-duplicate matching
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+# "openai" (streaming chat completions) or "stub" (local canned replies, for tests and offline runs)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-3.5-turbo")
+# Approximate token budget for the result rows sent with a /chat question
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1200"))
+# Seconds any one step of a /tariff-workflow run may take before it is reported as timed out
+CREW_NODE_TIMEOUT = float(os.getenv("CREW_NODE_TIMEOUT", "15"))
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
 openai.api_key = OPENAI_API_KEY
 def ask_gpt35(prompt):
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",  
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=500
-    )
-    return response['choices'][0]['message']['content']
\ No newline at end of file
+    from ..utils.llm_cache import get_llm_cache
+    from ..utils.metrics import openai_call
+    model = "gpt-3.5-turbo"
+    params = {"temperature": 0.7, "max_tokens": 500}
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+    def call():
+        with openai_call("chat"):
+            response = openai.ChatCompletion.create(model=model, messages=messages, **params)
+        return response['choices'][0]['message']['content']
+
+    return get_llm_cache().get_or_call(call, model, params, messages)
\ No newline at end of file
@@ -1,5 +1,164 @@
-# Placeholder for CrewAI orchestration logic
+import asyncio
+import time
+
+import numpy as np
+
+from ..config.config import CREW_NODE_TIMEOUT
+from ..data.store import get_tariff_store
+from ..data.text_index import get_text_index
+from ..utils.executor import run_in_cpu_pool
+from ..utils.logger import get_logger
+from ..utils.metrics import stage
+from ..utils.semantic_search import asemantic_search
+
+logger = get_logger(__name__)
+
+PRODUCT_FIELDS = [
+    "Record_ID", "Product_Description", "HTS_Code", "Country_of_Origin",
+    "Material_Cost_USD", "Tariff_Rate_Percent", "Landed_Cost_USD",
+]
+
+
+class Node:
+    # One step of a workflow: fn(inputs, memo) -> result, where memo holds the
+    # results of every node finished so far in the same request. Coroutine
+    # functions run on the event loop, plain functions on the CPU pool.
+    def __init__(self, name, fn, deps=(), timeout=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+
+
 class CrewManager:
-    def orchestrate(self):
-        # This will coordinate agents in a workflow
-        pass
+    # Runs a dependency graph of agent calls. Every node starts as soon as its
+    # dependencies finish, so independent nodes run concurrently; a node whose
+    # dependency failed or timed out is skipped rather than run on bad input.
+    def __init__(self, nodes=(), timeout=CREW_NODE_TIMEOUT):
+        self.nodes = {}
+        self.timeout = timeout
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        # Dependencies must be added first, which also rules out cycles
+        unknown = [d for d in node.deps if d not in self.nodes]
+        if unknown:
+            raise ValueError(f"Node '{node.name}' depends on unknown nodes: {', '.join(unknown)}")
+        if node.name in self.nodes:
+            raise ValueError(f"Node '{node.name}' is already defined")
+        self.nodes[node.name] = node
+        return self
+
+    def _needed(self, targets):
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.nodes:
+                raise ValueError(f"Unknown node '{name}'")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.nodes[name].deps)
+        return needed
+
+    async def _run(self, node, inputs, memo, tasks, errors, timings):
+        for dep in node.deps:
+            await tasks[dep]
+        failed = [d for d in node.deps if d in errors]
+        if failed:
+            errors[node.name] = f"skipped: {', '.join(failed)} failed"
+            return
+        timeout = node.timeout or self.timeout
+        started = time.perf_counter()
+        try:
+            with stage(f"crew_{node.name}"):
+                if asyncio.iscoroutinefunction(node.fn):
+                    call = node.fn(inputs, memo)
+                else:
+                    call = run_in_cpu_pool(node.fn, inputs, memo)
+                # On timeout a pool thread finishes in the background; its result is dropped
+                memo[node.name] = await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            errors[node.name] = f"timed out after {timeout:g}s"
+        except ValueError as e:
+            # Expected outcomes such as "no matching product": reported, not logged
+            errors[node.name] = str(e)
+        except Exception as e:
+            logger.exception("Workflow node %r failed", node.name)
+            errors[node.name] = str(e)
+        finally:
+            timings[node.name] = round((time.perf_counter() - started) * 1000, 2)
+
+    async def orchestrate(self, inputs, targets=None):
+        # Runs the nodes needed for targets (default: all) for one request
+        started = time.perf_counter()
+        needed = self._needed(targets or self.nodes)
+        memo, errors, timings, tasks = {}, {}, {}, {}
+        # Insertion order is a topological order, so dependencies get their tasks first
+        for name, node in self.nodes.items():
+            if name in needed:
+                tasks[name] = asyncio.ensure_future(self._run(node, inputs, memo, tasks, errors, timings))
+        await asyncio.gather(*tasks.values())
+        return {
+            "results": {name: memo[name] for name in self.nodes if name in memo},
+            "errors": errors,
+            "timings_ms": {**timings, "total": round((time.perf_counter() - started) * 1000, 2)},
+        }
+
+
+def _number(value):
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _product_record(row):
+    return {k: (_number(v) if k.endswith(("_USD", "_Percent")) else v) for k, v in row.items() if k in PRODUCT_FIELDS}
+
+
+def build_tariff_workflow(agent, material_optimizer, simulator, timeout=CREW_NODE_TIMEOUT):
+    # query/product_name -> one product match, which then feeds scenario
+    # simulation, material optimization and the landed-cost calculation at once
+    async def matches(inputs, memo):
+        if not inputs.get("query"):
+            return []
+        return await asemantic_search(inputs["query"], inputs.get("top_n", 3))
+
+    def product(inputs, memo):
+        if inputs.get("product_name"):
+            snapshot = get_tariff_store().snapshot()
+            rows = get_text_index(snapshot).search({"Product_Description": inputs["product_name"]})
+            if len(rows) == 0:
+                raise ValueError(f"No data found for product '{inputs['product_name']}'.")
+            return _product_record(snapshot.df.iloc[int(rows[0])].to_dict())
+        if not memo["matches"]:
+            raise ValueError("No product matches found for your query.")
+        return _product_record(memo["matches"][0])
+
+    def scenarios(inputs, memo):
+        return simulator.simulate(
+            memo["product"]["Product_Description"], inputs.get("alt_material"), inputs.get("alt_country"),
+            inputs.get("sort_by", "Landed_Cost_USD"), inputs.get("direction", "asc")
+        )
+
+    def materials(inputs, memo):
+        return material_optimizer.suggest_materials(
+            memo["product"]["Product_Description"], memo["product"].get("HTS_Code")
+        )
+
+    def landed_cost(inputs, memo):
+        match = memo["product"]
+        return agent.calculate_tariff(
+            match["Material_Cost_USD"] or 0.0, inputs.get("quantity", 1), match["Tariff_Rate_Percent"] or 0.0,
+            inputs.get("mpf_usd", 0.0), inputs.get("other_fees_usd", 0.0)
+        )
+
+    return CrewManager([
+        Node("matches", matches),
+        Node("product", product, deps=["matches"]),
+        Node("scenarios", scenarios, deps=["product"]),
+        Node("materials", materials, deps=["product"]),
+        Node("landed_cost", landed_cost, deps=["product"]),
+    ], timeout=timeout)
@@ -0,0 +1,250 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ..config.config import DELTA_COMPACT_AFTER, STORAGE_BACKEND
+from .loader import default_journal_path, journal_files
+from .row_groups import RowChange
+from .snapshot import compile_snapshot, default_snapshot_path
+from .sql_store import get_sql_backend
+from .store import get_tariff_store
+
+KEY = "Record_ID"
+OPERATION = "Operation"  # optional delta column: "upsert" (default) or "delete"
+# Serializes deltas so each one merges against the version the previous one published
+_apply_lock = threading.Lock()
+
+
+def _timestamps(series):
+    return pd.to_datetime(pd.Series(np.asarray(series, dtype=object)), errors="coerce", format="mixed")
+
+
+def _column_array(series):
+    # NumPy columns as ndarrays (memory-mapped ones stay views), the rest as
+    # their extension arrays (Categorical, StringArray, ...)
+    return series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array
+
+
+def _common_dtype(array, values):
+    if array.dtype.kind in "iu" and values.dtype.kind == "f" and np.isfinite(values).all() \
+            and (values == np.round(values)).all():
+        # Whole numbers read as float because other delta rows left the column empty
+        return array.dtype
+    if values.dtype == array.dtype:
+        return array.dtype
+    if array.dtype.kind in "biuf" and values.dtype.kind in "biuf":
+        return np.result_type(array.dtype, values.dtype)
+    return np.dtype(object)
+
+
+def _with_categories(array, values):
+    values = pd.unique(values[pd.notna(values)])
+    new = values[array.categories.get_indexer(values) < 0]
+    return array.add_categories(new) if len(new) else array
+
+
+def _assign(array, rows, values):
+    # Copy of array with array[rows] = values, keeping the column's dtype
+    # where the values fit it
+    if isinstance(array, pd.Categorical):
+        array = _with_categories(array, values)
+        codes = np.array(array.codes, dtype=np.int64)
+        codes[rows] = array.categories.get_indexer(values)
+        return pd.Categorical.from_codes(codes, dtype=array.dtype)
+    if isinstance(array, np.ndarray):
+        out = array.astype(_common_dtype(array, values))
+        out[rows] = values
+        return out
+    try:
+        out = array.copy()
+        out[rows] = values
+    except (TypeError, ValueError):
+        out = np.array(array, dtype=object)
+        out[rows] = values
+    return out
+
+
+def _append(array, values):
+    if isinstance(array, pd.Categorical):
+        array = _with_categories(array, values)
+        codes = np.concatenate([array.codes, array.categories.get_indexer(values)])
+        return pd.Categorical.from_codes(codes, dtype=array.dtype)
+    if isinstance(array, np.ndarray):
+        dtype = _common_dtype(array, values)
+        return np.concatenate([array.astype(dtype, copy=False), values.astype(dtype, copy=False)])
+    try:
+        return type(array)._concat_same_type([array, pd.array(values, dtype=array.dtype)])
+    except (TypeError, ValueError):
+        return np.concatenate([np.asarray(array, dtype=object), values.astype(object)])
+
+
+def merge_delta(df, delta):
+    # Returns (new_df, stats, change). Upserts replace the row with the same
+    # Record_ID in place unless the stored Last_Updated is newer; unknown ids
+    # are appended and deleted rows removed. Updates may carry a subset of
+    # columns; inserts must carry all of them. Only the columns an update
+    # names are copied, and every column keeps its dtype where the new values
+    # fit it. change (a RowChange) lets derived indexes patch the same rows.
+    if KEY not in delta.columns:
+        raise ValueError(f"Delta file must have a {KEY} column.")
+    ops = pd.Series("upsert", index=delta.index)
+    if OPERATION in delta.columns:
+        given = delta[OPERATION].fillna("").astype(str).str.strip().str.lower()
+        ops = given.where(given != "", "upsert")
+    unknown_ops = set(ops.unique()) - {"upsert", "delete"}
+    if unknown_ops:
+        raise ValueError(f"Unknown operations in delta: {', '.join(sorted(unknown_ops))}")
+    # Object columns holding numbers must not turn numeric columns into object
+    delta = delta.drop(columns=[OPERATION], errors="ignore").infer_objects()
+    # The last entry for a record wins within one delta file
+    keep_last = ~delta[KEY].duplicated(keep="last")
+    delta, ops = delta[keep_last], ops[keep_last]
+
+    positions = pd.Index(np.asarray(df[KEY], dtype=object)).get_indexer(np.asarray(delta[KEY], dtype=object))
+    exists = positions >= 0
+    deletes = (ops == "delete").to_numpy()
+    upserts = ~deletes
+
+    stale = np.zeros(len(delta), dtype=bool)
+    if "Last_Updated" in delta.columns and "Last_Updated" in df.columns:
+        incoming = _timestamps(delta["Last_Updated"]).to_numpy()
+        stored = np.full(len(delta), np.datetime64("NaT"), dtype="datetime64[ns]")
+        stored[exists] = _timestamps(df["Last_Updated"].to_numpy()[positions[exists]]).to_numpy()
+        stale = upserts & exists & (stored > incoming)
+    upserts &= ~stale
+
+    updates, inserts, removed = upserts & exists, upserts & ~exists, deletes & exists
+    missing = [c for c in df.columns if c not in delta.columns]
+    if missing and inserts.any():
+        raise ValueError(f"New records need every column; delta is missing: {', '.join(missing)}")
+    update_rows = positions[updates]
+    # Columns left out of the delta keep their stored values on update
+    update_columns = [c for c in df.columns if c in delta.columns and c != KEY] if updates.any() else []
+    keep = None
+    if removed.any():
+        keep = np.ones(len(df), dtype=bool)
+        keep[positions[removed]] = False
+
+    columns = {}
+    for name in df.columns:
+        array = _column_array(df[name])
+        if name in update_columns:
+            array = _assign(array, update_rows, delta[name].to_numpy()[updates])
+        if keep is not None:
+            array = array[keep]
+        if inserts.any():
+            array = _append(array, delta[name].to_numpy()[inserts])
+        columns[name] = array
+    new_df = pd.DataFrame(columns, copy=False)
+
+    stats = {
+        "inserted": int(inserts.sum()),
+        "updated": int(updates.sum()),
+        "deleted": int(removed.sum()),
+        "skipped_stale": int(stale.sum()),
+        "skipped_missing": int((deletes & ~exists).sum()),
+    }
+    change = RowChange(len(df), deleted=positions[removed], updated=update_rows,
+                       updated_columns=update_columns, inserted=stats["inserted"])
+    return new_df, stats, change
+
+
+def replay_journal(df, paths):
+    # Applies journaled deltas in order, as they were applied when received
+    for path in paths:
+        df, _, _ = merge_delta(df, pd.read_csv(path))
+    return df
+
+
+def _write_csv_atomically(df, csv_file):
+    tmp = f"{csv_file}.tmp-{os.getpid()}"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, csv_file)
+
+
+def _append_journal(delta, csv_file):
+    # Written aside, then linked under the next free number: a link never
+    # replaces an existing file, and readers never see a partial delta
+    journal_dir = default_journal_path(csv_file)
+    os.makedirs(journal_dir, exist_ok=True)
+    tmp = os.path.join(journal_dir, f".tmp-{os.getpid()}-{threading.get_ident()}")
+    delta.to_csv(tmp, index=False)
+    files = journal_files(csv_file)
+    number = int(os.path.basename(files[-1])[:-4]) + 1 if files else 1
+    while True:
+        try:
+            os.link(tmp, os.path.join(journal_dir, f"{number:06d}.csv"))
+            break
+        except FileExistsError:
+            number += 1
+    os.remove(tmp)
+
+
+def _compact(df, csv_file):
+    # Full rewrite of the CSV (and the snapshot, if compiled) from df, then
+    # the journal it now contains is cleared. Replaying a journal over an
+    # already-compacted CSV gives the same rows, so a crash in between is safe.
+    _write_csv_atomically(df, csv_file)
+    snapshot_dir = default_snapshot_path(csv_file)
+    if os.path.exists(snapshot_dir):
+        compile_snapshot(csv_file, snapshot_dir, df=df)
+    for path in journal_files(csv_file):
+        os.remove(path)
+
+
+def _write_files(csv_file, write, delta=None):
+    # With the SQLite backend the database takes the same delta as row-level
+    # upserts right after the files, instead of re-ingesting the CSV
+    if STORAGE_BACKEND == "sqlite":
+        get_sql_backend().apply_delta(csv_file, delta, write)
+    else:
+        write()
+
+
+def apply_delta(delta, store=None):
+    # delta: path, file object or DataFrame. Builds the merged frame off to the
+    # side, persists it, then swaps it into the store in one step; requests
+    # already holding the old snapshot finish on it. The delta itself is
+    # appended to a journal next to the CSV; the CSV is only rewritten every
+    # DELTA_COMPACT_AFTER deltas. Derived indexes patch just the changed rows.
+    store = store or get_tariff_store()
+    if not isinstance(delta, pd.DataFrame):
+        delta = pd.read_csv(delta)
+
+    def persist(df):
+        def write():
+            if len(journal_files(store.csv_file)) + 1 >= DELTA_COMPACT_AFTER:
+                _compact(df, store.csv_file)
+            else:
+                _append_journal(delta, store.csv_file)
+        _write_files(store.csv_file, write, delta)
+        return df
+
+    with _apply_lock:
+        current = store.snapshot()
+        new_df, stats, change = merge_delta(current.df, delta)
+        if not any(stats[k] for k in ("inserted", "updated", "deleted")):
+            return {"version": current.version, **stats}
+        snapshot = store.publish(new_df, persist=persist, change=change, base=current)
+    return {"version": snapshot.version, **stats}
+
+
+def compact(store=None):
+    # Folds the journal into the CSV now; the published data does not change
+    store = store or get_tariff_store()
+    with _apply_lock:
+        return store.persist_current(lambda df: _write_files(store.csv_file, lambda: _compact(df, store.csv_file)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python -m src.tariff_management_chatbot.data.delta <delta.csv> | --compact")
+        sys.exit(2)
+    if sys.argv[1] == "--compact":
+        compact()
+        print({"journal": 0})
+    else:
+        print(apply_delta(sys.argv[1]))
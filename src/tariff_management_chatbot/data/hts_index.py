@@ -0,0 +1,105 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from ..utils.metrics import stage
+from .row_groups import RowGroups
+
+# Digits kept at each level of the HTS hierarchy
+HTS_LEVELS = {"chapter": 2, "heading": 4, "subheading": 6}
+_NON_DIGITS = re.compile(r"\D")
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def normalize_hts(code):
+    # "6217.10.1000", "6217101000" and " 6217 10 1000" all become "6217101000"
+    if code is None or (isinstance(code, float) and np.isnan(code)):
+        return ""
+    return _NON_DIGITS.sub("", str(code))
+
+
+def _normalized_values(series, rows=None):
+    # Normalizes each distinct value once; returns (per-row codes, normalized values)
+    if rows is not None:
+        series = series.iloc[rows]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        values = series.cat.categories
+    else:
+        codes, values = pd.factorize(series)
+    return codes, np.asarray([normalize_hts(v) for v in values] + [""], dtype=str)
+
+
+class HtsIndex:
+    # Rows are grouped by normalized code and the groups are sorted, so an
+    # exact code is one dict probe and any prefix is a contiguous slice.
+    def __init__(self, series):
+        codes, normalized = _normalized_values(series)
+        self.codes, inverse = np.unique(normalized, return_inverse=True)
+        # Missing values (code -1) land on the trailing "" entry
+        self._groups = RowGroups(inverse[codes], len(self.codes))
+        self._lookup = {code: i for i, code in enumerate(self.codes) if code}
+
+    def patched(self, series, change):
+        # Index for the next version: only the changed rows are normalized and
+        # refiled; codes not seen before are merged into the sorted code list
+        if not change.touches(["HTS_Code"]):
+            return self
+        rows = change.changed_rows(["HTS_Code"])
+        codes, normalized = _normalized_values(series, rows)
+        row_codes = normalized[codes]
+        index = HtsIndex.__new__(HtsIndex)
+        index.codes, index._lookup, key_map = self.codes, self._lookup, None
+        new_codes = np.setdiff1d(row_codes, self.codes)
+        if len(new_codes):
+            index.codes = np.union1d(self.codes, new_codes)
+            key_map = np.searchsorted(index.codes, self.codes)
+            index._lookup = {code: i for i, code in enumerate(index.codes) if code}
+        keys = np.searchsorted(index.codes, row_codes)
+        index._groups = self._groups.patched(change, rows, keys, len(index.codes), key_map)
+        return index
+
+    def lookup(self, hts_code):
+        with stage("filter"):
+            key = self._lookup.get(normalize_hts(hts_code))
+        if key is None:
+            return _EMPTY
+        return self._groups.group(key)
+
+    def _key_range(self, prefix):
+        # ":" sorts directly after "9", so [prefix, prefix + ":") spans every code under prefix
+        lo = np.searchsorted(self.codes, prefix, side="left")
+        hi = np.searchsorted(self.codes, prefix + ":", side="left")
+        return lo, hi
+
+    def prefix(self, hts_prefix, level=None):
+        prefix = normalize_hts(hts_prefix)
+        if level:
+            prefix = prefix[:HTS_LEVELS[level]]
+        if not prefix:
+            return _EMPTY
+        with stage("filter"):
+            lo, hi = self._key_range(prefix)
+        if lo == hi:
+            return _EMPTY
+        return self._groups.span(lo, hi)
+
+    def breakdown(self, hts_prefix, level=None):
+        # Distinct full codes under a prefix with their row counts
+        prefix = normalize_hts(hts_prefix)
+        if level:
+            prefix = prefix[:HTS_LEVELS[level]]
+        if not prefix:
+            return {}
+        lo, hi = self._key_range(prefix)
+        counts = self._groups.ends[lo:hi] - self._groups.starts[lo:hi]
+        # A patched index keeps codes whose rows were all deleted; skip those
+        return {str(code): int(n) for code, n in zip(self.codes[lo:hi], counts) if n}
+
+
+def get_hts_index(snapshot):
+    return snapshot.derived(
+        "hts_index", lambda s: HtsIndex(s.df["HTS_Code"]),
+        lambda index, s: index.patched(s.df["HTS_Code"], s.change),
+    )
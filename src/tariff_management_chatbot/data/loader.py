@@ -1,9 +1,46 @@
 import pandas as pd
 import os
-def load_tariff_data(csv_file=None):
+import re
+from ..config.config import STORAGE_BACKEND, TARIFF_CSV
+from .snapshot import default_snapshot_path, load_snapshot, snapshot_is_fresh
+
+
+def default_csv_path():
     # Assume project is run from the root directory
+    return TARIFF_CSV
+
+
+def default_journal_path(csv_file):
+    # Applied deltas not yet folded into the CSV, one numbered file each
+    return os.path.splitext(csv_file)[0] + ".deltas"
+
+
+def journal_files(csv_file):
+    journal_dir = default_journal_path(csv_file)
+    if not os.path.isdir(journal_dir):
+        return []
+    names = [n for n in os.listdir(journal_dir) if re.fullmatch(r"\d+\.csv", n)]
+    return [os.path.join(journal_dir, n) for n in sorted(names, key=lambda n: int(n[:-4]))]
+
+
+def load_tariff_data(csv_file=None, use_snapshot=True):
     if csv_file is None:
-        csv_file = os.path.join('data', 'tariffs.csv')
-    if not os.path.exists(csv_file):
+        csv_file = default_csv_path()
+    if STORAGE_BACKEND == "sqlite":
+        from .sql_store import get_sql_backend
+        backend = get_sql_backend()
+        backend.ensure_ingested(csv_file)
+        return backend.load_frame()
+    # Prefer the compiled columnar snapshot when it is at least as new as the CSV
+    snapshot_dir = default_snapshot_path(csv_file)
+    if use_snapshot and snapshot_is_fresh(csv_file, snapshot_dir):
+        df = load_snapshot(snapshot_dir)
+    elif not os.path.exists(csv_file):
         raise FileNotFoundError(f"Tariff data not found at {csv_file}")
-    return pd.read_csv(csv_file)
+    else:
+        df = pd.read_csv(csv_file)
+    journal = journal_files(csv_file)
+    if journal:
+        from .delta import replay_journal
+        df = replay_journal(df, journal)
+    return df
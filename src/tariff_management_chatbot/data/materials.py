@@ -0,0 +1,141 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from ..utils.metrics import stage
+from .row_groups import RowGroups
+
+# "66.2% Cotton, 33.8% Aluminum" -> (66.2, "Cotton"), (33.8, "Aluminum")
+COMPOSITION_PATTERN = r"(?P<share>\d+(?:\.\d+)?)\s*%\s*(?P<material>[^,]+)"
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def parse_compositions(values):
+    # Parse each distinct composition string once; returns a long frame of
+    # (composition_id, material, share_pct) in input order.
+    parsed = pd.Series(values, dtype=object).str.extractall(COMPOSITION_PATTERN)
+    if parsed.empty:
+        return pd.DataFrame({"composition_id": _EMPTY, "material": [], "share_pct": []})
+    return pd.DataFrame({
+        "composition_id": parsed.index.get_level_values(0).to_numpy(dtype=np.int64),
+        "material": parsed["material"].str.strip().to_numpy(dtype=object),
+        "share_pct": parsed["share"].astype(float).to_numpy(),
+    })
+
+
+def _factorized(series, rows=None):
+    if rows is not None:
+        series = series.iloc[rows]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64), series.cat.categories
+    return pd.factorize(series)
+
+
+class MaterialTable:
+    # Long-format (row_id, material_id, share_pct) table built from
+    # Material_Composition, with an inverted index material -> table entries.
+    # Parsed entries are kept per distinct composition string, so a patched
+    # table only parses compositions it has not seen before.
+    def __init__(self, df):
+        row_codes, compositions = _factorized(df["Material_Composition"])
+        entries = parse_compositions(compositions)
+
+        self.materials, material_ids = np.unique(entries["material"].to_numpy(dtype=str), return_inverse=True)
+        self._material_lookup = {m.casefold(): i for i, m in enumerate(self.materials)}
+        self._compositions = pd.Index(compositions)
+        self._entry_counts = np.bincount(entries["composition_id"], minlength=len(compositions))
+        self._entry_starts = np.concatenate(([0], np.cumsum(self._entry_counts)[:-1])).astype(np.int64)
+        self._entry_material = material_ids.astype(np.int64)
+        self._entry_share = entries["share_pct"].to_numpy()
+
+        rows, row_id, entry = self._expand(np.arange(len(row_codes)), row_codes)
+        self.rows_with_composition = rows
+        self._groups = RowGroups(
+            self._entry_material[entry], len(self.materials), rows=row_id, payload=self._entry_share[entry]
+        )
+
+    def _expand(self, rows, composition_ids):
+        # Per-composition entries -> per-row entries for ascending rows; returns
+        # (rows with any entry, row of each entry, entry index)
+        has_entries = composition_ids >= 0
+        has_entries[has_entries] = self._entry_counts[composition_ids[has_entries]] > 0
+        rows, composition_ids = rows[has_entries], composition_ids[has_entries]
+        repeat = self._entry_counts[composition_ids]
+        within = np.arange(repeat.sum()) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        entry = np.repeat(self._entry_starts[composition_ids], repeat) + within
+        return rows, np.repeat(rows, repeat), entry
+
+    def patched(self, df, change):
+        # Table for the next version: only changed rows are expanded and
+        # refiled, and only compositions not seen before are parsed
+        if not change.touches(["Material_Composition"]):
+            return self
+        rows = np.sort(change.changed_rows(["Material_Composition"]))
+        codes, values = _factorized(df["Material_Composition"], rows)
+        composition_ids = self._compositions.get_indexer(values)
+        table = copy.copy(self)
+        unseen = composition_ids < 0
+        if unseen.any():
+            added = values[unseen]
+            entries = parse_compositions(added)
+            names = entries["material"].to_numpy(dtype=str)
+            known = set(self.materials.tolist())
+            new_names = [n for n in dict.fromkeys(names.tolist()) if n not in known]
+            table.materials = np.concatenate([self.materials, np.asarray(new_names, dtype=str)])
+            table._material_lookup = {m.casefold(): i for i, m in enumerate(table.materials)}
+            ids = {m: i for i, m in enumerate(table.materials)}
+            counts = np.bincount(entries["composition_id"], minlength=len(added))
+            table._compositions = self._compositions.append(added)
+            table._entry_counts = np.concatenate([self._entry_counts, counts])
+            table._entry_starts = np.concatenate([
+                self._entry_starts, len(self._entry_material) + np.concatenate(([0], np.cumsum(counts)[:-1]))
+            ]).astype(np.int64)
+            table._entry_material = np.concatenate([
+                self._entry_material, np.asarray([ids[n] for n in names.tolist()], dtype=np.int64)
+            ])
+            table._entry_share = np.concatenate([self._entry_share, entries["share_pct"].to_numpy()])
+            composition_ids[unseen] = np.arange(len(self._compositions), len(table._compositions))
+        row_compositions = np.full(len(codes), -1, dtype=np.int64)
+        row_compositions[codes >= 0] = composition_ids[codes[codes >= 0]]
+
+        with_entries, row_id, entry = table._expand(rows, row_compositions)
+        table._groups = self._groups.patched(
+            change, row_id, table._entry_material[entry], len(table.materials), payload=table._entry_share[entry]
+        )
+        # Surviving rows minus the changed ones, then the changed rows that parse
+        kept = change.remap(self.rows_with_composition)
+        stale = np.zeros(change.new_size + 1, dtype=bool)
+        stale[rows] = True
+        stale[-1] = True
+        kept = kept[~stale[kept]]
+        table.rows_with_composition = np.insert(kept, np.searchsorted(kept, with_entries), with_entries)
+        return table
+
+    def to_frame(self):
+        return pd.DataFrame({
+            "row_id": self._groups.rows,
+            "material": self.materials[self._groups.keys],
+            "share_pct": self._groups.payload,
+        })
+
+    def rows_with_material(self, material, min_share=None, max_share=None):
+        # Returns (row_ids, share_pct) for rows containing the material, sorted by row
+        material_id = self._material_lookup.get(material.strip().casefold())
+        if material_id is None:
+            return _EMPTY, np.empty(0)
+        with stage("filter"):
+            rows = self._groups.group(material_id)
+            shares = self._groups.group_payload(material_id)
+            keep = np.ones(len(rows), dtype=bool)
+            if min_share is not None:
+                keep &= shares >= min_share
+            if max_share is not None:
+                keep &= shares <= max_share
+            return rows[keep], shares[keep]
+
+
+def get_material_table(snapshot):
+    return snapshot.derived(
+        "material_table", lambda s: MaterialTable(s.df), lambda table, s: table.patched(s.df, s.change)
+    )
@@ -0,0 +1,122 @@
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class RowChange:
+    # How one dataset version differs from the one before it, by row position.
+    # Updated rows keep their position, deleted rows are removed (later rows
+    # move up) and inserted rows are appended. Derived structures use it to
+    # patch only the rows that changed instead of rebuilding.
+    def __init__(self, old_size, deleted=_EMPTY, updated=_EMPTY, updated_columns=(), inserted=0):
+        self.old_size = old_size
+        self.deleted = np.sort(np.asarray(deleted, dtype=np.int64))
+        self.inserted = int(inserted)
+        self.new_size = old_size - len(self.deleted) + self.inserted
+        self.updated_columns = frozenset(updated_columns)
+        # Updated rows by their position in the new version
+        updated = self.remap(np.asarray(updated, dtype=np.int64))
+        self.updated = updated[updated >= 0]
+
+    def remap(self, old_rows):
+        # Old positions -> new positions; deleted rows map to -1
+        old_rows = np.asarray(old_rows, dtype=np.int64)
+        if len(self.deleted) == 0:
+            return old_rows
+        shift = np.searchsorted(self.deleted, old_rows)
+        gone = self.deleted[np.minimum(shift, len(self.deleted) - 1)] == old_rows
+        return np.where(gone, -1, old_rows - shift)
+
+    def touches(self, columns):
+        # False when a structure over these columns is still valid as it is
+        return len(self.deleted) > 0 or self.inserted > 0 or not self.updated_columns.isdisjoint(columns)
+
+    def changed_rows(self, columns):
+        # New positions whose values in these columns may differ from before
+        inserted = np.arange(self.new_size - self.inserted, self.new_size, dtype=np.int64)
+        if self.updated_columns.isdisjoint(columns):
+            return inserted
+        return np.concatenate([self.updated, inserted])
+
+    def carry(self, values, rows, new_values):
+        # Per-row array for the new version: surviving values move with their
+        # rows, then the given rows get new_values
+        values = np.asarray(values)
+        new_values = np.asarray(new_values)
+        if len(self.deleted):
+            keep = np.ones(self.old_size, dtype=bool)
+            keep[self.deleted] = False
+            values = values[keep]
+        out = np.empty(self.new_size, dtype=np.result_type(values, new_values))
+        out[:len(values)] = values
+        out[rows] = new_values
+        return out
+
+
+class RowGroups:
+    # Row positions grouped by an integer key (a dictionary code, an IVF list,
+    # ...), each group in row order: group k is rows[starts[k]:ends[k]].
+    # Negative keys (missing values) sort first and belong to no group. An
+    # optional payload array travels with the rows.
+    def __init__(self, keys, n_keys, rows=None, payload=None):
+        keys = np.asarray(keys, dtype=np.int64)
+        if rows is None:
+            order = np.argsort(keys, kind="stable")
+            rows = order
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            order = np.lexsort((rows, keys))
+            rows = rows[order]
+        self._set(keys[order], rows, n_keys, None if payload is None else np.asarray(payload)[order])
+
+    def _set(self, sorted_keys, rows, n_keys, payload):
+        self.keys = sorted_keys
+        self.rows = rows
+        self.payload = payload
+        ids = np.arange(n_keys)
+        self.starts = np.searchsorted(sorted_keys, ids, side="left")
+        self.ends = np.searchsorted(sorted_keys, ids, side="right")
+
+    @property
+    def n_keys(self):
+        return len(self.starts)
+
+    def group(self, key):
+        return self.rows[self.starts[key]:self.ends[key]]
+
+    def group_payload(self, key):
+        return self.payload[self.starts[key]:self.ends[key]]
+
+    def span(self, lo, hi):
+        # Rows of the consecutive groups lo..hi-1
+        return self.rows[self.starts[lo]:self.ends[hi - 1]]
+
+    def patched(self, change, rows, keys, n_keys=None, key_map=None, payload=None):
+        # rows (new positions) are (re)filed under keys; every other surviving
+        # row keeps its key. key_map renumbers old keys and must be increasing.
+        # Linear in the number of entries (array copies), with no re-sort.
+        n_keys = self.n_keys if n_keys is None else n_keys
+        rows = np.asarray(rows, dtype=np.int64)
+        keys = np.asarray(keys, dtype=np.int64)
+        sorted_keys, new_rows = self.keys, change.remap(self.rows)
+        if key_map is not None:
+            sorted_keys = np.where(sorted_keys >= 0, key_map[np.maximum(sorted_keys, 0)], sorted_keys)
+        # Drop deleted rows (-1 lands on the extra last slot) and rows being refiled
+        stale = np.zeros(change.new_size + 1, dtype=bool)
+        stale[rows] = True
+        stale[-1] = True
+        keep = ~stale[new_rows]
+        sorted_keys, new_rows = sorted_keys[keep], new_rows[keep]
+        old_payload = self.payload[keep] if self.payload is not None else None
+
+        order = np.lexsort((rows, keys))
+        add_keys, add_rows = keys[order], rows[order]
+        # Merge on (key, row); keys shift by one so missing (-1) stays non-negative
+        width = change.new_size + 1
+        at = np.searchsorted((sorted_keys + 1) * width + new_rows, (add_keys + 1) * width + add_rows)
+        merged = RowGroups.__new__(RowGroups)
+        merged._set(
+            np.insert(sorted_keys, at, add_keys), np.insert(new_rows, at, add_rows), n_keys,
+            None if old_payload is None else np.insert(old_payload, at, np.asarray(payload)[order]),
+        )
+        return merged
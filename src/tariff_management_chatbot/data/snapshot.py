@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+# On-disk layout of a compiled snapshot directory:
+#   manifest.json        column order, kinds and row count
+#   <i>.values.npy       numeric or bool column i, native dtype
+#   <i>.codes.npy        string column i, dictionary codes (-1 = missing) in the
+#                        integer width pandas picks for that many categories
+#   <i>.dict.npy         string column i, fixed-width unicode dictionary
+# Every array is a plain .npy file, so loading is a memory map plus a
+# dictionary decode whose cost depends on distinct values, not rows. Values
+# and codes stay memory-mapped in the loaded frame; only the dictionaries
+# are copied.
+FORMAT_VERSION = 2
+MANIFEST = "manifest.json"
+
+
+def default_snapshot_path(csv_file):
+    return os.path.splitext(csv_file)[0] + ".snapshot"
+
+
+def compile_snapshot(csv_file, out_dir=None, df=None):
+    out_dir = out_dir or default_snapshot_path(csv_file)
+    if df is None:
+        df = pd.read_csv(csv_file)
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+            np.save(os.path.join(tmp_dir, f"{i}.values.npy"), series.to_numpy())
+            columns.append({"name": name, "kind": "numeric"})
+        else:
+            codes, uniques = pd.factorize(series)
+            uniques = pd.Index(np.asarray(uniques, dtype=str), dtype=object)
+            # Saved in the width Categorical would coerce them to, so loading
+            # wraps the memory map instead of converting it
+            codes = pd.Categorical.from_codes(codes, categories=uniques).codes
+            np.save(os.path.join(tmp_dir, f"{i}.codes.npy"), codes)
+            np.save(os.path.join(tmp_dir, f"{i}.dict.npy"), np.asarray(uniques, dtype=str))
+            columns.append({"name": name, "kind": "dictionary"})
+
+    manifest = {"format": FORMAT_VERSION, "rows": len(df), "columns": columns}
+    with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+
+    old_dir = f"{out_dir}.old-{os.getpid()}"
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return out_dir
+
+
+def snapshot_is_fresh(csv_file, snapshot_dir=None):
+    snapshot_dir = snapshot_dir or default_snapshot_path(csv_file)
+    manifest = os.path.join(snapshot_dir, MANIFEST)
+    if not os.path.exists(manifest):
+        return False
+    with open(manifest) as f:
+        if json.load(f).get("format") != FORMAT_VERSION:
+            # Written by an older release; fall back to the CSV until recompiled
+            return False
+    if not os.path.exists(csv_file):
+        return True
+    return os.stat(manifest).st_mtime_ns >= os.stat(csv_file).st_mtime_ns
+
+
+def load_snapshot(snapshot_dir):
+    with open(os.path.join(snapshot_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format in {snapshot_dir}")
+
+    data = {}
+    for i, col in enumerate(manifest["columns"]):
+        if col["kind"] == "numeric":
+            data[col["name"]] = np.load(os.path.join(snapshot_dir, f"{i}.values.npy"), mmap_mode="r")
+        else:
+            codes = np.load(os.path.join(snapshot_dir, f"{i}.codes.npy"), mmap_mode="r")
+            categories = np.load(os.path.join(snapshot_dir, f"{i}.dict.npy"), mmap_mode="r")
+            data[col["name"]] = pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+    # copy=False keeps one block per column, so nothing is consolidated into new arrays
+    return pd.DataFrame(data, copy=False)
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "tariffs.csv")
+    out_path = sys.argv[2] if len(sys.argv) > 2 else None
+    print(f"Snapshot written to {compile_snapshot(csv_path, out_path)}")
@@ -0,0 +1,293 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, event, text
+
+from ..config.config import DATABASE_URL, SQL_POOL_SIZE
+from ..utils.metrics import stage
+from .hts_index import HTS_LEVELS
+from .loader import journal_files
+
+# Serves /hts-lookup, /hts-range and /product-search from SQL. The agents,
+# semantic search, chat, export and warm-up still work on the frame that
+# load_tariff_data reads back from the database, so this backend does not
+# lower the service's memory use.
+TABLE = "tariffs"
+FTS_TABLE = "tariffs_fts"
+META_TABLE = "ingest_meta"
+INGEST_CHUNK_ROWS = 50000
+# Record_IDs per IN (...) lookup when applying a delta, under SQLite's bound-parameter limit
+DELTA_LOOKUP_ROWS = 500
+# (column, index name, collation) -- NOCASE keeps equality lookups case-insensitive
+BTREE_INDEXES = [
+    ("Record_ID", "idx_tariffs_record_id", None),
+    ("HTS_Norm", "idx_tariffs_hts_norm", None),
+    ("Country_of_Origin", "idx_tariffs_country", "NOCASE"),
+    ("Company", "idx_tariffs_company", "NOCASE"),
+]
+
+
+def _make_engine(url):
+    if url.startswith("sqlite:///") and not url.startswith("sqlite:///:memory:"):
+        os.makedirs(os.path.dirname(os.path.abspath(url[len("sqlite:///"):])), exist_ok=True)
+    engine = create_engine(
+        url,
+        pool_size=SQL_POOL_SIZE,
+        pool_pre_ping=True,
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+    )
+    if url.startswith("sqlite"):
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, _):
+            # WAL lets readers keep going while an ingest writes
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+    return engine
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _fts_phrase(needle):
+    return '"' + needle.replace('"', '""') + '"'
+
+
+def _source_signature(csv_file):
+    # The CSV plus the delta journal replayed on top of it
+    signature = []
+    for path in [csv_file] + journal_files(csv_file):
+        st = os.stat(path)
+        signature.append([os.path.basename(path), st.st_mtime_ns, st.st_size])
+    return json.dumps(signature)
+
+
+def _with_hts_norm(df):
+    df = df.copy()
+    df["HTS_Norm"] = df["HTS_Code"].astype(str).str.replace(r"\D", "", regex=True)
+    return df
+
+
+def _like(needle):
+    escaped = needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SqlTariffBackend:
+    def __init__(self, url=DATABASE_URL):
+        self.engine = _make_engine(url)
+        self._columns = None
+        self._ingest_lock = threading.Lock()
+
+    # --- ingest -------------------------------------------------------------
+
+    def _meta(self, conn):
+        exists = conn.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name=:n"),
+                              {"n": META_TABLE}).first()
+        if not exists:
+            return {}
+        return dict(conn.execute(text(f"SELECT key, value FROM {META_TABLE}")).all())
+
+    def is_fresh(self, csv_file):
+        with self.engine.connect() as conn:
+            meta = self._meta(conn)
+        if not meta.get("source"):
+            return False
+        if not os.path.exists(csv_file):
+            return True
+        return meta["source"] == _source_signature(csv_file)
+
+    def _write_meta(self, conn, meta):
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)"))
+        for key, value in meta.items():
+            conn.execute(text(f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES (:k, :v)"),
+                         {"k": key, "v": str(value)})
+
+    def ingest_csv(self, csv_file):
+        source = _source_signature(csv_file)
+        with self.engine.begin() as conn:
+            generation = int(self._meta(conn).get("generation", 0)) + 1
+            conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+            conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            columns = None
+            for chunk in pd.read_csv(csv_file, chunksize=INGEST_CHUNK_ROWS):
+                columns = list(chunk.columns)
+                _with_hts_norm(chunk).to_sql(TABLE, conn, if_exists="append", index=False)
+            for column, name, collation in BTREE_INDEXES:
+                collate = f" COLLATE {collation}" if collation else ""
+                conn.execute(text(f"CREATE INDEX {name} ON {TABLE} ({_quote(column)}{collate})"))
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"Product_Description, content='{TABLE}', content_rowid='rowid', tokenize='trigram')"
+            ))
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')"))
+            # Keep the FTS table in step with row-level changes made by deltas
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, Product_Description) VALUES (new.rowid, new.Product_Description); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, Product_Description) "
+                f"VALUES ('delete', old.rowid, old.Product_Description); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF Product_Description ON {TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, Product_Description) "
+                f"VALUES ('delete', old.rowid, old.Product_Description); "
+                f"INSERT INTO {FTS_TABLE}(rowid, Product_Description) VALUES (new.rowid, new.Product_Description); END"
+            ))
+            for path in journal_files(csv_file):
+                self._upsert(conn, pd.read_csv(path), columns)
+            self._write_meta(conn, {"generation": generation, "columns": ",".join(columns or []), "source": source})
+        self._columns = None
+        return generation
+
+    def ensure_ingested(self, csv_file):
+        if self.is_fresh(csv_file):
+            return
+        with self._ingest_lock:
+            if not self.is_fresh(csv_file):
+                self.ingest_csv(csv_file)
+
+    # --- deltas -------------------------------------------------------------
+
+    def _stored_rows(self, conn, ids, columns):
+        # (rowids, frame) of the stored rows with these Record_IDs, in table order
+        query = text(f"SELECT t.rowid AS _rowid, {self._select_list(columns)} FROM {TABLE} t "
+                     f"WHERE t.Record_ID IN :ids").bindparams(bindparam("ids", expanding=True))
+        parts = [
+            pd.read_sql_query(query, conn, params={"ids": ids[i:i + DELTA_LOOKUP_ROWS]})
+            for i in range(0, len(ids), DELTA_LOOKUP_ROWS)
+        ]
+        stored = pd.concat(parts, ignore_index=True).sort_values("_rowid", ignore_index=True)
+        return stored.pop("_rowid").to_numpy(), stored
+
+    def _upsert(self, conn, delta, columns):
+        # Applies one delta with merge_delta's rules (stale check, partial
+        # updates, deletes) to just the rows it names, as row-level SQL
+        from .delta import KEY, merge_delta
+        ids = pd.unique(delta[KEY].astype(str)).tolist()
+        rowids, stored = self._stored_rows(conn, ids, columns)
+        merged, stats, change = merge_delta(stored, delta)
+        if len(change.deleted):
+            conn.execute(text(f"DELETE FROM {TABLE} WHERE rowid IN :rowids")
+                         .bindparams(bindparam("rowids", expanding=True)),
+                         {"rowids": rowids[change.deleted].tolist()})
+        if len(change.updated):
+            columns = [c for c in merged.columns if c in change.updated_columns]
+            updated = merged.iloc[change.updated][columns]
+            if "HTS_Code" in columns:
+                updated = _with_hts_norm(updated)
+            values = updated.astype(object).where(updated.notna(), None).to_numpy().tolist()
+            targets = np.delete(rowids, change.deleted)[change.updated].tolist()
+            assignments = ", ".join(f"{_quote(c)} = :p{i}" for i, c in enumerate(updated.columns))
+            conn.execute(text(f"UPDATE {TABLE} SET {assignments} WHERE rowid = :rowid"), [
+                {"rowid": rowid, **{f"p{i}": v for i, v in enumerate(row)}} for row, rowid in zip(values, targets)
+            ])
+        if change.inserted:
+            # New rowids are larger than every stored one, so inserts land last like in the frame
+            _with_hts_norm(merged.iloc[len(merged) - change.inserted:]).to_sql(
+                TABLE, conn, if_exists="append", index=False)
+        return stats
+
+    def apply_delta(self, csv_file, delta, write_files):
+        # write_files() journals the delta next to the CSV (or compacts it in);
+        # the rows it changes are then upserted here, so the database follows
+        # the files without a re-ingest. delta=None only records the new files.
+        with self._ingest_lock:
+            if not self.is_fresh(csv_file):
+                self.ingest_csv(csv_file)
+            write_files()
+            with self.engine.begin() as conn:
+                generation = int(self._meta(conn).get("generation", 0))
+                if delta is not None:
+                    self._upsert(conn, delta, self.columns())
+                    generation += 1
+                self._write_meta(conn, {"generation": generation, "source": _source_signature(csv_file)})
+
+    # --- reads --------------------------------------------------------------
+
+    @property
+    def version(self):
+        with self.engine.connect() as conn:
+            return int(self._meta(conn).get("generation", 0))
+
+    def columns(self):
+        if self._columns is None:
+            with self.engine.connect() as conn:
+                self._columns = self._meta(conn)["columns"].split(",")
+        return self._columns
+
+    def _select_list(self, columns=None):
+        return ", ".join(f"t.{_quote(c)}" for c in (columns or self.columns()))
+
+    def load_frame(self):
+        with self.engine.connect() as conn:
+            return pd.read_sql_query(text(f"SELECT {self._select_list()} FROM {TABLE} t ORDER BY t.rowid"), conn)
+
+    def _page(self, where, params, limit, offset, columns=None, joins=""):
+        with stage("filter"), self.engine.connect() as conn:
+            total = conn.execute(text(f"SELECT COUNT(*) FROM {TABLE} t {joins} WHERE {where}"), params).scalar()
+            rows = conn.execute(
+                text(f"SELECT {self._select_list(columns)} FROM {TABLE} t {joins} WHERE {where} "
+                     f"ORDER BY t.rowid LIMIT :limit OFFSET :offset"),
+                {**params, "limit": limit, "offset": offset},
+            ).mappings().all()
+        return total, [dict(r) for r in rows]
+
+    def hts_lookup(self, hts_norm, limit, offset=0, columns=None):
+        return self._page("t.HTS_Norm = :code", {"code": hts_norm}, limit, offset, columns)
+
+    def hts_prefix(self, prefix, limit, offset=0, columns=None, level=None):
+        if level:
+            prefix = prefix[:HTS_LEVELS[level]]
+        # ":" sorts right after "9", so this range stays on the HTS_Norm index
+        return self._page("t.HTS_Norm >= :lo AND t.HTS_Norm < :hi", {"lo": prefix, "hi": prefix + ":"},
+                          limit, offset, columns)
+
+    def hts_breakdown(self, prefix, level=None):
+        if level:
+            prefix = prefix[:HTS_LEVELS[level]]
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(f"SELECT HTS_Norm, COUNT(*) FROM {TABLE} WHERE HTS_Norm >= :lo AND HTS_Norm < :hi "
+                     f"GROUP BY HTS_Norm ORDER BY HTS_Norm"),
+                {"lo": prefix, "hi": prefix + ":"},
+            ).all()
+        return {code: int(n) for code, n in rows}
+
+    def search_products(self, filters, limit, offset=0, columns=None):
+        clauses, params, joins = [], {}, ""
+        product = filters.get("Product_Description")
+        if product and len(product) >= 3:
+            joins = f"JOIN {FTS_TABLE} f ON f.rowid = t.rowid"
+            clauses.append(f"{FTS_TABLE} MATCH :fts")
+            params["fts"] = _fts_phrase(product)
+        elif product:
+            # Trigram FTS needs at least three characters
+            clauses.append("t.Product_Description LIKE :product ESCAPE '\\'")
+            params["product"] = _like(product)
+        for i, column in enumerate(("Company", "Country_of_Origin")):
+            if filters.get(column):
+                clauses.append(f"t.{_quote(column)} LIKE :f{i} ESCAPE '\\'")
+                params[f"f{i}"] = _like(filters[column])
+        return self._page(" AND ".join(clauses) or "1=1", params, limit, offset, columns, joins)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_sql_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = SqlTariffBackend()
+    return _backend
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import time
+
+from ..utils.metrics import Gauge, stage
+from .loader import load_tariff_data, default_csv_path, journal_files
+
+
+def _source_files(csv_file):
+    # The CSV plus the delta journal replayed on top of it
+    return [csv_file] + journal_files(csv_file)
+
+
+def _file_signature(csv_file):
+    signature = []
+    for path in _source_files(csv_file):
+        st = os.stat(path)
+        signature.append((os.path.basename(path), st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def _file_digest(csv_file):
+    h = hashlib.sha1()
+    for path in _source_files(csv_file):
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+class TariffSnapshot:
+    # Immutable view of one dataset version. Structures derived from the frame
+    # (indexes, parsed tables) are built lazily and live as long as the snapshot.
+    # change (a RowChange) is set when this version was made from the previous
+    # one by a delta; derived structures can then be patched instead of rebuilt.
+    def __init__(self, df, version, signature=None, digest=None, previous=None, change=None):
+        self.df = df
+        self.version = version
+        self.signature = signature
+        self.digest = digest
+        self.change = change
+        self.loaded_at = time.time()
+        self._derived = {}
+        self._lock = threading.Lock()
+        # What the replaced snapshot had built, without keeping its frame alive;
+        # each entry is dropped once this snapshot has its own
+        self._inherited = dict(previous._derived) if previous is not None else {}
+
+    def previous_derived(self, name):
+        return self._inherited.get(name)
+
+    def derived(self, name, builder, patcher=None):
+        # patcher(previous_value, snapshot) updates the previous version's value
+        # for self.change; without one (or a change) the value is built anew
+        value = self._derived.get(name)
+        if value is not None:
+            return value
+        with self._lock:
+            value = self._derived.get(name)
+            if value is None:
+                previous = self._inherited.get(name)
+                if patcher is not None and self.change is not None and previous is not None:
+                    value = patcher(previous, self)
+                else:
+                    value = builder(self)
+                self._derived[name] = value
+                self._inherited.pop(name, None)
+        return value
+
+
+class TariffStore:
+    def __init__(self, csv_file=None, check_interval=1.0):
+        self.csv_file = csv_file or default_csv_path()
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else 0
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_check < self.check_interval:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or now - self._last_check >= self.check_interval:
+                snapshot = self._refresh(snapshot)
+                self._last_check = time.monotonic()
+        return snapshot
+
+    def dataframe(self):
+        return self.snapshot().df
+
+    def _refresh(self, current):
+        signature = _file_signature(self.csv_file)
+        if current is None:
+            # Cold start: skip hashing so startup cost stays with the loader
+            with stage("data_load"):
+                df = load_tariff_data(self.csv_file)
+            return self._publish(df, signature, None)
+        if signature == current.signature:
+            return current
+        digest = _file_digest(self.csv_file)
+        if digest == current.digest:
+            # Touched but unchanged: remember the new stat so we stop hashing it.
+            current.signature = signature
+            return current
+        with stage("data_load"):
+            df = load_tariff_data(self.csv_file)
+        return self._publish(df, signature, digest)
+
+    def publish(self, df, persist=None, change=None, base=None):
+        # Swap in a frame built in-process; readers holding the previous
+        # snapshot keep using it until they finish. persist(df) runs under the
+        # store lock first, so a concurrent file check cannot see a half-written
+        # CSV or load the same change twice; it returns the frame to publish.
+        # change describes df relative to base and is dropped if base is no
+        # longer the current snapshot.
+        with self._lock:
+            if persist is not None:
+                df = persist(df)
+            if base is not self._snapshot:
+                change = None
+            signature = _file_signature(self.csv_file) if os.path.exists(self.csv_file) else None
+            return self._publish(df, signature, None, change)
+
+    def persist_current(self, persist):
+        # Rewrites the stored files from the published frame without changing
+        # its content (e.g. folding in the delta journal); readers keep the
+        # same snapshot and derived indexes
+        self.snapshot()
+        with self._lock:
+            snapshot = self._snapshot
+            persist(snapshot.df)
+            snapshot.signature = _file_signature(self.csv_file)
+            snapshot.digest = None
+            return snapshot
+
+    def _publish(self, df, signature, digest, change=None):
+        snapshot = TariffSnapshot(df, self.version + 1, signature, digest, previous=self._snapshot, change=change)
+        self._snapshot = snapshot
+        return snapshot
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_tariff_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TariffStore()
+    return _store
+
+
+def _loaded_snapshot():
+    # Scrapes must not trigger a load, so read whatever is already published
+    return _store._snapshot if _store is not None else None
+
+
+Gauge("tariff_dataset_version", "Version of the published tariff dataset (0 until loaded).",
+      fn=lambda: _store.version if _store is not None else 0)
+Gauge("tariff_dataset_rows", "Rows in the published tariff dataset.",
+      fn=lambda: len(_loaded_snapshot().df) if _loaded_snapshot() is not None else 0)
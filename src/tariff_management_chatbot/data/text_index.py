@@ -0,0 +1,160 @@
+import copy
+import weakref
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from ..utils.metrics import stage
+from .row_groups import RowGroups
+
+SEARCH_COLUMNS = ("Product_Description", "Company", "Country_of_Origin")
+GRAM = 3
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def _factorized(series, rows=None):
+    if rows is not None:
+        series = series.iloc[rows]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return pd.factorize(series)
+
+
+class TrigramIndex:
+    # Case-folded trigram index over the distinct values of one column.
+    # Posting lists point at value ids; each value id maps to the (sorted)
+    # rows holding that value, so a query costs O(candidates + matches).
+    def __init__(self, series, previous=None):
+        codes, values = _factorized(series)
+        self.distinct = values
+        self.values = [str(v).casefold() for v in values]
+        self._groups = RowGroups(codes, len(self.values))
+        self._ids = None
+        # The index this one was patched from, if any (see patched)
+        self.parent = None
+
+        # Gram sets are kept per value text, so a rebuild after a small delta
+        # only tokenizes values the previous index had not seen
+        known = previous._grams_by_value if previous is not None else {}
+        self._grams_by_value = {}
+        postings = defaultdict(list)
+        for value_id, text in enumerate(self.values):
+            grams = known.get(text)
+            if grams is None:
+                grams = _grams(text)
+            self._grams_by_value[text] = grams
+            for gram in grams:
+                postings[gram].append(value_id)
+        self._postings = {g: np.asarray(ids, dtype=np.int64) for g, ids in postings.items()}
+
+    def _value_ids(self):
+        if self._ids is None:
+            self._ids = {v: i for i, v in enumerate(self.distinct)}
+        return self._ids
+
+    def patched(self, series, change, column):
+        # Index for the next version. Values not seen before get the next ids
+        # (so distinct only grows and old ids stay valid) and their grams are
+        # appended to the posting lists; only the changed rows are refiled.
+        if not change.touches([column]):
+            return self
+        rows = change.changed_rows([column])
+        codes, values = _factorized(series, rows)
+        ids = self._value_ids()
+        value_keys = np.fromiter((ids.get(v, -1) for v in values), dtype=np.int64, count=len(values))
+        new = value_keys < 0
+        index = copy.copy(self)
+        index.parent = weakref.ref(self)
+        if new.any():
+            added = values[new]
+            value_keys[new] = np.arange(len(self.values), len(self.values) + len(added))
+            texts = [str(v).casefold() for v in added]
+            index.distinct = self.distinct.append(added)
+            index.values = self.values + texts
+            index._ids = {**ids, **{v: len(self.values) + i for i, v in enumerate(added)}}
+            index._grams_by_value = dict(self._grams_by_value)
+            postings = defaultdict(list)
+            for value_id, text in zip(value_keys[new], texts):
+                grams = index._grams_by_value.setdefault(text, _grams(text))
+                for gram in grams:
+                    postings[gram].append(value_id)
+            index._postings = dict(self._postings)
+            for gram, value_ids in postings.items():
+                value_ids = np.asarray(value_ids, dtype=np.int64)
+                known = index._postings.get(gram)
+                index._postings[gram] = value_ids if known is None else np.concatenate([known, value_ids])
+        row_keys = np.full(len(codes), -1, dtype=np.int64)
+        row_keys[codes >= 0] = value_keys[codes[codes >= 0]]
+        index._groups = self._groups.patched(change, rows, row_keys, len(index.values))
+        return index
+
+    def matching_values(self, needle):
+        needle = needle.casefold()
+        if len(needle) < GRAM:
+            candidates = range(len(self.values))
+        else:
+            lists = []
+            for gram in _grams(needle):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    return _EMPTY
+                lists.append(posting)
+            lists.sort(key=len)
+            candidates = lists[0]
+            for posting in lists[1:]:
+                if len(candidates) == 0:
+                    break
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        # Trigram overlap is necessary but not sufficient; verify the substring
+        return np.asarray([v for v in candidates if needle in self.values[v]], dtype=np.int64)
+
+    def rows_for_values(self, value_ids):
+        if len(value_ids) == 0:
+            return _EMPTY
+        chunks = [self._groups.group(v) for v in value_ids]
+        return np.sort(np.concatenate(chunks))
+
+    def search(self, needle):
+        return self.rows_for_values(self.matching_values(needle))
+
+
+class ProductTextIndex:
+    def __init__(self, df, columns=SEARCH_COLUMNS, previous=None):
+        self.size = len(df)
+        self.columns = {
+            col: TrigramIndex(df[col], previous.columns.get(col) if previous is not None else None)
+            for col in columns if col in df.columns
+        }
+
+    def patched(self, df, change):
+        index = ProductTextIndex.__new__(ProductTextIndex)
+        index.size = len(df)
+        index.columns = {col: column.patched(df[col], change, col) for col, column in self.columns.items()}
+        return index
+
+    def search(self, filters):
+        # filters: {column: substring}; empty substrings are ignored.
+        # Returns matching row positions in table order.
+        rows = None
+        active = [(col, needle) for col, needle in filters.items() if needle]
+        with stage("filter"):
+            for col, needle in active:
+                matched = self.columns[col].search(needle)
+                rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+                if len(rows) == 0:
+                    break
+        if rows is None:
+            return np.arange(self.size)
+        return rows
+
+
+def get_text_index(snapshot):
+    return snapshot.derived(
+        "text_index", lambda s: ProductTextIndex(s.df, previous=s.previous_derived("text_index")),
+        lambda index, s: index.patched(s.df, s.change),
+    )
@@ -1,4 +1,25 @@
+import numpy as np
+
+
+def landed_cost_arrays(material_cost_usd, quantity, tariff_rate_percent, mpf_usd=0.0, other_fees_usd=0.0):
+    # Same formula as TariffAgent.calculate_tariff, applied element-wise.
+    # Fees are per shipment and spread over the quantity; zero quantities
+    # come back as inf/nan and are flagged by the callers.
+    material = np.asarray(material_cost_usd, dtype=float)
+    qty = np.asarray(quantity, dtype=float)
+    rate = np.asarray(tariff_rate_percent, dtype=float)
+    fees = np.asarray(mpf_usd, dtype=float) + np.asarray(other_fees_usd, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_unit = material * (1 + rate / 100) + fees / qty
+        total = per_unit * qty
+    return per_unit, total
+
+
 def compute_landed_cost(base_price, tariff_rate, mpf_fee, quantity):
-    landed_cost_per_unit = base_price * (1 + tariff_rate) + mpf_fee / quantity
-    total_landed_cost = landed_cost_per_unit * quantity
+    # tariff_rate is a fraction here (0.05 == 5%)
+    landed_cost_per_unit, total_landed_cost = landed_cost_arrays(
+        base_price, quantity, np.asarray(tariff_rate, dtype=float) * 100, mpf_fee
+    )
+    if np.ndim(landed_cost_per_unit) == 0:
+        return float(landed_cost_per_unit), float(total_landed_cost)
     return landed_cost_per_unit, total_landed_cost
@@ -0,0 +1,140 @@
+import copy
+import time
+
+import numpy as np
+
+from ..config.config import ANN_EXACT_THRESHOLD, ANN_N_PROBE
+from ..data.row_groups import RowChange, RowGroups
+
+ASSIGN_BATCH = 65536
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores, k):
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+def _assign(vectors, centroids):
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BATCH):
+        labels[start:start + ASSIGN_BATCH] = np.argmax(vectors[start:start + ASSIGN_BATCH] @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=10, sample_size=100000, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)]
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        order = np.argsort(labels, kind="stable")
+        present, starts = np.unique(labels[order], return_index=True)
+        sums = np.zeros_like(centroids)
+        sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = np.bincount(labels, minlength=n_clusters) == 0
+        # Re-seed empty clusters from random sample points
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class VectorIndex:
+    # Cosine-similarity index. Vectors are normalized once here. Small tables are
+    # scanned exactly; larger ones get an inverted-file (IVF) layout where a
+    # query only scores the n_probe lists whose centroids are closest.
+    def __init__(self, vectors, n_probe=ANN_N_PROBE, exact_threshold=ANN_EXACT_THRESHOLD, n_lists=None, seed=0):
+        self.vectors = normalize_rows(vectors)
+        self.n_probe = n_probe
+        self.centroids = None
+        n = len(self.vectors)
+        if n >= max(exact_threshold, 2):
+            n_lists = n_lists or max(1, int(np.sqrt(n)))
+            self.centroids = spherical_kmeans(self.vectors, n_lists, seed=seed)
+            self._lists = RowGroups(_assign(self.vectors, self.centroids), n_lists)
+
+    def extended(self, vectors):
+        # Index with vectors appended after the existing ones. IVF keeps its
+        # centroids and files each new vector under the nearest one instead of
+        # re-clustering, so recall can drift if the new vectors differ a lot.
+        if len(vectors) == 0:
+            return self
+        new = normalize_rows(vectors)
+        index = copy.copy(self)
+        index.vectors = np.concatenate([self.vectors, new])
+        if not self.is_exact:
+            change = RowChange(len(self.vectors), inserted=len(new))
+            ids = np.arange(len(self.vectors), len(index.vectors))
+            index._lists = self._lists.patched(change, ids, _assign(new, self.centroids))
+        return index
+
+    @property
+    def is_exact(self):
+        return self.centroids is None
+
+    def search_exact(self, query, k):
+        query = normalize_rows(np.atleast_2d(query))[0]
+        scores = self.vectors @ query
+        best = _top_k(scores, k)
+        return best, scores[best]
+
+    def search(self, query, k, n_probe=None):
+        if self.is_exact:
+            return self.search_exact(query, k)
+        query = normalize_rows(np.atleast_2d(query))[0]
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        lists = _top_k(self.centroids @ query, n_probe)
+        candidates = np.concatenate([self._lists.group(i) for i in lists])
+        scores = self.vectors[candidates] @ query
+        best = _top_k(scores, k)
+        return candidates[best], scores[best]
+
+
+def measure_recall(index, queries, k=10, n_probe=None):
+    # recall@k of index.search against exact search over the same vectors
+    hits, exact_time, ann_time = 0, 0.0, 0.0
+    for query in np.atleast_2d(queries):
+        start = time.perf_counter()
+        expected, _ = index.search_exact(query, k)
+        exact_time += time.perf_counter() - start
+        start = time.perf_counter()
+        found, _ = index.search(query, k, n_probe)
+        ann_time += time.perf_counter() - start
+        hits += len(np.intersect1d(expected, found))
+    n = len(np.atleast_2d(queries))
+    return {
+        "k": k,
+        "queries": n,
+        "n_probe": None if index.is_exact else min(n_probe or index.n_probe, len(index.centroids)),
+        "recall": hits / max(n * min(k, len(index.vectors)), 1),
+        "exact_ms_per_query": 1000 * exact_time / max(n, 1),
+        "ann_ms_per_query": 1000 * ann_time / max(n, 1),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from .semantic_search import load_embeddings
+
+    parser = argparse.ArgumentParser(description="Measure ANN recall@k against exact search")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-probe", type=int, nargs="*", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--force-ivf", action="store_true", help="build IVF even below ANN_EXACT_THRESHOLD")
+    args = parser.parse_args()
+
+    _, loaded, _ = load_embeddings()
+    index = VectorIndex(loaded.vectors, exact_threshold=2 if args.force_ivf else ANN_EXACT_THRESHOLD)
+    rng = np.random.default_rng(0)
+    queries = index.vectors[rng.choice(len(index.vectors), min(args.queries, len(index.vectors)), replace=False)]
+    for n_probe in args.n_probe:
+        print(measure_recall(index, queries, args.k, n_probe))
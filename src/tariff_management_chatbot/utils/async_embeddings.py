@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import numpy as np
+
+from ..config.config import (
+    EMBEDDING_BACKEND, OPENAI_API_KEY, OPENAI_EMBEDDING_MODEL, OPENAI_MAX_CONCURRENCY, OPENAI_TIMEOUT,
+)
+from .executor import run_in_cpu_pool
+from .metrics import openai_call
+
+OPENAI_EMBEDDINGS_URL = "https://api.openai.com/v1/embeddings"
+
+
+class AsyncOpenAIEmbeddings:
+    # One pooled HTTP/1.1 keep-alive client for all embedding calls, with a
+    # semaphore so slow upstream calls cannot pile up without bound.
+    def __init__(self, api_key=OPENAI_API_KEY, model=OPENAI_EMBEDDING_MODEL,
+                 timeout=OPENAI_TIMEOUT, max_concurrency=OPENAI_MAX_CONCURRENCY):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+
+    def _get_client(self):
+        # The client's connections and the semaphore belong to the event loop
+        # that created them; a new loop (app restart, another TestClient) gets
+        # its own instead of reusing ones bound to a closed loop
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    async def aembed_documents(self, texts):
+        client = self._get_client()
+        with openai_call("embeddings"):
+            async with self._semaphore:
+                response = await client.post(
+                    OPENAI_EMBEDDINGS_URL, json={"model": self.model, "input": list(texts)}
+                )
+            response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda d: d["index"])
+        return np.asarray([d["embedding"] for d in data], dtype=np.float32)
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = self._semaphore = self._loop = None
+
+
+class AsyncEmbeddingsAdapter:
+    # Runs a synchronous (local, CPU-bound) backend on the CPU pool
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", "default")
+
+    async def aembed_documents(self, texts):
+        return await run_in_cpu_pool(self.embeddings.embed_documents, texts)
+
+    async def aembed_query(self, text):
+        return await run_in_cpu_pool(self.embeddings.embed_query, text)
+
+    async def aclose(self):
+        pass
+
+
+def get_async_embeddings(sync_embeddings, backend=None):
+    if (backend or EMBEDDING_BACKEND).lower() == "openai":
+        return AsyncOpenAIEmbeddings()
+    return AsyncEmbeddingsAdapter(sync_embeddings)
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import math
+import time
+from contextlib import aclosing
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from ..config.config import (
+    CHAT_CONTEXT_TOKENS, LLM_BACKEND, OPENAI_API_KEY, OPENAI_CHAT_MODEL, OPENAI_MAX_CONCURRENCY, OPENAI_TIMEOUT,
+)
+from .executor import run_in_cpu_pool
+from .llm_cache import get_llm_cache
+from .metrics import Histogram, openai_call, stage
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+SYSTEM_PROMPT = (
+    "You are a professional supply chain and tariff advisor. Answer from the results given; "
+    "refer to records by Record_ID where it helps."
+)
+CHAT_PARAMS = {"max_tokens": 320, "temperature": 0.15}
+# Columns worth sending to the model; the rest of the row is noise for advice
+CONTEXT_COLUMNS = [
+    "Record_ID", "HTS_Code", "Product_Description", "Company", "Country_of_Origin", "Primary_Material",
+    "Material_Composition", "Material_Cost_USD", "Tariff_Rate_Percent", "Landed_Cost_USD", "FTA_Applicable",
+    "Alternative_Country", "Potential_Savings_USD", "Risk_Level",
+]
+
+FIRST_TOKEN_SECONDS = Histogram(
+    "tariff_chat_first_token_seconds", "Time from a /chat request to its first streamed token.", ("model",)
+)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English and numbers; close enough for a budget
+    return (len(text) + 3) // 4
+
+
+def _cell(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, (float, np.floating)):
+        return f"{float(value):g}"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), default=str)
+    return str(value).replace("|", "/").replace("\n", " ").strip()
+
+
+def _build_record_index(snapshot):
+    return pd.Index(snapshot.df["Record_ID"].astype(str))
+
+
+def _record_index(snapshot):
+    # Record_ID never changes on update, so only inserts and deletes rebuild it
+    return snapshot.derived(
+        "record_index", _build_record_index,
+        lambda index, s: index if not s.change.touches(["Record_ID"]) else _build_record_index(s),
+    )
+
+
+def _table_lines(columns, rows):
+    yield "|".join(columns)
+    for row in rows:
+        yield "|".join(_cell(v) for v in row)
+
+
+def _flatten(data, prefix=""):
+    for key, value in data.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}={_cell(value)}"
+
+
+def _data_lines(data):
+    # Computed results (scenarios, suggestions, calculations) have no Record_ID
+    # to look up; lists of dicts become one table, anything else key=value lines
+    if isinstance(data, dict):
+        yield from _flatten(data)
+    elif isinstance(data, list) and data and all(isinstance(d, dict) for d in data):
+        columns = list(dict.fromkeys(k for d in data for k in d))
+        yield from _table_lines(columns, ([d.get(c) for c in columns] for d in data))
+    elif data is not None:
+        yield _cell(data)
+
+
+def build_context(snapshot, record_ids=(), data=None, max_tokens=CHAT_CONTEXT_TOKENS):
+    # Pipe-separated rows with one header line, cut off at the token budget.
+    # Returns (text, info) where info says how much made it in.
+    lines = []
+    used = 0
+    info = {"rows": 0, "missing_ids": [], "truncated": False}
+
+    def add(line):
+        nonlocal used
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            info["truncated"] = True
+            return False
+        lines.append(line)
+        used += cost
+        return True
+
+    with stage("chat_context"):
+        if record_ids:
+            ids = list(dict.fromkeys(str(i) for i in record_ids))
+            positions = _record_index(snapshot).get_indexer(ids)
+            info["missing_ids"] = [i for i, p in zip(ids, positions) if p < 0]
+            df = snapshot.df
+            columns = [c for c in CONTEXT_COLUMNS if c in df.columns]
+            values = df[columns].iloc[positions[positions >= 0]].itertuples(index=False, name=None)
+            for i, line in enumerate(_table_lines(columns, values)):
+                if not add(line):
+                    break
+                info["rows"] = i
+        if data is not None and not info["truncated"]:
+            if lines:
+                add("")
+            for line in _data_lines(data):
+                if not add(line):
+                    break
+    info["tokens"] = used
+    return "\n".join(lines), info
+
+
+def chat_messages(feature, context, question):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Latest results for {feature}:\n{context}\n\nQuestion: {question}"},
+    ]
+
+
+class AsyncOpenAIChat:
+    # Streaming chat completions on a pooled keep-alive client, like the
+    # embedding client; tokens are yielded as the deltas arrive
+    def __init__(self, api_key=OPENAI_API_KEY, model=OPENAI_CHAT_MODEL,
+                 timeout=OPENAI_TIMEOUT, max_concurrency=OPENAI_MAX_CONCURRENCY):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+
+    def _get_client(self):
+        # Per event loop, like AsyncOpenAIEmbeddings: a restarted app gets a
+        # fresh client and semaphore instead of ones bound to a closed loop
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    async def astream(self, messages, **params):
+        payload = {"model": self.model, "messages": messages, "stream": True, **params}
+        client = self._get_client()
+        with openai_call("chat"):
+            async with self._semaphore:
+                async with client.stream("POST", OPENAI_CHAT_URL, json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        chunk = line[5:].strip()
+                        if chunk == "[DONE]":
+                            break
+                        delta = json.loads(chunk)["choices"][0].get("delta", {})
+                        if delta.get("content"):
+                            yield delta["content"]
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = self._semaphore = self._loop = None
+
+
+class StubChatLLM:
+    # Deterministic local replies: no key, no network. Echoes what it was given
+    # so tests can check that the context and question reached the model.
+    model = "stub"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    async def astream(self, messages, **params):
+        prompt = messages[-1]["content"]
+        context, _, question = prompt.rpartition("\n\nQuestion: ")
+        lines = context.splitlines()[1:]
+        first = lines[1].split("|")[0] if len(lines) > 1 else "none"
+        reply = f"Stub advice for: {question}. Context has {len(lines)} lines; first record {first}."
+        for word in reply.split(" "):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield word + " "
+
+    async def aclose(self):
+        pass
+
+
+def get_chat_llm(backend=None):
+    if (backend or LLM_BACKEND) == "stub":
+        return StubChatLLM()
+    return AsyncOpenAIChat()
+
+
+def sse_event(data, event=None):
+    payload = json.dumps(data, separators=(",", ":"))
+    return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+
+
+async def stream_chat(llm, feature, context, question, info, is_disconnected=None):
+    # Server-Sent Events: one "data" event per token, then "done" (or "error").
+    # A cached answer is sent as a single token; a new one is cached once complete.
+    started = time.perf_counter()
+    messages = chat_messages(feature, context, question)
+    cache = get_llm_cache()
+    cached = await run_in_cpu_pool(cache.get, llm.model, CHAT_PARAMS, messages, question, context)
+    if cached is not None:
+        yield sse_event({"token": cached})
+        yield sse_event({**info, "cached": True}, "done")
+        return
+    parts = []
+    try:
+        # aclosing: on a disconnect the upstream stream is closed right away
+        async with aclosing(llm.astream(messages, **CHAT_PARAMS)) as tokens:
+            async for token in tokens:
+                if not parts:
+                    FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, llm.model)
+                parts.append(token)
+                yield sse_event({"token": token})
+                if is_disconnected is not None and await is_disconnected():
+                    return
+    except Exception as e:
+        yield sse_event({"error": str(e)}, "error")
+        return
+    reply = "".join(parts).strip()
+    if reply:
+        await run_in_cpu_pool(cache.put, llm.model, CHAT_PARAMS, messages, reply, question, context)
+    yield sse_event({**info, "cached": False}, "done")
@@ -1,26 +1,133 @@
+import hashlib
+import json
 import os
-import pandas as pd
+import threading
+from contextlib import contextmanager
+
 import numpy as np
-from dotenv import load_dotenv
-from langchain_community.embeddings import OpenAIEmbeddings
-from sklearn.metrics.pairwise import cosine_similarity
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-_df = None
-_vectors = None
-# Create a single embeddings instance to reuse
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-def load_embeddings():
-    global _df, _vectors
-    if _df is not None and _vectors is not None:
-        return _df, _vectors
-    _df = pd.read_csv("data/tariffs.csv")  # Make sure this file exists
-    descriptions = _df['Product_Description'].astype(str).tolist()
-    _vectors = np.array(embeddings.embed_documents(descriptions))
-    return _df, _vectors
-def semantic_search(query, top_n=3):
-    df, vectors = load_embeddings()
-    query_vec = np.array(embeddings.embed_query(query))
-    sims = cosine_similarity([query_vec], vectors)[0]
-    indices = sims.argsort()[::-1][:top_n]
-    return df.iloc[indices].to_dict(orient="records")
+
+from .metrics import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, see below
+    fcntl = None
+
+# Append-only, content-addressed vector store. A directory holds:
+#   meta.json    {"dim": ..., "count": ...}; count is written last, so a
+#                crash mid-append only leaves unreferenced bytes behind
+#   keys.bin     sha1 digest of each embedded text, 20 bytes per entry
+#   vectors.f32  float32 rows in the same order, memory-mapped on read
+#   lock         flock()ed around every append
+# Several processes (API workers, the benchmark runner) may share a
+# directory: an append holds the lock and first catches up with the rows
+# others committed, so it never truncates them. Where fcntl is missing the
+# store is single-writer: give each process its own EMBEDDING_CACHE_DIR.
+KEY_DTYPE = "S20"
+EMBED_BATCH_SIZE = 512
+
+
+def content_key(text):
+    return hashlib.sha1(str(text).encode("utf-8")).digest()
+
+
+@contextmanager
+def _file_lock(path):
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class EmbeddingStore:
+    def __init__(self, path):
+        self.path = path
+        self.dim = None
+        self.count = 0
+        self._positions = {}
+        self._vectors = None
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._sync()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _sync(self):
+        # Loads the rows committed since this instance last looked, by this
+        # process or another one
+        meta_path = self._file("meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["count"] < self.count:
+            # The directory was replaced underneath us; start over
+            self.count, self._positions = 0, {}
+        if meta["count"] == self.count:
+            return
+        keys = np.fromfile(self._file("keys.bin"), dtype=KEY_DTYPE, count=meta["count"] - self.count,
+                           offset=self.count * 20)
+        for i, key in enumerate(keys.tolist()):
+            self._positions.setdefault(key, self.count + i)
+        self.dim, self.count = meta["dim"], meta["count"]
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r",
+                                  shape=(self.count, self.dim)) if self.count else None
+
+    def _append(self, keys, vectors):
+        with _file_lock(self._file("lock")):
+            self._sync()
+            # Another process may have stored some of these meanwhile
+            fresh = [i for i, key in enumerate(keys) if key not in self._positions]
+            if fresh:
+                self._append_locked([keys[i] for i in fresh], np.asarray(vectors)[fresh])
+
+    def _append_locked(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension changed from {self.dim} to {vectors.shape[1]} in {self.path}")
+        # Truncate to the committed length (just re-read under the lock) so a
+        # torn earlier append cannot misalign rows
+        with open(self._file("vectors.f32"), "ab") as f:
+            f.truncate(self.count * self.dim * 4)
+            f.write(vectors.tobytes())
+        with open(self._file("keys.bin"), "ab") as f:
+            f.truncate(self.count * 20)
+            f.write(np.asarray(keys, dtype=KEY_DTYPE).tobytes())
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "count": self.count + len(keys)}, f)
+        os.replace(tmp, self._file("meta.json"))
+        for i, key in enumerate(keys):
+            self._positions[key] = self.count + i
+        self.count += len(keys)
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r",
+                                  shape=(self.count, self.dim))
+
+    def get_or_embed(self, texts, embed_documents):
+        # Returns a float32 matrix aligned with texts. Only texts whose content
+        # hash is not stored yet are embedded, and each distinct text once.
+        keys = [content_key(t) for t in texts]
+        with self._lock:
+            if any(key not in self._positions for key in keys):
+                self._sync()
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self._positions and key not in missing:
+                    missing[key] = str(text)
+            pending = list(missing.items())
+            for start in range(0, len(pending), EMBED_BATCH_SIZE):
+                batch = pending[start:start + EMBED_BATCH_SIZE]
+                with stage("embedding"):
+                    vectors = np.asarray(embed_documents([text for _, text in batch]), dtype=np.float32)
+                self._append([key for key, _ in batch], vectors)
+            if not keys:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            positions = np.fromiter((self._positions[k] for k in keys), dtype=np.int64, count=len(keys))
+            return np.asarray(self._vectors[positions])
@@ -0,0 +1,69 @@
+import re
+import zlib
+
+import numpy as np
+
+from ..config.config import EMBEDDING_BACKEND, EMBEDDING_DIM, OPENAI_API_KEY, OPENAI_EMBEDDING_MODEL
+from .metrics import openai_call
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbeddings:
+    # Local, CPU-only embeddings: word tokens plus character n-grams hashed
+    # into a fixed number of signed buckets, sublinear tf, L2-normalized.
+    # Same embed_documents/embed_query interface as the langchain clients.
+    def __init__(self, dim=512, ngram_range=(3, 4)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.model = f"hashing-{dim}-{ngram_range[0]}{ngram_range[1]}"
+
+    def _features(self, text):
+        text = " ".join(_TOKEN.findall(str(text).lower()))
+        features = ["w:" + token for token in text.split()]
+        padded = f" {text} "
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.vstack([self._embed(t) for t in texts])
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class CountedEmbeddings:
+    # Wraps a remote client so each call shows up in tariff_openai_requests_total
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", "default")
+
+    def embed_documents(self, texts):
+        with openai_call("embeddings"):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        with openai_call("embeddings"):
+            return self.embeddings.embed_query(text)
+
+
+def get_embeddings(backend=None):
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend == "hashing":
+        return HashingEmbeddings(dim=EMBEDDING_DIM)
+    if backend == "openai":
+        from langchain_community.embeddings import OpenAIEmbeddings
+        return CountedEmbeddings(OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL, openai_api_key=OPENAI_API_KEY))
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Use 'openai' or 'hashing'.")
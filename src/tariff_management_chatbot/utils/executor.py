@@ -0,0 +1,34 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config.config import CPU_WORKERS
+
+# Bounded pool for pandas/NumPy work called from async endpoints, so the
+# event loop stays free and CPU work cannot grow the thread count unbounded.
+# Created on first use and dropped on shutdown, so a restarted app (a second
+# lifespan, --reload, another TestClient) gets a fresh pool.
+_cpu_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_cpu_pool():
+    global _cpu_pool
+    with _pool_lock:
+        if _cpu_pool is None:
+            _cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+        return _cpu_pool
+
+
+def shutdown_cpu_pool(wait=False):
+    global _cpu_pool
+    with _pool_lock:
+        pool, _cpu_pool = _cpu_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+async def run_in_cpu_pool(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_pool(), functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,30 @@
+import zlib
+
+from .serialization import dumps, records
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_CHUNK_ROWS = 5000
+
+
+def iter_export_chunks(df, rows, column_positions=None, fmt="ndjson", chunk_rows=EXPORT_CHUNK_ROWS):
+    # Yields encoded bytes for fixed-size slices of rows, so only one chunk
+    # of rows is materialized at a time regardless of the result size.
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        if fmt == "csv":
+            frame = df.iloc[chunk] if column_positions is None else df.iloc[chunk, column_positions]
+            yield frame.to_csv(index=False, header=start == 0).encode("utf-8")
+        else:
+            yield b"".join(dumps(r) + b"\n" for r in records(df, chunk, column_positions))
+    if len(rows) == 0 and fmt == "csv":
+        columns = df.columns if column_positions is None else df.columns[column_positions]
+        yield (",".join(columns) + "\n").encode("utf-8")
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from ..config.config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH, LLM_CACHE_SIMILARITY, LLM_CACHE_TTL
+from .metrics import Gauge
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    response TEXT NOT NULL,
+    embedding BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses (scope);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+"""
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    # On-disk (SQLite) cache of chat completions. Exact entries are keyed by a
+    # hash of model, parameters and messages. When similarity > 0 and the caller
+    # passes the question separately, a miss falls back to the cached answer
+    # whose question embedding is closest within the same scope (model,
+    # parameters and everything in the prompt except the question).
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 similarity=LLM_CACHE_SIMILARITY, embed_query=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._embed_query = embed_query
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # One connection guarded by _lock; WAL lets other processes read meanwhile
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _embed(self, question):
+        if self._embed_query is None:
+            # Semantic search's query cache: the same embeddings client, and a
+            # question it has already embedded costs no second call
+            from .semantic_search import query_cache
+            self._embed_query = query_cache.get
+        vector = np.asarray(self._embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def keys(model, params, messages, question=None, context=None):
+        key = _digest({"model": model, "params": params, "messages": messages})
+        scope = _digest({"model": model, "params": params, "context": context}) if question else None
+        return key, scope
+
+    def get(self, model, params, messages, question=None, context=None):
+        key, scope = self.keys(model, params, messages, question, context)
+        now = time.time()
+        candidates = []
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ? AND created >= ?",
+                               (key, now - self.ttl)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            if self.similarity > 0 and scope is not None:
+                candidates = conn.execute(
+                    "SELECT key, response, embedding FROM responses "
+                    "WHERE scope = ? AND created >= ? AND embedding IS NOT NULL",
+                    (scope, now - self.ttl),
+                ).fetchall()
+        if candidates:
+            # Embed outside the lock; the embedding backend may be remote
+            vectors = np.vstack([np.frombuffer(c[2], dtype=np.float32) for c in candidates])
+            scores = vectors @ self._embed(question)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity:
+                with self._lock:
+                    self._connect().execute("UPDATE responses SET last_used = ? WHERE key = ?",
+                                            (now, candidates[best][0]))
+                    self.near_hits += 1
+                return candidates[best][1]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model, params, messages, response, question=None, context=None):
+        key, scope = self.keys(model, params, messages, question, context)
+        embedding = None
+        if self.similarity > 0 and question:
+            embedding = self._embed(question).tobytes()
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, created, last_used, response, embedding) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scope or "", now, now, response, embedding),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            # Least recently used first
+            conn.execute("DELETE FROM responses WHERE key IN "
+                         "(SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,))
+
+    def get_or_call(self, call, model, params, messages, question=None, context=None):
+        # call() runs only on a miss; its reply is stored for next time
+        cached = self.get(model, params, messages, question, context)
+        if cached is not None:
+            return cached
+        response = call()
+        self.put(model, params, messages, response, question, context)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+                "size": size,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "similarity": self.similarity,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache()
+    return _cache
+
+
+Gauge("tariff_llm_cache_hit_ratio", "Share of LLM advice requests answered from the response cache.",
+      fn=lambda: _cache.stats()["hit_rate"] if _cache is not None else 0.0)
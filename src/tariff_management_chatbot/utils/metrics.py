@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; spans sub-millisecond index lookups up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labelvalues, extra, value in self.samples():
+            labels = _format_labels(self.labelnames, labelvalues, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [("", k, (), v) for k, v in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    # Values are read at scrape time from fn, which returns a number or, for
+    # labelled gauges, a {labelvalues tuple: number} dict.
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set_function(self, fn):
+        self.fn = fn
+
+    def samples(self):
+        if self.fn is None:
+            return []
+        value = self.fn()
+        if isinstance(value, dict):
+            return [("", k, (), v) for k, v in sorted(value.items())]
+        return [("", (), (), value)]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labelvalues):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = {k: list(v) for k, v in sorted(self._series.items())}
+        out = []
+        for labelvalues, series in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                out.append(("_bucket", labelvalues, (("le", _format_value(bound)),), cumulative))
+            out.append(("_sum", labelvalues, (), series[-1]))
+            out.append(("_count", labelvalues, (), cumulative))
+        return out
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+
+def render_metrics():
+    # Prometheus text exposition format 0.0.4
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "tariff_http_request_duration_seconds",
+    "Time from request start until the last response byte is sent.",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "tariff_stage_duration_seconds",
+    "Time spent in one processing stage of a request.",
+    ("stage",),
+)
+OPENAI_REQUESTS = Counter(
+    "tariff_openai_requests_total",
+    "Calls made to the OpenAI API.",
+    ("operation", "outcome"),
+)
+
+
+def stage(name):
+    # Stages: data_load, filter, embedding, similarity_search, materialize, serialization
+    return STAGE_SECONDS.time(name)
+
+
+@contextmanager
+def openai_call(operation):
+    # outcome: "ok", "error", or "cancelled" when our side stopped the call
+    # (a client disconnect closing a stream, a cancelled request)
+    try:
+        yield
+    except (GeneratorExit, asyncio.CancelledError):
+        OPENAI_REQUESTS.inc(operation, "cancelled")
+        raise
+    except BaseException:
+        OPENAI_REQUESTS.inc(operation, "error")
+        raise
+    OPENAI_REQUESTS.inc(operation, "ok")
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from .metrics import stage
+
+
+def normalize_query(text):
+    return " ".join(str(text).split()).lower()
+
+
+class QueryEmbeddingCache:
+    # Bounded LRU of query vectors with a TTL. Concurrent misses for the same
+    # normalized query share one in-flight embed_query call.
+    def __init__(self, embed_query, maxsize=1024, ttl=3600.0, aembed_query=None):
+        self.embed_query = embed_query
+        self.aembed_query = aembed_query
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        # Returns (vector, None, False) on a hit, otherwise (None, future, owner)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], None, False
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+            return None, future, owner
+
+    def get(self, text):
+        key = normalize_query(text)
+        vector, future, owner = self._lookup(key)
+        if vector is not None:
+            return vector
+        if not owner:
+            return future.result()
+        try:
+            with stage("embedding"):
+                vector = self.embed_query(text)
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        return self._complete(key, future, vector)
+
+    async def aget(self, text):
+        # Same cache and in-flight table as get(), so sync and async callers coalesce too
+        key = normalize_query(text)
+        vector, future, owner = self._lookup(key)
+        if vector is not None:
+            return vector
+        if owner:
+            # The embed runs as its own task, so cancelling the request that
+            # started it does not fail the callers coalesced onto it
+            task = asyncio.ensure_future(self._aembed(key, text, future))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        # shield: a cancelled caller must not cancel the shared future
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    async def _aembed(self, key, text, future):
+        try:
+            with stage("embedding"):
+                if self.aembed_query is not None:
+                    vector = await self.aembed_query(text)
+                else:
+                    vector = await asyncio.get_running_loop().run_in_executor(None, self.embed_query, text)
+        except BaseException as e:
+            # Raised to every waiter through the future
+            self._fail(key, future, e)
+            return
+        self._complete(key, future, vector)
+
+    def _fail(self, key, future, error):
+        with self._lock:
+            del self._inflight[key]
+        future.set_exception(error)
+
+    def _complete(self, key, future, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            del self._inflight[key]
+        future.set_result(vector)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+            }
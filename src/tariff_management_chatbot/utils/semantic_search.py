@@ -1,29 +1,85 @@
 import os
-import pandas as pd
-import numpy as np
-from dotenv import load_dotenv
-from langchain_community.embeddings import OpenAIEmbeddings
-from sklearn.metrics.pairwise import cosine_similarity
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-_df = None
-_vectors = None
-# Create a single embeddings instance to reuse
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+import threading
+from ..config.config import EMBEDDING_CACHE_DIR, QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+from ..data.store import get_tariff_store
+from ..data.text_index import get_text_index
+from .ann_index import VectorIndex
+from .embed_store import EmbeddingStore
+from .async_embeddings import get_async_embeddings
+from .embeddings import get_embeddings
+from .executor import run_in_cpu_pool
+from .metrics import Gauge, stage
+from .query_cache import QueryEmbeddingCache
+# (version, df, index, descriptions), replaced in one assignment so readers
+# never see parts of two versions
+_loaded = None
+_load_lock = threading.Lock()
+_store = None
+# Create a single embeddings instance to reuse; backend comes from EMBEDDING_BACKEND
+embeddings = get_embeddings()
+async_embeddings = get_async_embeddings(embeddings)
+query_cache = QueryEmbeddingCache(embeddings.embed_query, QUERY_CACHE_SIZE, QUERY_CACHE_TTL,
+                                  aembed_query=async_embeddings.aembed_query)
+Gauge("tariff_query_cache_hit_ratio", "Share of query embedding lookups served without a new embed call.",
+      fn=lambda: query_cache.stats()["hit_rate"])
+Gauge("tariff_query_cache_entries", "Query vectors currently cached.",
+      fn=lambda: query_cache.stats()["size"])
+def get_embedding_store():
+    global _store
+    if _store is None:
+        # One store per embedding model so vectors from different models never mix
+        _store = EmbeddingStore(os.path.join(EMBEDDING_CACHE_DIR, getattr(embeddings, "model", "default")))
+    return _store
 def load_embeddings():
-    global _df, _vectors
-    if _df is not None and _vectors is not None:
-        return _df, _vectors
-    _df = pd.read_csv("data/tariffs.csv")
-    descriptions = _df['Product_Description'].astype(str).tolist()
-    _vectors = np.array(embeddings.embed_documents(descriptions))
-    return _df, _vectors
+    # Vectors are kept per distinct Product_Description; descriptions maps
+    # each distinct value back to its rows.
+    global _loaded
+    snapshot = get_tariff_store().snapshot()
+    loaded = _loaded
+    if loaded is not None and loaded[0] == snapshot.version:
+        return loaded[1:]
+    with _load_lock:
+        # Another thread may have loaded this version (or extended the index) meanwhile
+        loaded = _loaded
+        if loaded is not None and loaded[0] == snapshot.version:
+            return loaded[1:]
+        index, previous = (loaded[2], loaded[3]) if loaded is not None else (None, None)
+        descriptions = get_text_index(snapshot).columns['Product_Description']
+        if index is None or descriptions is not previous:
+            parent = descriptions.parent() if descriptions.parent is not None else None
+            if index is not None and parent is previous:
+                # Patched after a delta: distinct values only grew, so embed and file just the new ones
+                texts = [str(v) for v in descriptions.distinct[len(parent.distinct):]]
+                index = index.extended(get_embedding_store().get_or_embed(texts, embeddings.embed_documents))
+            else:
+                texts = [str(v) for v in descriptions.distinct]
+                index = VectorIndex(get_embedding_store().get_or_embed(texts, embeddings.embed_documents))
+        _loaded = (snapshot.version, snapshot.df, index, descriptions)
+        return _loaded[1:]
+def search_by_vector(query_vec, top_n=3):
+    df, index, descriptions = load_embeddings()
+    # A description left without rows by a delta still has a vector, so widen
+    # the search until top_n rows are found or every vector has been scored
+    k = top_n
+    while True:
+        with stage("similarity_search"):
+            value_ids, _ = index.search(query_vec, k)
+        rows = []
+        for value_id in value_ids:
+            rows.extend(descriptions.rows_for_values([value_id]).tolist())
+            if len(rows) >= top_n:
+                break
+        if len(rows) >= top_n or k >= len(index.vectors):
+            break
+        k *= 2
+    return df.iloc[rows[:top_n]].to_dict(orient="records")
 def semantic_search(query, top_n=3):
-    df, vectors = load_embeddings()
-    query_vec = np.array(embeddings.embed_query(query))
-    sims = cosine_similarity([query_vec], vectors)[0]
-    indices = sims.argsort()[::-1][:top_n]
-    return df.iloc[indices].to_dict(orient="records")
+    return search_by_vector(query_cache.get(query), top_n)
+async def asemantic_search(query, top_n=3):
+    # Embedding call awaits on the pooled async client; the vector search
+    # (and a cold load_embeddings) runs on the bounded CPU pool.
+    query_vec = await query_cache.aget(query)
+    return await run_in_cpu_pool(search_by_vector, query_vec, top_n)
 
 # Optional: quick test when running the script
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import json
+import math
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+from .metrics import stage
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib fallback is slower but equivalent
+    orjson = None
+
+MAX_PAGE_SIZE = 1000
+
+
+def _default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _sanitize(obj):
+    # stdlib json writes NaN/Infinity literals, which are not valid JSON
+    if isinstance(obj, float):
+        return None if math.isnan(obj) or math.isinf(obj) else obj
+    if isinstance(obj, dict):
+        return {k: _sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return _sanitize(obj.item())
+    return obj
+
+
+def dumps(content):
+    if orjson is not None:
+        # orjson writes NaN as null and handles NumPy scalars/arrays natively
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_sanitize(content), default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        with stage("serialization"):
+            return dumps(content)
+
+
+def cursor_scope(endpoint, **query):
+    # Short hash of the endpoint and filters a cursor pages through
+    raw = json.dumps([endpoint, sorted(query.items())], separators=(",", ":")).encode()
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def _column_list(columns):
+    return ",".join(c.strip() for c in columns.split(",") if c.strip())
+
+
+def encode_cursor(version, offset, scope="", columns=""):
+    raw = json.dumps({"v": version, "o": int(offset), "s": scope, "c": _column_list(columns)},
+                     separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, version, scope="", columns=""):
+    # Returns (offset, columns). Cursors are row offsets into one query's
+    # matches, so they are only valid for the dataset version, endpoint and
+    # filters they came from; the column projection carries over to the next
+    # page when the request leaves columns out.
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_version, offset = int(payload["v"]), int(payload["o"])
+        issued_scope, issued_columns = str(payload["s"]), str(payload["c"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if issued_scope != scope:
+        raise ValueError("Cursor belongs to a different query. Restart from the first page.")
+    if columns and _column_list(columns) != issued_columns:
+        raise ValueError("Cursor was issued for different columns. Restart from the first page.")
+    if cursor_version != version or offset < 0:
+        raise ValueError("Cursor expired: the dataset changed. Restart from the first page.")
+    return offset, issued_columns
+
+
+def parse_column_names(available, columns):
+    # "HTS_Code,Company" -> ["HTS_Code", "Company"]; empty means every column
+    if not columns:
+        return None
+    names = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in names if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return names
+
+
+def parse_columns(df, columns):
+    # Same as parse_column_names, but as positional indexes into df
+    names = parse_column_names(df.columns, columns)
+    return None if names is None else [df.columns.get_loc(c) for c in names]
+
+
+def records(df, rows, column_positions=None):
+    with stage("materialize"):
+        if column_positions is None:
+            return df.iloc[rows].to_dict(orient="records")
+        return df.iloc[rows, column_positions].to_dict(orient="records")
+
+
+def page_response(snapshot, rows, limit, offset=0, cursor="", columns="", scope="", **extra):
+    # Slice the matching row positions first and only materialize the page.
+    # scope (see cursor_scope) ties the page's cursors to this query.
+    try:
+        if cursor:
+            offset, columns = decode_cursor(cursor, snapshot.version, scope, columns)
+        positions = parse_columns(snapshot.df, columns)
+    except ValueError as e:
+        return FastJSONResponse({"error": str(e)})
+    page = rows[offset:offset + limit]
+    return cursor_page(snapshot.version, len(rows), offset, records(snapshot.df, page, positions),
+                       scope, columns, **extra)
+
+
+def cursor_page(version, total, offset, results, scope="", columns="", **extra):
+    next_offset = offset + len(results)
+    return FastJSONResponse({
+        "count": total,
+        **extra,
+        "offset": offset,
+        "results": results,
+        "next_cursor": encode_cursor(version, next_offset, scope, columns) if next_offset < total else None,
+    })
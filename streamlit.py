@@ -1,15 +1,12 @@
-import os
 import streamlit as st
 import requests
 import pandas as pd
 import json
-import openai
 from dotenv import load_dotenv
+from backend_client import BACKEND_URL, BackendClient
 
-# --- Load .env and OpenAI Key ---
+# --- Load .env ---
 load_dotenv()
-openai_key = os.getenv("OPENAI_API_KEY")
-print("OPENAI API KEY loaded?", bool(openai_key), "| Value is:", repr(openai_key)[:15])
 
 # --- Streamlit Page Config and Styling ---
 st.set_page_config(
@@ -21,34 +18,77 @@ st.set_page_config(
 
 
 
-# --- OpenAI Chatbot Function ---
-def ask_ai_about_result(feature, data, question, openai_key):
-    prompt = f"You are a professional supply chain and tariff advisor. Here are the latest results for {feature}:\n\n{data}\n\nUser question: {question}\n\nAdvice:"
-    print("\n---OPENAI PROMPT---\n", prompt)
-    try:
-        if not openai_key or len(openai_key.strip()) < 10:
-            raise ValueError("OpenAI key missing or invalid.")
-        completion = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            api_key=openai_key,
-            messages=[
-                {"role": "system", "content": "You are a professional assistant for supply chain, tariff, and sourcing analytics."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=320,
-            temperature=0.15
-        )
-        reply = completion.choices[0].message['content'].strip()
-        print("---OPENAI REPLY---\n", reply)
-        return reply
-    except Exception as e:
-        print("---OPENAI CHAT ERROR---\n", e)
-        return f"**AI chat error:** {e}"
+# --- Backend Client ---
+@st.cache_resource
+def get_backend_client():
+    # Shared across reruns and sessions: one pooled session and response cache
+    return BackendClient(BACKEND_URL)
+
+backend = get_backend_client()
+
+# Results and AI replies survive reruns, so a chat submit does not refetch
+st.session_state.setdefault("results", {})
+st.session_state.setdefault("replies", {})
+
+# Form inputs by widget key; these defaults pre-fill the forms
+DEFAULTS = {
+    "search_query": "High-quality cotton gloves from India", "search_top_n": 3,
+    "scenario_product": "gloves", "scenario_material": "", "scenario_country": "",
+    "scenario_sort_by": "Landed_Cost_USD", "scenario_direction": "Ascending",
+    "material_product": "gloves", "material_hts": "",
+    "whatif_query": "What is the lowest landed cost for cotton gloves if sourced from Vietnam?",
+    "whatif_top_n": 1, "whatif_sort_by": "Landed_Cost_USD", "whatif_direction": "Ascending",
+    "lookup_query": "tariff rate for leather shoes from Indonesia", "lookup_top_n": 3,
+    "calc_cost": 10.0, "calc_quantity": 100, "calc_rate": 5.0, "calc_other_fees": 25.0,
+}
+
+
+def form_value(key):
+    return st.session_state.get(key, DEFAULTS[key])
+
+
+def _direction(key):
+    return "asc" if form_value(key) == "Ascending" else "desc"
+
+
+def tab_request(tab):
+    # (path, params) for a tab's current (last submitted) form inputs
+    if tab == "search":
+        return "/smart-product-search", {"query": form_value("search_query"), "top_n": form_value("search_top_n")}
+    if tab == "scenario":
+        return "/scenario-simulation", {
+            "product_name": form_value("scenario_product"),
+            "alt_material": form_value("scenario_material"),
+            "alt_country": form_value("scenario_country"),
+            "sort_by": form_value("scenario_sort_by"),
+            "direction": _direction("scenario_direction")
+        }
+    if tab == "material":
+        params = {"product_name": form_value("material_product")}
+        if form_value("material_hts"):
+            params["hts_code"] = form_value("material_hts")
+        return "/material-optimization", params
+    if tab == "whatif":
+        return "/semantic-scenario-simulation", {
+            "query": form_value("whatif_query"),
+            "top_n": form_value("whatif_top_n"),
+            "sort_by": form_value("whatif_sort_by"),
+            "direction": _direction("whatif_direction")
+        }
+    if tab == "lookup":
+        return "/semantic-tariff-lookup", {"query": form_value("lookup_query"), "top_n": form_value("lookup_top_n")}
+    return "/calculate-tariff", {
+        "material_cost_usd": form_value("calc_cost"),
+        "quantity": form_value("calc_quantity"),
+        "tariff_rate_percent": form_value("calc_rate"),
+        "other_fees_usd": form_value("calc_other_fees")
+    }
+
+
+TABS = ["search", "scenario", "material", "whatif", "lookup", "calc"]
 
 
 # --- API Response Handling ---
-BACKEND_URL = "http://127.0.0.1:8000"
-
 def handle_api_response(resp):
     if resp.status_code == 200:
         try:
@@ -63,6 +103,60 @@ def handle_api_response(resp):
         return None
 
 
+def store_result(tab, resp):
+    if isinstance(resp, requests.RequestException):
+        st.error(f"Backend unreachable: {resp}")
+        data = None
+    else:
+        data = handle_api_response(resp)
+    st.session_state.results[tab] = data
+    st.session_state.replies.pop(tab, None)
+
+
+def fetch_tab(tab):
+    path, params = tab_request(tab)
+    try:
+        resp = backend.get(path, params)
+    except requests.RequestException as e:
+        resp = e
+    store_result(tab, resp)
+
+
+def reply_html(text):
+    return (f"<div style='background:#1c2837;padding:10px 18px;border-radius:10px;margin:18px 0;'>"
+            f"<b>AI:</b> {text}</div>")
+
+
+def stream_ai_reply(feature, question, record_ids, data, placeholder):
+    # The backend builds the prompt from the rows it holds and streams tokens
+    # back; each one is drawn as it arrives
+    body = {"question": question, "feature": feature, "record_ids": record_ids or [], "data": data}
+    reply = ""
+    try:
+        for event, payload in backend.stream_events("/chat", json=body):
+            message = json.loads(payload)
+            if event == "error":
+                return f"**AI chat error:** {message['error']}"
+            if event == "message":
+                reply += message["token"]
+                placeholder.markdown(reply_html(reply + "▌"), unsafe_allow_html=True)
+    except requests.RequestException as e:
+        return f"**AI chat error:** {e}"
+    return reply.strip()
+
+
+def show_chat(tab, feature, label, record_ids=None, data=None):
+    with st.form(f"chat_form_{tab}"):
+        st.markdown("#### 💬 Chat About These Results")
+        user_q = st.text_input(label, key=f"{tab}_chat")
+        chat_submitted = st.form_submit_button("Ask AI")
+    placeholder = st.empty()
+    if chat_submitted and user_q:
+        st.session_state.replies[tab] = stream_ai_reply(feature, user_q, record_ids, data, placeholder)
+    if tab in st.session_state.replies:
+        placeholder.markdown(reply_html(st.session_state.replies[tab]), unsafe_allow_html=True)
+
+
 # --- Utility: No Results Message ---
 def show_no_results_message(title="No Results Found", message="Please try adjusting your input.", icon="🤷‍♀️"):
     with st.container():
@@ -89,6 +183,12 @@ with st.sidebar:
         st.markdown("1. Select a feature tab.\n2. Fill in the inputs.\n3. Get instant insights.")
     st.markdown("---")
     st.warning("**Backend must be running for live results.**", icon="⚠️")
+    if st.button("⚡ Run all tabs", use_container_width=True):
+        # Fetch every tab with its current inputs in parallel
+        with st.spinner("Fetching all tabs..."):
+            responses = backend.get_many({tab: tab_request(tab) for tab in TABS})
+        for tab in TABS:
+            store_result(tab, responses[tab])
 
 
 # --- Header ---
@@ -111,30 +211,20 @@ with tab1:
     st.header("Smart Product Search")
     with st.container():
         with st.form("smart_product_form"):
-            query = st.text_input("Search phrase", value="High-quality cotton gloves from India")
-            top_n = st.selectbox("Number of matches to return", options=list(range(1, 11)), index=2)
+            st.text_input("Search phrase", value=DEFAULTS["search_query"], key="search_query")
+            st.selectbox("Number of matches to return", options=list(range(1, 11)), index=2, key="search_top_n")
             submitted_search = st.form_submit_button("🔍 Find Products", use_container_width=True)
 
     if submitted_search:
         with st.spinner("AI searching for products..."):
-            resp = requests.get(f"{BACKEND_URL}/smart-product-search", params={"query": query, "top_n": top_n})
-            data = handle_api_response(resp)
+            fetch_tab("search")
+    if "search" in st.session_state.results:
+        data = st.session_state.results["search"]
         if data and data.get("results"):
             df = pd.DataFrame(data["results"])
             st.dataframe(df, use_container_width=True)
-            with st.form("chat_form_tab1"):
-                st.markdown("#### 💬 Chat About These Results")
-                user_q = st.text_input("Ask about these products:", key="tab1_chat")
-                chat_submitted = st.form_submit_button("Ask AI")
-            if chat_submitted and user_q:
-                with st.spinner("AI thinking..."):
-                    ai_reply = ask_ai_about_result("Smart Product Search", df.head(3).to_string(index=False), user_q, openai_key)
-                st.markdown(
-                    f"<div style='background:#1c2837;padding:10px 18px;border-radius:10px;margin:18px 0;'>"
-                    f"<b>AI:</b> {ai_reply}</div>",
-                    unsafe_allow_html=True
-                )
-        elif submitted_search:
+            show_chat("search", "Smart Product Search", "Ask about these products:", record_ids=df["Record_ID"].tolist())
+        else:
             show_no_results_message("No Products Found", "Try broader keywords or change filters.", "🔍")
 
 
@@ -145,43 +235,25 @@ with tab2:
         col1, col2 = st.columns(2, gap="large")
         with col1:
             with st.container():
-                product_name = st.text_input("Base Product Name", value="gloves")
-                alt_material = st.text_input("Substitute Material", placeholder="e.g., rubber, nitrile")
-                alt_country = st.text_input("New Source Country", placeholder="e.g., Vietnam, Malaysia")
+                st.text_input("Base Product Name", value=DEFAULTS["scenario_product"], key="scenario_product")
+                st.text_input("Substitute Material", placeholder="e.g., rubber, nitrile", key="scenario_material")
+                st.text_input("New Source Country", placeholder="e.g., Vietnam, Malaysia", key="scenario_country")
         with col2:
             with st.container():
-                sort_by = st.selectbox("Sort results by", ["Landed_Cost_USD", "Tariff_Rate_Percent", "Material_Cost_USD"])
-                direction = st.radio("Sort order", ["Ascending", "Descending"], horizontal=True)
-                direction_val = "asc" if direction == "Ascending" else "desc"
+                st.selectbox("Sort results by", ["Landed_Cost_USD", "Tariff_Rate_Percent", "Material_Cost_USD"], key="scenario_sort_by")
+                st.radio("Sort order", ["Ascending", "Descending"], horizontal=True, key="scenario_direction")
         submitted_scenario = st.form_submit_button("🧪 Run Simulation", use_container_width=True)
 
     if submitted_scenario:
         with st.spinner("Modeling scenarios..."):
-            params = {
-                "product_name": product_name,
-                "alt_material": alt_material,
-                "alt_country": alt_country,
-                "sort_by": sort_by,
-                "direction": direction_val
-            }
-            resp = requests.get(f"{BACKEND_URL}/scenario-simulation", params=params)
-            data = handle_api_response(resp)
+            fetch_tab("scenario")
+    if "scenario" in st.session_state.results:
+        data = st.session_state.results["scenario"]
         if data and data.get("scenarios"):
             df = pd.DataFrame(data["scenarios"])
             st.dataframe(df, use_container_width=True)
-            with st.form("chat_form_tab2"):
-                st.markdown("#### 💬 Chat About These Results")
-                user_q = st.text_input("Ask about these scenarios:", key="tab2_chat")
-                chat_submitted = st.form_submit_button("Ask AI")
-            if chat_submitted and user_q:
-                with st.spinner("AI thinking..."):
-                    ai_reply = ask_ai_about_result("Scenario Simulation", df.head(3).to_string(index=False), user_q, openai_key)
-                st.markdown(
-                    f"<div style='background:#1c2837;padding:10px 18px;border-radius:10px;margin:18px 0;'>"
-                    f"<b>AI:</b> {ai_reply}</div>",
-                    unsafe_allow_html=True
-                )
-        elif submitted_scenario:
+            show_chat("scenario", "Scenario Simulation", "Ask about these scenarios:", data=data["scenarios"])
+        else:
             show_no_results_message("No Scenarios Generated", "Try different inputs or fewer alternatives.", "🧪")
 
 
@@ -192,33 +264,20 @@ with tab3:
         with st.form("material_form"):
             col1, col2 = st.columns(2)
             with col1:
-                product_name = st.text_input("Product Name to Optimize", value="gloves")
+                st.text_input("Product Name to Optimize", value=DEFAULTS["material_product"], key="material_product")
             with col2:
-                hts_code = st.text_input("HTS Code (Optional)")
+                st.text_input("HTS Code (Optional)", key="material_hts")
             submitted_material = st.form_submit_button("🌱 Suggest Materials", use_container_width=True)
 
     if submitted_material:
         with st.spinner("Analyzing material alternatives..."):
-            params = {"product_name": product_name}
-            if hts_code:
-                params["hts_code"] = hts_code
-            resp = requests.get(f"{BACKEND_URL}/material-optimization", params=params)
-            data = handle_api_response(resp)
+            fetch_tab("material")
+    if "material" in st.session_state.results:
+        data = st.session_state.results["material"]
         if data and data.get("suggestions"):
             st.json(data['suggestions'])
-            with st.form("chat_form_tab3"):
-                st.markdown("#### 💬 Chat About These Suggestions")
-                user_q = st.text_input("Ask about these material options:", key="tab3_chat")
-                chat_submitted = st.form_submit_button("Ask AI")
-            if chat_submitted and user_q:
-                with st.spinner("AI thinking..."):
-                    ai_reply = ask_ai_about_result("Material Optimization", json.dumps(data['suggestions'], indent=2), user_q, openai_key)
-                st.markdown(
-                    f"<div style='background:#1c2837;padding:10px 18px;border-radius:10px;margin:18px 0;'>"
-                    f"<b>AI:</b> {ai_reply}</div>",
-                    unsafe_allow_html=True
-                )
-        elif submitted_material:
+            show_chat("material", "Material Optimization", "Ask about these material options:", data=data['suggestions'])
+        else:
             show_no_results_message("No Suggestions Found", "Try a different product name.", "🌱")
 
 
@@ -227,38 +286,26 @@ with tab4:
     st.header("Semantic What-If Scenario")
     with st.container():
         with st.form("semantic_scenario_form"):
-            query = st.text_area("Question", value="What is the lowest landed cost for cotton gloves if sourced from Vietnam?", height=100)
+            st.text_area("Question", value=DEFAULTS["whatif_query"], height=100, key="whatif_query")
             col1, col2, col3 = st.columns(3)
             with col1:
-                top_n = st.selectbox("Candidate products", options=list(range(1, 6)), index=0)
+                st.selectbox("Candidate products", options=list(range(1, 6)), index=0, key="whatif_top_n")
             with col2:
-                sort_by = st.selectbox("Sort by", ["Landed_Cost_USD", "Tariff_Rate_Percent"])
+                st.selectbox("Sort by", ["Landed_Cost_USD", "Tariff_Rate_Percent"], key="whatif_sort_by")
             with col3:
-                direction = st.radio("Order", ["Ascending", "Descending"])
-                direction_val = "asc" if direction == "Ascending" else "desc"
+                st.radio("Order", ["Ascending", "Descending"], key="whatif_direction")
             submitted_whatif = st.form_submit_button("💡 Run AI Scenario", use_container_width=True)
 
     if submitted_whatif:
         with st.spinner("AI is interpreting and simulating..."):
-            params = {"query": query, "top_n": top_n, "sort_by": sort_by, "direction": direction_val}
-            resp = requests.get(f"{BACKEND_URL}/semantic-scenario-simulation", params=params)
-            data = handle_api_response(resp)
+            fetch_tab("whatif")
+    if "whatif" in st.session_state.results:
+        data = st.session_state.results["whatif"]
         if data and data.get("scenarios"):
             df = pd.DataFrame(data["scenarios"])
             st.dataframe(df, use_container_width=True)
-            with st.form("chat_form_tab4"):
-                st.markdown("#### 💬 Chat About These Results")
-                user_q = st.text_input("Ask about these scenarios:", key="tab4_chat")
-                chat_submitted = st.form_submit_button("Ask AI")
-            if chat_submitted and user_q:
-                with st.spinner("AI thinking..."):
-                    ai_reply = ask_ai_about_result("Semantic What-If Scenario", df.head(3).to_string(index=False), user_q, openai_key)
-                st.markdown(
-                    f"<div style='background:#1c2837;padding:10px 18px;border-radius:10px;margin:18px 0;'>"
-                    f"<b>AI:</b> {ai_reply}</div>",
-                    unsafe_allow_html=True
-                )
-        elif submitted_whatif:
+            show_chat("whatif", "Semantic What-If Scenario", "Ask about these scenarios:", data=data["scenarios"])
+        else:
             show_no_results_message("Simulation Failed", "Try rephrasing your question.", "💡")
 
 
@@ -267,30 +314,20 @@ with tab5:
     st.header("Tariff Lookup")
     with st.container():
         with st.form("semantic_lookup_form"):
-            query = st.text_input("Enter your tariff question", value="tariff rate for leather shoes from Indonesia")
-            top_n = st.selectbox("Number of results", options=list(range(1, 11)), index=2)
+            st.text_input("Enter your tariff question", value=DEFAULTS["lookup_query"], key="lookup_query")
+            st.selectbox("Number of results", options=list(range(1, 11)), index=2, key="lookup_top_n")
             submitted_lookup = st.form_submit_button("🔎 Find Tariff Info", use_container_width=True)
 
     if submitted_lookup:
         with st.spinner("AI is searching for tariff info..."):
-            resp = requests.get(f"{BACKEND_URL}/semantic-tariff-lookup", params={"query": query, "top_n": top_n})
-            data = handle_api_response(resp)
+            fetch_tab("lookup")
+    if "lookup" in st.session_state.results:
+        data = st.session_state.results["lookup"]
         if data and data.get("matches"):
             df = pd.DataFrame(data["matches"])
             st.dataframe(df, use_container_width=True)
-            with st.form("chat_form_tab5"):
-                st.markdown("#### 💬 Chat About These Results")
-                user_q = st.text_input("Ask about these tariffs:", key="tab5_chat")
-                chat_submitted = st.form_submit_button("Ask AI")
-            if chat_submitted and user_q:
-                with st.spinner("AI thinking..."):
-                    ai_reply = ask_ai_about_result("Tariff Lookup", df.head(3).to_string(index=False), user_q, openai_key)
-                st.markdown(
-                    f"<div style='background:#1c2837;padding:10px 18px;border-radius:10px;margin:18px 0;'>"
-                    f"<b>AI:</b> {ai_reply}</div>",
-                    unsafe_allow_html=True
-                )
-        elif submitted_lookup:
+            show_chat("lookup", "Tariff Lookup", "Ask about these tariffs:", record_ids=df["Record_ID"].tolist())
+        else:
             show_no_results_message("No Tariff Info Found", "Try simplifying the product description or checking spelling.", "🧾")
 
 
@@ -301,36 +338,18 @@ with tab6:
         col1, col2 = st.columns(2, gap="large")
         with col1:
             with st.container():
-                material_cost_usd = st.number_input("Unit Cost (USD)", min_value=0.0, value=10.0, step=0.01)
-                quantity = st.number_input("Quantity (units)", min_value=1, value=100)
+                st.number_input("Unit Cost (USD)", min_value=0.0, value=DEFAULTS["calc_cost"], step=0.01, key="calc_cost")
+                st.number_input("Quantity (units)", min_value=1, value=DEFAULTS["calc_quantity"], key="calc_quantity")
         with col2:
             with st.container():
-                tariff_rate_percent = st.number_input("Tariff Rate (%)", min_value=0.0, value=5.0, step=0.01)
-                other_fees_usd = st.number_input("Other Fees (USD)", min_value=0.0, value=25.0, step=0.01)
+                st.number_input("Tariff Rate (%)", min_value=0.0, value=DEFAULTS["calc_rate"], step=0.01, key="calc_rate")
+                st.number_input("Other Fees (USD)", min_value=0.0, value=DEFAULTS["calc_other_fees"], step=0.01, key="calc_other_fees")
         submitted_calc = st.form_submit_button("🔢 Calculate Landed Cost", use_container_width=True)
 
     if submitted_calc:
         with st.spinner("Calculating..."):
-            params = {
-                "material_cost_usd": material_cost_usd,
-                "quantity": quantity,
-                "tariff_rate_percent": tariff_rate_percent,
-                "other_fees_usd": other_fees_usd
-            }
-            resp = requests.get(f"{BACKEND_URL}/calculate-tariff", params=params)
-            data = handle_api_response(resp)
-        if data:
-            st.json(data)
-            with st.form("chat_form_tab6"):
-                st.markdown("#### 💬 Chat About This Calculation")
-                user_q = st.text_input("Ask about this calculation:", key="tab6_chat")
-   
-                chat_submitted = st.form_submit_button("Ask AI")
-            if chat_submitted and user_q:
-                with st.spinner("AI thinking..."):
-                    ai_reply = ask_ai_about_result("Landed Cost Calculation", json.dumps(data, indent=2), user_q, openai_key)
-                st.markdown(
-                    f"<div style='background:#1c2837;padding:10px 18px;border-radius:10px;margin:18px 0;'>"
-                    f"<b>AI:</b> {ai_reply}</div>",
-                    unsafe_allow_html=True
-                )
+            fetch_tab("calc")
+    data = st.session_state.results.get("calc")
+    if data:
+        st.json(data)
+        show_chat("calc", "Landed Cost Calculation", "Ask about this calculation:", data=data)
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Offline, deterministic backends and throwaway caches; set before config is imported
+_tmp = tempfile.mkdtemp(prefix="tariff-tests-")
+os.environ.setdefault("TARIFF_CSV", os.path.join(ROOT, "data", "tariffs.csv"))
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(_tmp, "embeddings"))
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_tmp, "llm_cache.db"))
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
@@ -0,0 +1,51 @@
+import numpy as np
+
+from src.tariff_management_chatbot.utils.ann_index import VectorIndex, measure_recall
+
+
+def _vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_extended_index_finds_appended_vectors():
+    base, extra = _vectors(400), _vectors(20, seed=1)
+    for exact_threshold in (10_000, 2):
+        index = VectorIndex(base, exact_threshold=exact_threshold, n_lists=8)
+        extended = index.extended(extra)
+        assert extended.is_exact == index.is_exact
+        assert len(extended.vectors) == 420 and len(index.vectors) == 400
+        for i, query in enumerate(extra):
+            found, _ = extended.search(query, 1, n_probe=8)
+            assert found.tolist() == [400 + i]
+
+
+def _clustered(n, dim=32, clusters=40, seed=0):
+    # Embedding-like data: points spread around a few dozen directions
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    return (centers[rng.integers(clusters, size=n)] + 0.35 * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+def test_exact_search_is_a_full_cosine_ranking():
+    vectors = _vectors(300)
+    index = VectorIndex(vectors)
+    assert index.is_exact
+    query = _vectors(1, seed=5)[0]
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))), kind="stable")[:10]
+    found, scores = index.search(query, 10)
+    assert found.tolist() == expected.tolist()
+    assert np.all(np.diff(scores) <= 0)
+    assert measure_recall(index, _vectors(20, seed=6), k=10)["recall"] == 1.0
+
+
+def test_ivf_recall_against_exact_search():
+    vectors = _clustered(6000)
+    index = VectorIndex(vectors, exact_threshold=1000, n_lists=64)
+    assert not index.is_exact
+    queries = _clustered(100, seed=1)
+    assert measure_recall(index, queries, k=10, n_probe=8)["recall"] >= 0.9
+    # Probing every list scores every vector, so it is exact
+    assert measure_recall(index, queries, k=10, n_probe=64)["recall"] == 1.0
+    assert measure_recall(index, queries, k=10, n_probe=1)["recall"] <= \
+        measure_recall(index, queries, k=10, n_probe=8)["recall"]
@@ -0,0 +1,27 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from src.tariff_management_chatbot.api.app import app
+from src.tariff_management_chatbot.utils.async_embeddings import AsyncOpenAIEmbeddings
+
+
+def test_routes_work_after_app_restart():
+    # Shutdown must not leave the CPU pool or async clients unusable for the next lifespan
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert "results" in client.get("/smart-product-search", params={"query": "gloves", "top_n": 1}).json()
+            assert client.get("/export", params={"product_name": "gloves"}).status_code == 200
+
+
+def test_async_client_is_recreated_per_event_loop():
+    embeddings = AsyncOpenAIEmbeddings(api_key="test")
+
+    async def client_id():
+        client = embeddings._get_client()
+        async with embeddings._semaphore:
+            pass
+        return id(client), embeddings._loop
+
+    first, second = asyncio.run(client_id()), asyncio.run(client_id())
+    assert first[1] is not second[1]
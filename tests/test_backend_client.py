@@ -0,0 +1,111 @@
+import io
+import threading
+
+import requests
+from requests.adapters import BaseAdapter
+
+from backend_client import BackendClient
+
+
+class FakeAdapter(BaseAdapter):
+    # Answers requests in-process; handler(request) -> (status, body)
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.sent.append(request.url)
+        status, body = self.handler(request)
+        response = requests.Response()
+        response.status_code = status
+        response._content = body.encode()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def _client(handler, **kwargs):
+    client = BackendClient("http://backend.test/", **kwargs)
+    adapter = FakeAdapter(handler)
+    client.session.mount("http://", adapter)
+    return client, adapter
+
+
+def test_session_is_pooled_and_retries_idempotent_gets():
+    client = BackendClient("http://backend.test", retries=2, pool_size=4)
+    adapter = client.session.get_adapter("http://backend.test/")
+    assert adapter is client.session.get_adapter("https://backend.test/")
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 2
+    assert set(adapter.max_retries.status_forcelist) == {502, 503, 504}
+    assert "POST" not in adapter.max_retries.allowed_methods
+
+
+def test_get_caches_successes_by_path_and_params():
+    client, adapter = _client(lambda request: (200, request.url))
+    first = client.get("/hts-lookup", {"hts_code": "1", "limit": 5})
+    assert client.get("/hts-lookup", {"limit": "5", "hts_code": "1"}) is first
+    client.get("/hts-lookup", {"hts_code": "2"})
+    client.get("/hts-lookup", {"hts_code": "1", "limit": 5}, use_cache=False)
+    assert len(adapter.sent) == 3
+    assert adapter.sent[0].startswith("http://backend.test/hts-lookup?")
+
+    client.clear_cache()
+    client.get("/hts-lookup", {"hts_code": "1", "limit": 5})
+    assert len(adapter.sent) == 4
+
+
+def test_get_does_not_cache_errors_and_expires_entries():
+    status = [503]
+    client, adapter = _client(lambda request: (status[0], "{}"), cache_ttl=0.0)
+    assert client.get("/ready").status_code == 503
+    status[0] = 200
+    assert client.get("/ready").status_code == 200
+    client.get("/ready")
+    assert len(adapter.sent) == 3
+
+
+def test_cache_is_bounded():
+    client, adapter = _client(lambda request: (200, "{}"), cache_size=2)
+    for path in ("/a", "/b", "/c", "/a"):
+        client.get(path)
+    assert adapter.sent[-1] == "http://backend.test/a"
+    assert len(adapter.sent) == 4
+
+
+def test_get_many_fetches_concurrently_and_returns_errors():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def handler(request):
+        if request.url.endswith("/down"):
+            raise requests.ConnectionError("refused")
+        barrier.wait()  # only returns once all three fetches are in flight
+        return 200, request.url
+
+    client, _ = _client(handler)
+    results = client.get_many({
+        "a": ("/a", None), "b": ("/b", {"q": 1}), "c": ("/c", None), "down": ("/down", None),
+    })
+    assert results["b"].text == "http://backend.test/b?q=1"
+    assert {results[name].status_code for name in "abc"} == {200}
+    assert isinstance(results["down"], requests.ConnectionError)
+
+
+def test_stream_events_yields_each_event():
+    class StreamAdapter(FakeAdapter):
+        def send(self, request, **kwargs):
+            response = super().send(request, **kwargs)
+            response.raw, response._content = io.BytesIO(response._content), False
+            response.encoding = "utf-8"
+            return response
+
+    body = "event: token\ndata: Hel\ndata: lo\n\n: ping\n\nevent: done\ndata: {}\n\n"
+    client = BackendClient("http://backend.test")
+    client.session.mount("http://", StreamAdapter(lambda request: (200, body)))
+    assert list(client.stream_events("/chat", {"query": "hi"})) == [("token", "Hel\nlo"), ("done", "{}")]
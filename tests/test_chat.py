@@ -0,0 +1,44 @@
+import asyncio
+
+from src.tariff_management_chatbot.utils.chat import FIRST_TOKEN_SECONDS, stream_chat
+from src.tariff_management_chatbot.utils.metrics import OPENAI_REQUESTS, openai_call
+
+
+class _CountedLLM:
+    # Streams like AsyncOpenAIChat, inside openai_call, without the network
+    model = "counted-model"
+
+    async def astream(self, messages, **params):
+        with openai_call("chat"):
+            for word in ("one", "two", "three"):
+                await asyncio.sleep(0)
+                yield word + " "
+
+
+def _outcomes():
+    return {k[1]: v for k, v in OPENAI_REQUESTS._values.items() if k[0] == "chat"}
+
+
+def _run(question, is_disconnected=None):
+    async def collect():
+        return [e async for e in stream_chat(_CountedLLM(), "test", "ctx", question, {}, is_disconnected)]
+    return asyncio.run(collect())
+
+
+def test_client_disconnect_is_not_counted_as_an_llm_error():
+    before = _outcomes()
+
+    async def gone():
+        return True
+    events = _run("disconnect test question", gone)
+    assert len(events) == 1
+    after = _outcomes()
+    assert after.get("cancelled", 0) == before.get("cancelled", 0) + 1
+    assert after.get("error", 0) == before.get("error", 0)
+
+
+def test_first_token_latency_is_labelled_by_model():
+    events = _run("label test question")
+    assert events[-1].startswith("event: done")
+    assert FIRST_TOKEN_SECONDS.labelnames == ("model",)
+    assert ("counted-model",) in FIRST_TOKEN_SECONDS._series
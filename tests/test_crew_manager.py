@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from src.tariff_management_chatbot.crew.crew_manager import CrewManager, Node
+
+
+def _run(manager, inputs=None, targets=None):
+    return asyncio.run(manager.orchestrate(inputs or {}, targets))
+
+
+def test_dependents_of_a_failed_node_are_skipped():
+    calls = []
+
+    def fail(inputs, memo):
+        calls.append("source")
+        raise ValueError("no matching product")
+
+    def child(inputs, memo):
+        calls.append("child")
+        return memo["source"]
+
+    manager = CrewManager([
+        Node("source", fail),
+        Node("child", child, deps=["source"]),
+        Node("grandchild", child, deps=["child"]),
+        Node("independent", lambda inputs, memo: inputs["x"] * 2),
+    ])
+    out = _run(manager, {"x": 21})
+    assert calls == ["source"]
+    assert out["results"] == {"independent": 42}
+    assert out["errors"] == {
+        "source": "no matching product",
+        "child": "skipped: source failed",
+        "grandchild": "skipped: child failed",
+    }
+    # Skipped nodes never started, so they have no timing
+    assert set(out["timings_ms"]) == {"source", "independent", "total"}
+
+
+def test_unexpected_errors_are_reported_and_logged(caplog):
+    async def broken(inputs, memo):
+        raise RuntimeError("backend down")
+
+    out = _run(CrewManager([Node("broken", broken)]))
+    assert out["errors"] == {"broken": "backend down"}
+    assert "Workflow node 'broken' failed" in caplog.text
+
+
+def test_timed_out_nodes_are_reported_and_skip_dependents():
+    async def slow(inputs, memo):
+        await asyncio.sleep(5)
+
+    manager = CrewManager([
+        Node("slow", slow, timeout=0.05),
+        Node("after", lambda inputs, memo: "ran", deps=["slow"]),
+        Node("fast", lambda inputs, memo: "ok"),
+    ], timeout=1.0)
+    started = time.perf_counter()
+    out = _run(manager)
+    assert time.perf_counter() - started < 1.0
+    assert out["results"] == {"fast": "ok"}
+    assert out["errors"] == {"slow": "timed out after 0.05s", "after": "skipped: slow failed"}
+
+
+def test_independent_nodes_run_concurrently():
+    async def wait(inputs, memo):
+        await asyncio.sleep(0.2)
+        return True
+
+    def blocking(inputs, memo):
+        time.sleep(0.2)
+        return True
+
+    manager = CrewManager([
+        Node("a", wait), Node("b", wait), Node("c", blocking), Node("d", blocking),
+        Node("join", lambda inputs, memo: sorted(memo), deps=["a", "b", "c", "d"]),
+    ])
+    started = time.perf_counter()
+    out = _run(manager)
+    assert time.perf_counter() - started < 0.6
+    assert out["errors"] == {}
+    assert out["results"]["join"] == ["a", "b", "c", "d"]
+
+
+def test_targets_run_only_their_dependencies():
+    ran = []
+
+    def record(name):
+        def fn(inputs, memo):
+            ran.append(name)
+            return name
+        return fn
+
+    manager = CrewManager([
+        Node("root", record("root")),
+        Node("left", record("left"), deps=["root"]),
+        Node("right", record("right"), deps=["root"]),
+    ])
+    out = _run(manager, targets=["left"])
+    assert sorted(ran) == ["left", "root"]
+    assert out["results"] == {"root": "root", "left": "left"}
+    with pytest.raises(ValueError, match="Unknown node 'missing'"):
+        _run(manager, targets=["missing"])
+
+
+def test_graph_must_be_added_in_dependency_order():
+    manager = CrewManager([Node("a", lambda inputs, memo: None)])
+    with pytest.raises(ValueError, match="unknown nodes: b"):
+        manager.add(Node("c", lambda inputs, memo: None, deps=["a", "b"]))
+    with pytest.raises(ValueError, match="already defined"):
+        manager.add(Node("a", lambda inputs, memo: None))
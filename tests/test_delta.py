@@ -0,0 +1,179 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tariff_management_chatbot.agents.policy_shock import _column_codes, _numeric_column
+from src.tariff_management_chatbot.config.config import TARIFF_CSV
+from src.tariff_management_chatbot.data.delta import apply_delta, compact, merge_delta
+from src.tariff_management_chatbot.data.hts_index import HtsIndex, get_hts_index
+from src.tariff_management_chatbot.data.loader import journal_files, load_tariff_data
+from src.tariff_management_chatbot.data.materials import MaterialTable, get_material_table
+from src.tariff_management_chatbot.data.snapshot import compile_snapshot, load_snapshot
+from src.tariff_management_chatbot.data.store import TariffSnapshot, TariffStore
+from src.tariff_management_chatbot.data.text_index import ProductTextIndex, get_text_index
+from src.tariff_management_chatbot.utils.chat import _record_index
+
+
+def _base(kind, tmp_path):
+    df = pd.read_csv(TARIFF_CSV).iloc[:500]
+    if kind == "snapshot":
+        df = load_snapshot(compile_snapshot(str(tmp_path / "t.csv"), str(tmp_path / "t.snapshot"), df=df))
+    return df
+
+
+def _delta(df):
+    # Updates two records (one with new text values), deletes one, inserts one
+    inserted = df.iloc[[7]].astype(object).copy()
+    inserted["Record_ID"] = "NEW000001"
+    inserted["HTS_Code"] = "9999.99.9999"
+    inserted["Product_Description"] = "Titanium bicycle frame"
+    inserted["Material_Composition"] = "80% Titanium, 20% Carbon Fiber"
+    updates = df.iloc[[0, 3]].astype(object).copy()
+    for column, values in {
+        "HTS_Code": ["8888.11.0000", df["HTS_Code"].iloc[9]],
+        "Product_Description": ["Hand-woven rattan basket", df["Product_Description"].iloc[9]],
+        "Country_of_Origin": ["Narnia", df["Country_of_Origin"].iloc[9]],
+        "Material_Composition": ["100% Rattan", df["Material_Composition"].iloc[9]],
+        "Tariff_Rate_Percent": [12.5, 3.0],
+    }.items():
+        updates[column] = values
+    deletes = pd.DataFrame({"Record_ID": [df["Record_ID"].iloc[5]], "Operation": ["delete"]})
+    return pd.concat([updates, deletes, inserted], ignore_index=True)
+
+
+@pytest.mark.parametrize("kind", ["csv", "snapshot"])
+def test_update_stays_in_place_and_keeps_dtypes(kind, tmp_path):
+    df = _base(kind, tmp_path)
+    delta = pd.DataFrame({"Record_ID": [df["Record_ID"].iloc[0]], "Tariff_Rate_Percent": [42.0]})
+    new_df, stats, change = merge_delta(df, delta)
+    assert stats["updated"] == 1
+    assert new_df["Record_ID"].tolist() == df["Record_ID"].tolist()
+    assert new_df["Tariff_Rate_Percent"].iloc[0] == 42.0
+    assert new_df["Company"].iloc[0] == df["Company"].iloc[0]
+    assert list(new_df.dtypes) == list(df.dtypes)
+    assert change.updated.tolist() == [0] and change.inserted == 0
+
+
+@pytest.mark.parametrize("kind", ["csv", "snapshot"])
+def test_mixed_delta_keeps_order_and_dtype_kinds(kind, tmp_path):
+    df = _base(kind, tmp_path)
+    new_df, stats, _ = merge_delta(df, _delta(df))
+    assert stats == {"inserted": 1, "updated": 2, "deleted": 1, "skipped_stale": 0, "skipped_missing": 0}
+    expected = df["Record_ID"].drop(index=5).tolist() + ["NEW000001"]
+    assert new_df["Record_ID"].tolist() == expected
+    assert new_df["Product_Description"].iloc[0] == "Hand-woven rattan basket"
+    for name in df.columns:
+        assert type(new_df[name].dtype) is type(df[name].dtype), name
+        if isinstance(df[name].dtype, np.dtype):
+            assert new_df[name].dtype == df[name].dtype, name
+
+
+def test_apply_delta_journals_then_compacts(tmp_path):
+    csv_file = str(tmp_path / "tariffs.csv")
+    shutil.copy(TARIFF_CSV, csv_file)
+    before = os.path.getmtime(csv_file)
+    store = TariffStore(csv_file)
+    delta = _delta(store.snapshot().df)
+
+    result = apply_delta(delta, store)
+    assert result["updated"] == 2 and result["inserted"] == 1 and result["deleted"] == 1
+    assert os.path.getmtime(csv_file) == before
+    assert len(journal_files(csv_file)) == 1
+    published = store.snapshot().df
+    assert published["Record_ID"].iloc[0] == pd.read_csv(TARIFF_CSV, nrows=1)["Record_ID"].iloc[0]
+    # A fresh process rebuilds the same frame from the CSV plus the journal
+    pd.testing.assert_frame_equal(load_tariff_data(csv_file), published)
+
+    compact(store)
+    assert journal_files(csv_file) == []
+    assert store.snapshot().df is published
+    pd.testing.assert_frame_equal(load_tariff_data(csv_file), published)
+
+
+def _rate_update(df):
+    return pd.DataFrame({"Record_ID": [df["Record_ID"].iloc[2]], "Tariff_Rate_Percent": [1.0]})
+
+
+def _patched(df, delta, *getters):
+    # Old snapshot with getters' structures built, and the next version made from delta
+    old = TariffSnapshot(df, 1)
+    for get in getters:
+        get(old)
+    new_df, _, change = merge_delta(df, delta)
+    return old, TariffSnapshot(new_df, 2, previous=old, change=change)
+
+
+@pytest.mark.parametrize("kind", ["csv", "snapshot"])
+def test_patched_hts_index_matches_a_fresh_build(kind, tmp_path):
+    df = _base(kind, tmp_path)
+    old, new = _patched(df, _delta(df), get_hts_index)
+    previous = get_hts_index(old)
+    hts, fresh = get_hts_index(new), HtsIndex(new.df["HTS_Code"])
+    assert hts is not previous
+    for code in ["8888.11.0000", "9999.99.9999", str(df["HTS_Code"].iloc[0]), str(df["HTS_Code"].iloc[9])]:
+        assert sorted(hts.lookup(code)) == sorted(fresh.lookup(code))
+    for prefix in ["88", "99", str(df["HTS_Code"].iloc[9])[:2]]:
+        assert sorted(hts.prefix(prefix)) == sorted(fresh.prefix(prefix))
+        assert hts.breakdown(prefix) == fresh.breakdown(prefix)
+
+
+def test_hts_index_is_reused_when_codes_are_untouched(tmp_path):
+    df = _base("csv", tmp_path)
+    old, new = _patched(df, _rate_update(df), get_hts_index)
+    assert get_hts_index(new) is get_hts_index(old)
+
+
+@pytest.mark.parametrize("kind", ["csv", "snapshot"])
+def test_patched_text_index_matches_a_fresh_build(kind, tmp_path):
+    df = _base(kind, tmp_path)
+    _, new = _patched(df, _delta(df), get_text_index)
+    text, fresh = get_text_index(new), ProductTextIndex(new.df)
+    for filters in [{"Product_Description": "rattan"}, {"Product_Description": "bicycle"},
+                    {"Country_of_Origin": "narnia"}, {"Product_Description": str(df["Product_Description"].iloc[0])[:6]},
+                    {"Company": str(df["Company"].iloc[1])}]:
+        assert text.search(filters).tolist() == fresh.search(filters).tolist()
+
+
+@pytest.mark.parametrize("kind", ["csv", "snapshot"])
+def test_patched_material_table_matches_a_fresh_build(kind, tmp_path):
+    df = _base(kind, tmp_path)
+    _, new = _patched(df, _delta(df), get_material_table)
+    table, fresh = get_material_table(new), MaterialTable(new.df)
+    assert table.rows_with_composition.tolist() == fresh.rows_with_composition.tolist()
+    for material in list(fresh.materials) + ["Rattan", "Titanium"]:
+        rows, shares = table.rows_with_material(material)
+        fresh_rows, fresh_shares = fresh.rows_with_material(material)
+        assert rows.tolist() == fresh_rows.tolist(), material
+        assert shares.tolist() == fresh_shares.tolist(), material
+
+
+def test_material_table_is_reused_when_compositions_are_untouched(tmp_path):
+    df = _base("csv", tmp_path)
+    old, new = _patched(df, _rate_update(df), get_material_table)
+    assert get_material_table(new) is get_material_table(old)
+
+
+def _labels(codes, values):
+    return [values[c] if c >= 0 else None for c in codes]
+
+
+@pytest.mark.parametrize("kind", ["csv", "snapshot"])
+def test_patched_policy_columns_match_a_fresh_build(kind, tmp_path):
+    df = _base(kind, tmp_path)
+    getters = [lambda s, c=c: _column_codes(s, c) for c in ("Country_of_Origin", "Company")]
+    _, new = _patched(df, _delta(df), *getters, lambda s: _numeric_column(s, "Tariff_Rate_Percent"))
+    fresh = TariffSnapshot(new.df, 3)
+    for column in ("Country_of_Origin", "Company"):
+        assert _labels(*_column_codes(new, column)) == _labels(*_column_codes(fresh, column))
+    assert np.array_equal(_numeric_column(new, "Tariff_Rate_Percent"), _numeric_column(fresh, "Tariff_Rate_Percent"))
+
+
+def test_record_index_is_reused_until_rows_are_added_or_removed(tmp_path):
+    df = _base("csv", tmp_path)
+    old, updated = _patched(df, _rate_update(df), _record_index)
+    assert _record_index(updated) is _record_index(old)
+    _, changed = _patched(df, _delta(df), _record_index)
+    assert _record_index(changed).get_indexer(["NEW000001"]).tolist() == [len(changed.df) - 1]
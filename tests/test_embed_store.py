@@ -0,0 +1,29 @@
+import numpy as np
+
+from src.tariff_management_chatbot.utils.embed_store import EmbeddingStore
+
+
+def _embed(texts):
+    return np.asarray([[len(t), ord(t[0]), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_stores_sharing_a_directory_keep_each_others_rows(tmp_path):
+    # Two workers open the same directory, then each appends rows the other has not seen
+    first, second = EmbeddingStore(str(tmp_path)), EmbeddingStore(str(tmp_path))
+    first.get_or_embed(["alpha", "beta"], _embed)
+    second.get_or_embed(["gamma"], _embed)
+    first.get_or_embed(["delta"], _embed)
+
+    texts = ["alpha", "beta", "gamma", "delta"]
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.count == 4
+    assert np.array_equal(reopened.get_or_embed(texts, lambda t: 1 / 0), _embed(texts))
+
+
+def test_rows_committed_elsewhere_are_not_embedded_again(tmp_path):
+    first, second = EmbeddingStore(str(tmp_path)), EmbeddingStore(str(tmp_path))
+    first.get_or_embed(["alpha"], _embed)
+    calls = []
+    vectors = second.get_or_embed(["alpha"], lambda t: calls.append(t) or _embed(t))
+    assert calls == []
+    assert np.array_equal(vectors, _embed(["alpha"]))
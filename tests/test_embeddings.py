@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from src.tariff_management_chatbot.utils.embeddings import HashingEmbeddings, get_embeddings
+
+
+def test_hashing_vectors_are_deterministic_and_normalized():
+    texts = ["Cotton gloves", "Wooden furniture for bedrooms", ""]
+    first = HashingEmbeddings().embed_documents(texts)
+    second = HashingEmbeddings().embed_documents(texts)
+    assert first.shape == (3, 512) and first.dtype == np.float32
+    assert np.array_equal(first, second)
+    assert np.allclose(np.linalg.norm(first[:2], axis=1), 1.0)
+    assert not first[2].any()
+    assert np.array_equal(HashingEmbeddings().embed_query("Cotton gloves"), first[0])
+    assert HashingEmbeddings().embed_documents([]).shape == (0, 512)
+
+
+def test_similar_texts_score_higher_than_unrelated_ones():
+    model = HashingEmbeddings()
+    query = model.embed_query("cotton glove")
+    close, far = model.embed_documents(["Gloves of cotton, knitted", "Stainless steel bolts"])
+    assert query @ close > query @ far
+    # Case and punctuation do not change the vector
+    assert np.array_equal(model.embed_query("Cotton, GLOVE!"), query)
+
+
+def test_backend_is_chosen_by_name():
+    assert isinstance(get_embeddings("hashing"), HashingEmbeddings)
+    with pytest.raises(ValueError):
+        get_embeddings("nope")
@@ -0,0 +1,57 @@
+import gzip
+import io
+import json
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from src.tariff_management_chatbot.api.app import app
+from src.tariff_management_chatbot.data.store import get_tariff_store
+from src.tariff_management_chatbot.utils.export import gzip_chunks, iter_export_chunks
+
+
+def _matches(df, country):
+    return df[df["Country_of_Origin"].str.contains(country, case=False, regex=False)]
+
+
+def test_csv_export_matches_the_filtered_rows():
+    df = get_tariff_store().snapshot().df
+    country = str(df["Country_of_Origin"].iloc[0])
+    expected = _matches(df, country)[["Record_ID", "HTS_Code", "Landed_Cost_USD"]].reset_index(drop=True)
+    params = {"format": "csv", "country_of_origin": country, "columns": "Record_ID,HTS_Code,Landed_Cost_USD"}
+    with TestClient(app) as client:
+        response = client.get("/export", params=params)
+        zipped = client.get("/export", params={**params, "gzip": "true"})
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["x-total-count"] == str(len(expected))
+    pd.testing.assert_frame_equal(pd.read_csv(io.StringIO(response.text), dtype={"HTS_Code": str}),
+                                  expected.astype({"HTS_Code": str}))
+    assert gzip.decompress(zipped.content) == response.content
+
+
+def test_ndjson_export_has_one_record_per_line():
+    df = get_tariff_store().snapshot().df
+    country = str(df["Country_of_Origin"].iloc[0])
+    with TestClient(app) as client:
+        response = client.get("/export", params={"country_of_origin": country, "columns": "Record_ID"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"Record_ID": r} for r in _matches(df, country)["Record_ID"]]
+
+
+def test_chunks_join_into_one_csv_with_a_single_header():
+    df = get_tariff_store().snapshot().df.iloc[:50]
+    rows = np.arange(3, 40)
+    chunks = list(iter_export_chunks(df, rows, [0, 1], "csv", chunk_rows=7))
+    assert len(chunks) == 6
+    joined = b"".join(chunks)
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(joined), dtype=str),
+                                  df.iloc[rows, [0, 1]].astype(str).reset_index(drop=True))
+    assert gzip.decompress(b"".join(gzip_chunks(iter(chunks)))) == joined
+    # No matches still gives a header, so the file opens as an empty table
+    assert b"".join(iter_export_chunks(df, rows[:0], [0, 1], "csv")).decode() == ",".join(df.columns[:2]) + "\n"
+
+
+def test_unknown_format_is_an_error():
+    with TestClient(app) as client:
+        assert "error" in client.get("/export", params={"format": "xml"}).json()
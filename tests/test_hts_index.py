@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tariff_management_chatbot.config.config import TARIFF_CSV
+from src.tariff_management_chatbot.data.hts_index import HTS_LEVELS, HtsIndex, normalize_hts
+
+
+@pytest.fixture(scope="module")
+def codes():
+    series = pd.read_csv(TARIFF_CSV)["HTS_Code"].copy()
+    series.iloc[[4, 9]] = np.nan
+    return series
+
+
+def _rows(codes, predicate):
+    normalized = codes.map(normalize_hts)
+    return sorted(np.flatnonzero(normalized.map(predicate).to_numpy(bool)).tolist())
+
+
+def test_lookup_ignores_punctuation_and_spacing(codes):
+    index = HtsIndex(codes)
+    code = str(codes.iloc[0])
+    expected = _rows(codes, lambda c: c == normalize_hts(code))
+    for spelling in (code, code.replace(".", ""), " " + code.replace(".", " ") + " "):
+        assert sorted(index.lookup(spelling).tolist()) == expected
+    assert len(index.lookup("0000.00.0000")) == 0
+    assert len(index.lookup("")) == 0
+
+
+@pytest.mark.parametrize("level", [None, *HTS_LEVELS])
+def test_prefix_ranges_match_a_startswith_scan(codes, level):
+    index = HtsIndex(codes)
+    for code in codes.dropna().astype(str).unique()[:25]:
+        prefix = normalize_hts(code)[:7]
+        cut = prefix[:HTS_LEVELS[level]] if level else prefix
+        expected = _rows(codes, lambda c: c != "" and c.startswith(cut))
+        assert sorted(index.prefix(prefix, level).tolist()) == expected, (prefix, level)
+        breakdown = index.breakdown(prefix, level)
+        assert sum(breakdown.values()) == len(expected)
+        assert all(c.startswith(cut) for c in breakdown) and list(breakdown) == sorted(breakdown)
+
+
+def test_prefix_edges(codes):
+    index = HtsIndex(codes)
+    # "99" must not pick up codes under "9" alone, and vice versa
+    assert sorted(index.prefix("9").tolist()) == _rows(codes, lambda c: c.startswith("9"))
+    assert sorted(index.prefix("99").tolist()) == _rows(codes, lambda c: c.startswith("99"))
+    assert len(index.prefix("")) == 0 and index.breakdown("") == {}
+    assert len(index.prefix("0000")) == 0
@@ -0,0 +1,56 @@
+import time
+
+from src.tariff_management_chatbot.utils import semantic_search
+from src.tariff_management_chatbot.utils.llm_cache import LLMResponseCache
+
+MODEL, PARAMS = "gpt-test", {"temperature": 0}
+
+
+def _messages(question, context="rows"):
+    return [{"role": "system", "content": context}, {"role": "user", "content": question}]
+
+
+def _cache(tmp_path, **kwargs):
+    return LLMResponseCache(path=str(tmp_path / "llm.db"), **kwargs)
+
+
+def test_exact_hits_expire_with_the_ttl(tmp_path):
+    cache = _cache(tmp_path, ttl=0.2, similarity=0)
+    calls = []
+    call = lambda: calls.append(1) or "answer"  # noqa: E731
+    assert cache.get_or_call(call, MODEL, PARAMS, _messages("q")) == "answer"
+    assert cache.get_or_call(call, MODEL, PARAMS, _messages("q")) == "answer"
+    assert len(calls) == 1 and cache.stats()["hits"] == 1
+    time.sleep(0.25)
+    cache.get_or_call(call, MODEL, PARAMS, _messages("q"))
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = _cache(tmp_path, max_entries=2, similarity=0)
+    for question in ("a", "b"):
+        cache.put(MODEL, PARAMS, _messages(question), question.upper())
+    assert cache.get(MODEL, PARAMS, _messages("a")) == "A"
+    cache.put(MODEL, PARAMS, _messages("c"), "C")
+    assert cache.get(MODEL, PARAMS, _messages("b")) is None
+    assert cache.get(MODEL, PARAMS, _messages("a")) == "A"
+
+
+def test_near_duplicate_questions_share_an_answer_within_the_same_context(tmp_path):
+    cache = _cache(tmp_path, similarity=0.9)
+    cache.put(MODEL, PARAMS, _messages("What is the duty on steel bolts?"), "5%",
+              question="What is the duty on steel bolts?", context="rows")
+    assert cache.get(MODEL, PARAMS, _messages("what is the duty on  steel bolts"),
+                     question="what is the duty on  steel bolts", context="rows") == "5%"
+    assert cache.get(MODEL, PARAMS, _messages("What is the duty on steel bolts?", "other"),
+                     question="What is the duty on steel bolts?", context="other") is None
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_question_embeddings_come_from_the_search_query_cache(tmp_path):
+    cache = _cache(tmp_path, similarity=0.9)
+    question = "Which cotton gloves have the lowest landed cost?"
+    before = semantic_search.query_cache.stats()["misses"]
+    cache.put(MODEL, PARAMS, _messages(question), "answer", question=question, context="rows")
+    cache.get(MODEL, PARAMS, _messages(question + "!"), question=question, context="rows")
+    assert semantic_search.query_cache.stats()["misses"] == before + 1
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from src.tariff_management_chatbot.agents.material_optimizer import MaterialOptimizer
+from src.tariff_management_chatbot.api import endpoints
+from src.tariff_management_chatbot.data.store import get_tariff_store
+
+
+def test_suggestions_are_the_top_savings_rows_in_order():
+    df = get_tariff_store().snapshot().df
+    product = str(df["Product_Description"].iloc[0])
+    matches = df[df["Product_Description"].str.contains(product, case=False, regex=False)
+                 & df["Material_Composition"].notna()]
+    expected = matches.assign(savings=pd.to_numeric(matches["Potential_Savings_USD"], errors="coerce").fillna(0)) \
+        .sort_values("savings", ascending=False, kind="stable").head(3)
+
+    result = MaterialOptimizer().suggest_materials(product)
+    assert [s["materials"] for s in result["suggestions"]] == expected["Material_Composition"].tolist()
+    assert [s["primary_material"] for s in result["suggestions"]] == expected["Primary_Material"].tolist()
+    assert [s["potential_savings_usd"] for s in result["suggestions"]] == expected["savings"].tolist()
+
+
+def test_share_bounds_need_a_material():
+    response = endpoints.material_optimization("bicycle", hts_code="", material="", min_share=50, max_share=None)
+    assert "error" in response
@@ -0,0 +1,59 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.tariff_management_chatbot.api.app import app
+from src.tariff_management_chatbot.utils import metrics
+from src.tariff_management_chatbot.utils.metrics import Counter, Histogram, render_metrics
+
+SAMPLE = re.compile(r'^[a-z_]+(\{([a-z_]+="([^"\\]|\\.)*",?)*\})? [-+0-9.eInfNa]+$')
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    # Metrics created by a test must not show up in later /metrics output
+    before = list(metrics._registry)
+    yield
+    metrics._registry[:] = before
+
+
+def _value(text, line_start):
+    return float(next(line for line in text.splitlines() if line.startswith(line_start)).rsplit(" ", 1)[1])
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, "/x")
+    text = histogram.render()
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert _value(text, 'test_latency_seconds_bucket{route="/x",le="0.1"}') == 1
+    assert _value(text, 'test_latency_seconds_bucket{route="/x",le="1.0"}') == 3
+    assert _value(text, 'test_latency_seconds_bucket{route="/x",le="+Inf"}') == 4
+    assert _value(text, 'test_latency_seconds_count{route="/x"}') == 4
+    assert _value(text, 'test_latency_seconds_sum{route="/x"}') == 4.05
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_events_total", "Test.", ("name",))
+    counter.inc('a "quoted"\\name')
+    assert 'test_events_total{name="a \\"quoted\\"\\\\name"} 1' in counter.render()
+
+
+def test_metrics_endpoint_reports_requests_by_route_template():
+    with TestClient(app) as client:
+        client.get("/hts-lookup", params={"hts_code": "0000.00.0000"})
+        client.get("/no-such-route")
+        response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'route="/hts-lookup",status="200"' in text
+    assert 'route="unmatched",status="404"' in text
+    assert "0000.00.0000" not in text
+    for name in ("tariff_http_request_duration_seconds", "tariff_stage_duration_seconds",
+                 "tariff_dataset_version", "tariff_query_cache_hit_ratio"):
+        assert f"# TYPE {name} " in text
+    for line in text.splitlines():
+        assert line.startswith("#") or SAMPLE.match(line), line
+    assert render_metrics().endswith("\n")
@@ -0,0 +1,52 @@
+import json
+
+from src.tariff_management_chatbot.api import endpoints
+from src.tariff_management_chatbot.data.store import TariffSnapshot, get_tariff_store
+from src.tariff_management_chatbot.utils.serialization import cursor_scope, page_response
+
+
+def _body(response):
+    return json.loads(response.body) if hasattr(response, "body") else response
+
+
+def _search(**params):
+    query = {"product_name": "", "company_name": "", "country_of_origin": "", "limit": 5, "offset": 0,
+             "cursor": "", "columns": ""}
+    return _body(endpoints.product_search(**{**query, **params}))
+
+
+def test_cursor_pages_cover_every_match_once_with_the_same_columns():
+    df = get_tariff_store().snapshot().df
+    country = str(df["Country_of_Origin"].iloc[0])
+    expected = df.loc[df["Country_of_Origin"].str.contains(country, case=False, regex=False), "Record_ID"].tolist()
+
+    page = _search(country_of_origin=country, limit=50, columns="Record_ID, HTS_Code")
+    seen = []
+    while True:
+        assert all(set(r) == {"Record_ID", "HTS_Code"} for r in page["results"])
+        seen += [r["Record_ID"] for r in page["results"]]
+        if page["next_cursor"] is None:
+            break
+        # Later pages only send the cursor; the projection comes with it
+        page = _search(country_of_origin=country, limit=50, cursor=page["next_cursor"])
+    assert seen == expected and page["count"] == len(expected)
+
+
+def test_cursor_is_rejected_for_another_query_or_columns():
+    df = get_tariff_store().snapshot().df
+    country, other = (str(c) for c in df["Country_of_Origin"].unique()[:2])
+    cursor = _search(country_of_origin=country, columns="Record_ID")["next_cursor"]
+    assert "different query" in _search(country_of_origin=other, cursor=cursor)["error"]
+    assert "different query" in _body(endpoints.hts_lookup(
+        str(df["HTS_Code"].iloc[0]), limit=5, offset=0, cursor=cursor, columns=""))["error"]
+    assert "different columns" in _search(country_of_origin=country, cursor=cursor, columns="HTS_Code")["error"]
+    assert "Invalid cursor" in _search(country_of_origin=country, cursor="not-a-cursor")["error"]
+
+
+def test_cursor_expires_with_the_dataset_version():
+    df = get_tariff_store().snapshot().df.iloc[:20]
+    rows = list(range(20))
+    scope = cursor_scope("test")
+    cursor = _body(page_response(TariffSnapshot(df, 1), rows, 5, scope=scope))["next_cursor"]
+    assert _body(page_response(TariffSnapshot(df, 1), rows, 5, cursor=cursor, scope=scope))["offset"] == 5
+    assert "expired" in _body(page_response(TariffSnapshot(df, 2), rows, 5, cursor=cursor, scope=scope))["error"]
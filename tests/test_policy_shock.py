@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from src.tariff_management_chatbot.api.app import app
+from src.tariff_management_chatbot.config.config import TARIFF_CSV
+
+
+@pytest.fixture(scope="module")
+def fta_counts():
+    return pd.read_csv(TARIFF_CSV)["FTA_Applicable"].value_counts()
+
+
+@pytest.mark.parametrize("fta, expected", [
+    ("CPTPP", lambda c: c["CPTPP"]),
+    ("korus", lambda c: c["KORUS"]),
+    (True, lambda c: c.sum() - c["No"]),
+    (False, lambda c: c["No"]),
+])
+def test_fta_filter_matches_dataset_values(fta, expected, fta_counts):
+    body = {"overrides": [{"fta_applicable": fta, "add_points": 5}]}
+    with TestClient(app) as client:
+        result = client.post("/policy-shock", json=body).json()
+    assert result["summary"]["rows_affected"] == expected(fta_counts)
+
+
+@pytest.mark.parametrize("top_n, status", [(0, 422), (101, 422), (1, 200), (100, 200)])
+def test_top_n_is_bounded(top_n, status):
+    body = {"overrides": [{"country": "China", "add_points": 5}], "top_n": top_n}
+    with TestClient(app) as client:
+        assert client.post("/policy-shock", json=body).status_code == status
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from src.tariff_management_chatbot.utils.query_cache import QueryEmbeddingCache
+
+
+def _counting_embed(delay=0.0):
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        time.sleep(delay)
+        return [float(len(calls)), 0.0]
+    return embed, calls
+
+
+def test_normalized_queries_share_one_entry_until_the_ttl():
+    embed, calls = _counting_embed()
+    cache = QueryEmbeddingCache(embed, maxsize=8, ttl=0.2)
+    first = cache.get("Steel  Bolts")
+    assert cache.get(" steel bolts ") is first
+    assert len(calls) == 1 and cache.stats()["hits"] == 1
+    time.sleep(0.25)
+    assert cache.get("steel bolts")[0] == 2.0
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_make_one_embed_call():
+    embed, calls = _counting_embed(delay=0.1)
+    cache = QueryEmbeddingCache(embed)
+    results = [None] * 8
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, cache.get("gloves"))) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and cache.stats()["coalesced"] == 7
+    assert all(np.array_equal(r, results[0]) for r in results)
+
+
+def test_cancelling_the_first_caller_does_not_fail_the_others():
+    started = []
+
+    async def aembed(text):
+        started.append(text)
+        await asyncio.sleep(0.05)
+        return [1.0, 2.0]
+
+    async def run():
+        cache = QueryEmbeddingCache(lambda text: None, aembed_query=aembed)
+        owner = asyncio.ensure_future(cache.aget("gloves"))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.aget("gloves"))
+        await asyncio.sleep(0)
+        owner.cancel()
+        vector = await waiter
+        assert owner.cancelled()
+        assert vector.tolist() == [1.0, 2.0] and started == ["gloves"]
+        # The finished embed was cached for later callers
+        assert (await cache.aget("gloves")) is vector
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.tariff_management_chatbot.agents.scenario_simulator import ScenarioSimulator, top_k_order
+from src.tariff_management_chatbot.data.store import get_tariff_store
+
+
+def _stable_top_k(keys, tie_break, k, descending=False):
+    order = sorted(range(len(keys)), key=lambda i: tie_break[i])
+    order = sorted(order, key=lambda i: np.inf if np.isnan(keys[i]) else keys[i], reverse=descending)
+    if descending:
+        # sorted(reverse=True) keeps equal keys in order, but NaN must still go last
+        order = [i for i in order if not np.isnan(keys[i])] + [i for i in order if np.isnan(keys[i])]
+    return order[:k]
+
+
+def test_ties_at_the_kth_key_follow_tie_break():
+    # Five entries share the 3rd-best key; the earliest generated ones must win
+    keys = np.array([5.0, 1.0, 5.0, 5.0, 5.0, 5.0, 9.0])
+    tie_break = np.array([6, 0, 5, 4, 3, 2, 1])
+    assert top_k_order(keys, tie_break, 3).tolist() == [1, 5, 4]
+    assert top_k_order(-keys, tie_break, 3, descending=True).tolist() == [1, 5, 4]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_matches_a_full_stable_sort(descending):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(1, 40))
+        keys = rng.integers(0, 4, n).astype(float)
+        keys[rng.random(n) < 0.1] = np.nan
+        tie_break = rng.permutation(n)
+        k = int(rng.integers(1, 6))
+        expected = _stable_top_k(keys, tie_break, k, descending)
+        assert top_k_order(keys, tie_break, k, descending).tolist() == expected
+
+
+def _all_scenarios(product, alt_material, alt_country):
+    # Every scenario the simulator considers, in generation order
+    return ScenarioSimulator().simulate(product, alt_material, alt_country, top_k=10**6)["scenarios"]
+
+
+@pytest.mark.parametrize("sort_by", ["HTS_Code", "Country_of_Origin", "Primary_Material", "scenario"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_text_keys_sort_like_the_returned_values(sort_by, direction):
+    df = get_tariff_store().snapshot().df
+    product = str(df["Product_Description"].iloc[0])
+    alt_country = str(df["Alternative_Country"].iloc[0])
+    every = sorted(_all_scenarios(product, "Cotton", alt_country), key=lambda s: str(s[sort_by]))
+    if direction == "desc":
+        every = sorted(every, key=lambda s: str(s[sort_by]), reverse=True)
+    result = ScenarioSimulator().simulate(product, "Cotton", alt_country, sort_by, direction)
+    assert [str(s[sort_by]) for s in result["scenarios"]] == [str(s[sort_by]) for s in every[:3]]
+
+
+def test_unknown_sort_key_is_an_error():
+    assert "error" in ScenarioSimulator().simulate("gloves", sort_by="Company")
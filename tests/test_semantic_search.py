@@ -0,0 +1,32 @@
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.tariff_management_chatbot.config.config import TARIFF_CSV
+from src.tariff_management_chatbot.data.delta import apply_delta
+from src.tariff_management_chatbot.data.store import TariffStore
+from src.tariff_management_chatbot.utils import semantic_search
+
+
+def test_concurrent_loads_extend_the_index_once(tmp_path, monkeypatch):
+    csv_file = str(tmp_path / "tariffs.csv")
+    shutil.copy(TARIFF_CSV, csv_file)
+    store = TariffStore(csv_file)
+    monkeypatch.setattr(semantic_search, "get_tariff_store", lambda: store)
+    monkeypatch.setattr(semantic_search, "_loaded", None)
+    _, before, _ = semantic_search.load_embeddings()
+
+    inserted = store.snapshot().df.iloc[[0]].astype(object).copy()
+    inserted["Record_ID"] = "NEW000001"
+    inserted["Product_Description"] = "Titanium bicycle frame"
+    apply_delta(inserted, store)
+    with ThreadPoolExecutor(8) as pool:
+        loaded = list(pool.map(lambda _: semantic_search.load_embeddings(), range(16)))
+
+    df, index, descriptions = loaded[0]
+    assert all(other[1] is index for other in loaded)
+    assert len(index.vectors) == len(descriptions.distinct) == len(before.vectors) + 1
+    assert df is store.snapshot().df
+    rows = descriptions.rows_for_values([len(index.vectors) - 1])
+    assert df["Record_ID"].iloc[rows].tolist() == ["NEW000001"]
@@ -0,0 +1,46 @@
+import mmap
+
+import numpy as np
+import pandas as pd
+
+from src.tariff_management_chatbot.data.snapshot import compile_snapshot, load_snapshot, snapshot_is_fresh
+
+
+def _memory_mapped(arr):
+    while arr is not None:
+        if isinstance(arr, (np.memmap, mmap.mmap)):
+            return True
+        arr = getattr(arr, "base", None)
+    return False
+
+
+def _frame():
+    return pd.DataFrame({
+        "Record_ID": ["TR1", "TR2", "TR3", None],
+        "Material_Cost_USD": [1.5, 2.0, np.nan, 4.25],
+        "Quantity": [1, 2, 3, 4],
+        "Tariff_Rate_Percent": [0.0, 5.5, 7.0, 2.0],
+        "In_Stock": [True, False, True, True],
+    })
+
+
+def test_loaded_columns_stay_memory_mapped(tmp_path):
+    out = compile_snapshot(str(tmp_path / "t.csv"), str(tmp_path / "t.snapshot"), df=_frame())
+    df = load_snapshot(out)
+    for name in df.columns:
+        values = df[name].array.codes if isinstance(df[name].dtype, pd.CategoricalDtype) else df[name].to_numpy()
+        assert _memory_mapped(values), name
+
+
+def test_round_trip_keeps_values_and_bool_dtype(tmp_path):
+    source = _frame()
+    df = load_snapshot(compile_snapshot(str(tmp_path / "t.csv"), str(tmp_path / "t.snapshot"), df=source))
+    assert df["In_Stock"].dtype == bool
+    assert df["Quantity"].dtype == np.int64
+    pd.testing.assert_frame_equal(df.astype(object), source.astype(object), check_dtype=False)
+
+
+def test_older_format_is_not_fresh(tmp_path):
+    out = compile_snapshot(str(tmp_path / "t.csv"), str(tmp_path / "t.snapshot"), df=_frame())
+    (tmp_path / "t.snapshot" / "manifest.json").write_text('{"format": 1, "rows": 0, "columns": []}')
+    assert not snapshot_is_fresh(str(tmp_path / "t.csv"), out)
@@ -0,0 +1,75 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.tariff_management_chatbot.api import endpoints
+from src.tariff_management_chatbot.config.config import TARIFF_CSV
+from src.tariff_management_chatbot.data import delta
+from src.tariff_management_chatbot.data.hts_index import HtsIndex
+from src.tariff_management_chatbot.data.loader import journal_files
+from src.tariff_management_chatbot.data.sql_store import SqlTariffBackend
+from src.tariff_management_chatbot.data.store import TariffStore, get_tariff_store
+
+
+def test_hts_range_breakdown_reads_the_ingested_data(tmp_path, monkeypatch):
+    # A new backend has ingested nothing yet; the breakdown must come after the ingest check
+    backend = SqlTariffBackend(f"sqlite:///{tmp_path / 'tariffs.db'}")
+    monkeypatch.setattr(endpoints, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(endpoints, "get_sql_backend", lambda: backend)
+    df = get_tariff_store().snapshot().df
+    prefix = str(df["HTS_Code"].iloc[0])[:4]
+
+    response = json.loads(endpoints.hts_range(prefix, level="", limit=5, offset=0, cursor="", columns="").body)
+    assert response["codes"] == HtsIndex(df["HTS_Code"]).breakdown(prefix)
+    assert sum(response["codes"].values()) == response["count"]
+
+
+def _sql_store(tmp_path, monkeypatch):
+    csv_file = str(tmp_path / "tariffs.csv")
+    pd.read_csv(TARIFF_CSV).iloc[:300].to_csv(csv_file, index=False)
+    backend = SqlTariffBackend(f"sqlite:///{tmp_path / 'tariffs.db'}")
+    monkeypatch.setattr(delta, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(delta, "get_sql_backend", lambda: backend)
+    return TariffStore(csv_file), backend
+
+
+def _changes(df):
+    inserted = df.iloc[[7]].astype(object).copy()
+    inserted["Record_ID"] = "NEW000001"
+    inserted["HTS_Code"] = "9999.99.9999"
+    inserted["Product_Description"] = "Titanium bicycle frame"
+    updated = df.iloc[[0]].astype(object).copy()
+    updated["Product_Description"] = "Hand-woven rattan basket"
+    updated["Tariff_Rate_Percent"] = 12.5
+    deleted = pd.DataFrame({"Record_ID": [df["Record_ID"].iloc[5]], "Operation": ["delete"]})
+    return pd.concat([updated, deleted, inserted], ignore_index=True)
+
+
+def test_deltas_are_upserted_without_a_reingest(tmp_path, monkeypatch):
+    store, backend = _sql_store(tmp_path, monkeypatch)
+    backend.ensure_ingested(store.csv_file)
+    monkeypatch.setattr(backend, "ingest_csv", lambda csv_file: pytest.fail("re-ingested"))
+
+    generation = backend.version
+    delta.apply_delta(_changes(store.snapshot().df), store)
+    assert backend.version == generation + 1 and backend.is_fresh(store.csv_file)
+    pd.testing.assert_frame_equal(backend.load_frame(), store.snapshot().df, check_dtype=False)
+    assert backend.hts_lookup("9999999999", 5)[0] == 1
+    for needle, expected in [("rattan", 1), ("bicycle", 1)]:
+        assert backend.search_products({"Product_Description": needle}, 5)[0] == expected
+
+    # Compaction rewrites the files but not the rows
+    delta.compact(store)
+    assert backend.version == generation + 1 and backend.is_fresh(store.csv_file)
+
+
+def test_ingest_replays_the_journal(tmp_path, monkeypatch):
+    store, backend = _sql_store(tmp_path, monkeypatch)
+    monkeypatch.setattr(delta, "STORAGE_BACKEND", "pandas")
+    delta.apply_delta(_changes(store.snapshot().df), store)
+    assert len(journal_files(store.csv_file)) == 1
+
+    backend.ensure_ingested(store.csv_file)
+    pd.testing.assert_frame_equal(backend.load_frame(), store.snapshot().df, check_dtype=False)
+    assert backend.search_products({"Product_Description": "rattan"}, 5)[0] == 1
@@ -0,0 +1,58 @@
+import os
+
+import pandas as pd
+
+from src.tariff_management_chatbot.config.config import TARIFF_CSV
+from src.tariff_management_chatbot.data.store import TariffStore
+
+
+def _store(tmp_path, rows=50, check_interval=0.0):
+    csv_file = str(tmp_path / "tariffs.csv")
+    pd.read_csv(TARIFF_CSV).iloc[:rows].to_csv(csv_file, index=False)
+    return TariffStore(csv_file, check_interval=check_interval)
+
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_snapshot_is_shared_until_the_check_interval_passes(tmp_path):
+    store = _store(tmp_path, check_interval=3600)
+    first = store.snapshot()
+    assert first.version == 1 and len(first.df) == 50
+    pd.read_csv(TARIFF_CSV).iloc[:10].to_csv(store.csv_file, index=False)
+    assert store.snapshot() is first
+
+
+def test_changed_file_publishes_a_new_version(tmp_path):
+    store = _store(tmp_path)
+    first = store.snapshot()
+    pd.read_csv(TARIFF_CSV).iloc[:10].to_csv(store.csv_file, index=False)
+    _bump_mtime(store.csv_file)
+    second = store.snapshot()
+    assert second.version == 2 and len(second.df) == 10
+    # Requests still holding the old snapshot keep their data
+    assert len(first.df) == 50
+
+
+def test_touched_but_unchanged_file_keeps_the_version(tmp_path):
+    store = _store(tmp_path)
+    store.snapshot()
+    # A cold start skips hashing, so the first touch reloads once and records the digest
+    _bump_mtime(store.csv_file)
+    hashed = store.snapshot()
+    _bump_mtime(store.csv_file)
+    assert store.snapshot() is hashed and hashed.version == 2
+
+
+def test_derived_values_are_built_once_per_version(tmp_path):
+    store = _store(tmp_path)
+    builds = []
+    build = lambda s: builds.append(s.version) or object()  # noqa: E731
+    snapshot = store.snapshot()
+    assert snapshot.derived("thing", build) is snapshot.derived("thing", build)
+    published = store.publish(snapshot.df.iloc[:5].reset_index(drop=True))
+    assert published.version == 2 and store.snapshot() is published
+    published.derived("thing", build)
+    assert builds == [1, 2]
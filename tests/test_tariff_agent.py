@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+
+from src.tariff_management_chatbot.agents.tariff_agent import TariffAgent
+from src.tariff_management_chatbot.api.app import app
+
+
+def test_batch_reports_non_finite_values_per_line():
+    result = TariffAgent().calculate_batch(
+        [100.0, float("nan"), 50.0, 10.0], [2, 1, 1, float("inf")], [10.0, 10.0, 0.0, 10.0]
+    )
+    assert [line.get("error") for line in result["lines"]] == [
+        None,
+        "Missing or non-finite value for material_cost_usd.",
+        None,
+        "Missing or non-finite value for quantity.",
+    ]
+    assert result["totals"] == {
+        "line_count": 4, "valid_lines": 2, "invalid_lines": 2, "total_quantity": 3.0, "total_landed_cost": 270.0,
+    }
+
+
+def test_batch_csv_with_blank_and_text_cells():
+    csv = "material_cost_usd,quantity,tariff_rate_percent\n100,2,10\n,1,10\n50,abc,10\n80,0,10\n"
+    with TestClient(app) as client:
+        result = client.post("/calculate-tariff/batch-csv", files={"file": ("b.csv", csv.encode())}).json()
+    assert [line.get("error") for line in result["lines"]] == [
+        None,
+        "Missing or non-finite value for material_cost_usd.",
+        "Missing or non-finite value for quantity.",
+        "Quantity cannot be zero.",
+    ]
+    assert result["totals"]["total_landed_cost"] == 220.0
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tariff_management_chatbot.config.config import TARIFF_CSV
+from src.tariff_management_chatbot.data.snapshot import compile_snapshot, load_snapshot
+from src.tariff_management_chatbot.data.text_index import SEARCH_COLUMNS, ProductTextIndex
+
+
+def _expected(df, filters):
+    mask = np.ones(len(df), dtype=bool)
+    for column, needle in filters.items():
+        if needle:
+            mask &= df[column].astype(object).str.contains(needle, case=False, regex=False).fillna(False).to_numpy(bool)
+    return np.flatnonzero(mask).tolist()
+
+
+def _needles(df, rng, n=60):
+    # Substrings of real values (1 to 12 characters, mixed case) plus some that match nothing
+    needles = []
+    for _ in range(n):
+        column = SEARCH_COLUMNS[rng.integers(len(SEARCH_COLUMNS))]
+        value = str(df[column].iloc[rng.integers(len(df))])
+        start = int(rng.integers(len(value)))
+        needle = value[start:start + int(rng.integers(1, 13))]
+        needles.append((column, needle.upper() if rng.random() < 0.3 else needle))
+    return needles + [("Product_Description", "zzqx"), ("Company", "Inc.  ")]
+
+
+@pytest.mark.parametrize("kind", ["csv", "snapshot"])
+def test_search_matches_case_insensitive_substring_filters(kind, tmp_path):
+    df = pd.read_csv(TARIFF_CSV).iloc[:3000]
+    df.loc[[3, 17], "Company"] = np.nan
+    if kind == "snapshot":
+        df = load_snapshot(compile_snapshot(str(tmp_path / "t.csv"), str(tmp_path / "t.snapshot"), df=df))
+    index = ProductTextIndex(df)
+    rng = np.random.default_rng(0)
+    needles = _needles(df, rng)
+    for column, needle in needles:
+        assert index.search({column: needle}).tolist() == _expected(df, {column: needle}), (column, needle)
+    # Several filters intersect; empty ones are ignored
+    for (c1, n1), (c2, n2) in zip(needles[::2], needles[1::2]):
+        filters = {"Country_of_Origin": "", c1: n1, c2: n2} if c1 != c2 else {c1: n1}
+        assert index.search(filters).tolist() == _expected(df, filters), filters
+    assert index.search({}).tolist() == list(range(len(df)))
@@ -0,0 +1,47 @@
+import json
+import threading
+
+from src.tariff_management_chatbot.api import endpoints
+from src.tariff_management_chatbot.api.warmup import Warmup
+
+
+def _ready(monkeypatch, warm):
+    monkeypatch.setattr(endpoints, "warmup", warm)
+    response = endpoints.readiness_check()
+    return response.status_code, json.loads(response.body)
+
+
+def test_ready_without_warmup(monkeypatch):
+    status, body = _ready(monkeypatch, Warmup([("dataset", lambda: None)]))
+    assert status == 200 and body["ready"] and "disabled" in body["message"]
+
+
+def test_ready_follows_the_component_states(monkeypatch):
+    release = threading.Event()
+    warm = Warmup([("dataset", lambda: None), ("vector_store", lambda: release.wait(5))])
+    warm.start()
+    warm.wait(0.2)
+    status, body = _ready(monkeypatch, warm)
+    assert status == 503 and not body["ready"]
+    assert body["components"]["vector_store"]["status"] == "loading"
+
+    release.set()
+    assert warm.wait(5)
+    status, body = _ready(monkeypatch, warm)
+    assert status == 200 and body["ready"]
+    assert {c["status"] for c in body["components"].values()} == {"ready"}
+    assert all(c["seconds"] is not None for c in body["components"].values())
+
+
+def test_failed_component_keeps_the_app_unready(monkeypatch):
+    def broken():
+        raise RuntimeError("no data")
+    warm = Warmup([("dataset", broken), ("text_index", lambda: None)])
+    warm.start()
+    assert not warm.wait(5)
+    status, body = _ready(monkeypatch, warm)
+    assert status == 503
+    dataset = body["components"]["dataset"]
+    assert dataset["status"] == "failed" and dataset["error"] == "no data"
+    # Later components still load
+    assert body["components"]["text_index"]["status"] == "ready"